@@ -0,0 +1,112 @@
+import threading
+from itertools import combinations
+
+import numpy as np
+import psycopg2.extras
+
+from banco import conectar_banco
+
+# --- MATRIZ DE AFINIDADE INCREMENTAL ---
+# Coocorrência dos pares de dezenas (a < b) nos sorteios com popularidade
+# > 1.0, como uma matriz 61 x 61 em memória. É a única implementação da
+# camada "sombra"/vizinhança: o snapshot do histórico (historico.py) e o
+# backtest (backtest.py) guardam uma e cada sorteio novo soma só os seus 15
+# pares. No banco, matriz_afinidade recebe um único upsert em lote com as
+# células que mudaram, no lugar do DELETE + 1.770 INSERTs.
+
+LIMITE_POPULARIDADE = 1.0
+
+# Posições (i, j), i < j, dos 15 pares dentro de um sorteio ordenado
+_PARES = np.array(list(combinations(range(6), 2)), dtype=np.intp)
+
+SQL_UPSERT = """
+    INSERT INTO matriz_afinidade (numero_a, numero_b, peso_conexao) VALUES %s
+    ON CONFLICT (numero_a, numero_b) DO UPDATE SET peso_conexao = EXCLUDED.peso_conexao
+"""
+
+# Última matriz gravada na tabela por este processo (None: ainda não conferida)
+_gravada = None
+_lock_gravacao = threading.Lock()
+
+
+class MatrizAfinidade:
+    """pesos[a, b] (a < b) = em quantos sorteios populares o par saiu junto."""
+
+    def __init__(self):
+        self.pesos = np.zeros((61, 61), dtype=np.int32)
+
+    @staticmethod
+    def _celulas(dezenas):
+        """(N, 6) dezenas -> (N * 15,) índices lineares a * 61 + b dos pares."""
+        ordenadas = np.sort(np.asarray(dezenas, dtype=np.intp).reshape(-1, 6), axis=1)
+        return (ordenadas[:, _PARES[:, 0]] * 61 + ordenadas[:, _PARES[:, 1]]).ravel()
+
+    @classmethod
+    def de_sorteios(cls, dezenas, popularidade):
+        """Matriz de um histórico inteiro (popularidade NaN conta como não popular)."""
+        matriz = cls()
+        matriz.absorver(dezenas, popularidade)
+        return matriz
+
+    def copia(self):
+        nova = MatrizAfinidade()
+        nova.pesos = self.pesos.copy()
+        return nova
+
+    def absorver(self, dezenas, popularidade):
+        """Soma os 15 pares de cada sorteio popular de `dezenas` (N, 6)."""
+        populares = np.atleast_1d(np.asarray(popularidade, dtype=np.float64)) > LIMITE_POPULARIDADE
+        celulas = self._celulas(np.asarray(dezenas).reshape(-1, 6)[populares])
+        self.pesos += np.bincount(celulas, minlength=61 * 61).reshape(61, 61).astype(np.int32)
+
+    def forca(self):
+        """
+        (61,) força de cada dezena somada por numero_b, como no SUM do SQL
+        antigo: em um sorteio ordenado, a dezena na posição k é o maior
+        elemento de exatamente k pares.
+        """
+        return self.pesos.sum(axis=0, dtype=np.int64)
+
+
+def _ler_tabela(cur):
+    cur.execute("SELECT numero_a, numero_b, SUM(peso_conexao) FROM matriz_afinidade GROUP BY 1, 2")
+    gravada = np.zeros((61, 61), dtype=np.int32)
+    for a, b, peso in cur.fetchall():
+        if a is not None and b is not None:
+            gravada[a, b] = peso
+    return gravada
+
+
+def sincronizar_matriz_afinidade(reconstruir=False):
+    """
+    Grava em matriz_afinidade a matriz do snapshot compartilhado, só com as
+    células que mudaram desde a última gravação, num único upsert (células
+    que zeraram são apagadas). Na primeira vez do processo (ou com
+    `reconstruir`, ex.: após concursos fora de ordem) compara a matriz
+    inteira com a tabela. Devolve quantas células mudaram.
+    """
+    # Import tardio: historico importa MatrizAfinidade deste módulo
+    from historico import obter_snapshot
+
+    global _gravada
+    with _lock_gravacao:
+        atual = obter_snapshot().afinidade.pesos
+        with conectar_banco() as conn:
+            cur = conn.cursor()
+            if reconstruir or _gravada is None:
+                _gravada = _ler_tabela(cur)
+
+            alteradas = np.flatnonzero(_gravada.ravel() != atual.ravel())
+            gravar = [(int(c // 61), int(c % 61), int(atual.flat[c])) for c in alteradas if atual.flat[c] > 0]
+            if gravar:
+                psycopg2.extras.execute_values(cur, SQL_UPSERT, gravar)
+            zeradas = [(int(c // 61), int(c % 61)) for c in alteradas if atual.flat[c] == 0]
+            if zeradas:
+                psycopg2.extras.execute_values(
+                    cur, "DELETE FROM matriz_afinidade WHERE (numero_a, numero_b) IN (VALUES %s)", zeradas
+                )
+            conn.commit()
+            cur.close()
+
+        _gravada = atual.copy()
+    return len(alteradas)
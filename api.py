@@ -1,11 +1,14 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 # ADICIONADO: importação da função de simulação
 from main import (
     processar_todas_estrategias, 
-    simular_performance, 
+    simular_performance_lote, 
+    metadados_lote,
     conectar_banco,
+    processar_matriz_afinidade,
     gerar_fusao_cibernetica,
     calcular_nivel_confianca,
     gerar_consenso_probabilidade
@@ -17,15 +20,45 @@ from datetime import date
 import psycopg2
 import psycopg2.extras
 
-import subprocess
+import os
+import asyncio
+import io
+import json
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import anyio
+import numpy as np
 
-import stress_test
+from banco import estatisticas_pool, fechar_pool
+from cache_estrategias import invalidar_cache, estatisticas_cache
+from mascaras import contar_acertos, dezenas_da_mascara, mascara
+from historico import obter_snapshot
+from conferidor import conferir_linhas, sorteios_alvo
+from gerador import gerar_palpites
+from fechamento import gerar_fechamento
+from atrasos import obter_tabela_atrasos, registrar_sorteio_atrasos
 
-from ia_neural import prever_proximo_sorteio
+from ia_neural import MODOS_ENSEMBLE, prever_proximo_sorteio, prever_ensemble
+from tarefas import enfileirar, obter_tarefa, listar_tarefas, encerrar as encerrar_tarefas
+from pipeline import executar_ciclo_aprendizado, executar_stress_test, ESTAGIOS_SYNC, ESTAGIOS_STRESS
 from testar_ia import stress_test_neural_v2
 
 app = FastAPI(title="Mega-Sena Meta-Intelligence API")
 
+# --- EXECUTORES ---
+# Endpoints declarados com `def` rodam no pool de threads do FastAPI (banco,
+# pandas), limitado a API_THREADS_IO. O que é CPU pesado (backtests) vai para
+# um pool de processos, para não disputar o GIL com as requisições leves.
+# Pipelines de minutos (sync, stress test) viram jobs em tarefas.py.
+API_THREADS_IO = int(os.getenv("API_THREADS_IO", "16"))
+API_PROCESSOS_CPU = int(os.getenv("API_PROCESSOS_CPU", str(max(1, min(4, (os.cpu_count() or 2) - 1)))))
+_pool_cpu = ProcessPoolExecutor(max_workers=API_PROCESSOS_CPU, mp_context=multiprocessing.get_context("spawn"))
+
+async def em_processo(func, *args):
+    """Executa `func` no pool de processos sem bloquear o event loop."""
+    return await asyncio.get_running_loop().run_in_executor(_pool_cpu, func, *args)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -34,22 +67,21 @@ app.add_middleware(
 )
 
 @app.get("/api/palpites")
-async def get_palpites():
+def get_palpites(janela_recente: int = 20):
     try:
         # 1. Mantém a lógica original intacta
-        dados = processar_todas_estrategias()
+        dados = processar_todas_estrategias(janela_recente=janela_recente)
         p_neural = [int(n) for n in prever_proximo_sorteio()]
         p_base = [int(n) for n in dados["meta"]["Alta Convergência"]]
         
         # 2. Busca o valor REAL da Auditoria no Banco (O Verde da imagem)
         # Isso garante que o 3º card seja diferente dos outros e real.
         try:
-            conn = conectar_banco()
-            cur = conn.cursor()
-            cur.execute("SELECT dezenas_previstas FROM historico_previsoes ORDER BY concurso_alvo DESC LIMIT 1")
-            row = cur.fetchone()
-            cur.close()
-            conn.close()
+            with conectar_banco() as conn:
+                cur = conn.cursor()
+                cur.execute("SELECT dezenas_previstas FROM historico_previsoes ORDER BY concurso_alvo DESC LIMIT 1")
+                row = cur.fetchone()
+                cur.close()
             # Se achou no banco, usa. Se não, usa o neural como fallback.
             p_auditoria_real = row[0] if row else p_neural
         except:
@@ -72,50 +104,175 @@ async def get_palpites():
         print(f"Erro detectado: {e}")
         return {"status": "erro", "mensagem": str(e)}
 
+@app.get("/api/palpite-ensemble")
+def get_palpite_ensemble(modo: str = "media"):
+    if modo not in MODOS_ENSEMBLE:
+        raise HTTPException(status_code=400, detail=f"modo deve ser um de {MODOS_ENSEMBLE}")
+    try:
+        # Combina todos os modelos neurais já treinados (modo "media" ou "voto")
+        palpite = [int(n) for n in prever_ensemble(modo)]
+        return {"status": "sucesso", "modo": modo, "palpite": palpite}
+    except Exception as e:
+        return {"status": "erro", "mensagem": str(e)}
+
+# Até este tamanho o upload do bolão fica em memória; acima disso vai para disco
+BOLAO_MEMORIA_MAX = 8 * 1024 * 1024
+
+@app.post("/api/conferir-bolao")
+async def conferir_bolao(request: Request, concurso: int | None = None,
+                         concurso_inicio: int | None = None, concurso_fim: int | None = None,
+                         coluna_id: bool | None = None):
+    """
+    Recebe o arquivo do bolão no corpo (CSV ou NDJSON, uma aposta de 6 a 15
+    dezenas por linha) e devolve NDJSON: uma linha por aposta e o resumo no fim.
+    `coluna_id=true` marca a primeira coluna do CSV como id (ids numéricos).
+    """
+    snap = await anyio.to_thread.run_sync(obter_snapshot)
+    try:
+        sorteios, concursos = sorteios_alvo(snap, concurso, concurso_inicio, concurso_fim)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # O corpo é copiado em blocos para um arquivo temporário, sem carregar tudo na memória
+    # (as escritas vão para o threadpool: passado o limite, o arquivo está em disco)
+    arquivo = tempfile.SpooledTemporaryFile(max_size=BOLAO_MEMORIA_MAX)
+    async for pedaco in request.stream():
+        await anyio.to_thread.run_sync(arquivo.write, pedaco)
+    await anyio.to_thread.run_sync(arquivo.seek, 0)
+
+    def gerar():
+        # Gerador síncrono: o Starlette o consome no threadpool
+        with arquivo, io.TextIOWrapper(arquivo, encoding="utf-8-sig") as texto:
+            for resultado in conferir_linhas(texto, sorteios, concursos, coluna_id):
+                yield json.dumps(resultado, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(gerar(), media_type="application/x-ndjson")
+
+# Acima desta quantidade a geração em massa responde em NDJSON, em streaming
+GERADOR_LIMITE_JSON = 1000
+
+@app.get("/api/gerar-palpites")
+def gerar_palpites_em_massa(quantidade: int = 100, modo: str = "melhores", temperatura: float = 1.0, semente: int | None = None,
+                           janela_recente: int = 20, afinidade: bool = False):
+    """
+    Gera `quantidade` jogos distintos que passam nos filtros de elite, a partir
+    da pontuação de cada dezena no motor de Alta Convergência.
+    modo="melhores": em ordem decrescente de pontuação; modo="amostragem": sorteio ponderado.
+    Com `afinidade`, cada jogo traz também o lift de coocorrência de pares/trios/quadras.
+    """
+    if modo not in ("melhores", "amostragem"):
+        raise HTTPException(status_code=400, detail="modo deve ser 'melhores' ou 'amostragem'")
+    if janela_recente < 1:
+        raise HTTPException(status_code=400, detail="janela_recente deve ser >= 1")
+    pesos = processar_todas_estrategias(janela_recente=janela_recente)["pesos_dezenas"]
+    coocorrencia = obter_snapshot().coocorrencia if afinidade else None
+    palpites = gerar_palpites(pesos, quantidade, modo, temperatura, semente, coocorrencia)
+
+    if quantidade <= GERADOR_LIMITE_JSON:
+        lista = list(palpites)
+        return {"status": "sucesso", "modo": modo, "quantidade": len(lista), "palpites": lista}
+    return StreamingResponse((json.dumps(p) + "\n" for p in palpites), media_type="application/x-ndjson")
+
+@app.get("/api/parceiros")
+def get_parceiros(dezenas: str, top: int = 10):
+    """
+    Dezenas que mais saíram junto com o grupo informado (1 a 3 dezenas, ex.:
+    "10,53"), a partir das contagens de pares, trios e quadras em memória.
+    """
+    try:
+        grupo = [int(n) for n in dezenas.split(",") if n.strip()]
+        if not all(1 <= n <= 60 for n in grupo):
+            raise ValueError("dezenas devem estar entre 1 e 60")
+        parceiros = obter_snapshot().coocorrencia.parceiros(grupo, top)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"grupo": sorted(set(grupo)), "parceiros": [{"numero": n, "vezes": v} for n, v in parceiros]}
+
+@app.get("/api/fechamento")
+def fechamento(qtd_dezenas: int = 12, garantia: int = 4, filtros: bool = True, dezenas: str | None = None,
+                janela_recente: int = 20):
+    """
+    Fechamento (covering design) sobre as `qtd_dezenas` mais fortes do motor de
+    Alta Convergência (ou sobre `dezenas`, ex.: "3,8,12,..."): o menor conjunto
+    de jogos que garante `garantia` acertos se `garantia` sorteadas caírem no pool.
+    """
+    try:
+        if dezenas:
+            candidatas = [int(n) for n in dezenas.split(",") if n.strip()]
+        else:
+            pesos = processar_todas_estrategias(janela_recente=janela_recente)["pesos_dezenas"]
+            candidatas = sorted(pesos, key=pesos.get, reverse=True)[:qtd_dezenas]
+        resultado = gerar_fechamento(candidatas, garantia, filtros)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": "sucesso", **resultado}
+
+@app.get("/api/atrasos")
+def get_atrasos(concurso: int | None = None, numero: int | None = None):
+    """
+    Atraso atual, maior e médio de cada dezena e o momentum, como estavam logo
+    após o `concurso` (padrão: o último). Com `numero`, devolve também todos
+    os intervalos entre as aparições dessa dezena.
+    """
+    tabela = obter_tabela_atrasos()
+    if numero is not None and not 1 <= numero <= 60:
+        raise HTTPException(status_code=400, detail="numero deve estar entre 1 e 60")
+    resposta = {
+        "concurso": concurso if concurso is not None else tabela.ultimo_concurso,
+        "dezenas": tabela.resumo(concurso),
+        "momentum": tabela.momentum(concurso),
+    }
+    if numero is not None:
+        resposta["historico_atrasos"] = tabela.historico_atrasos(numero)
+    return resposta
+
 class SorteioSchema(BaseModel):
     concurso: int
     data: date
     bolas: list[int]
 
 @app.post("/api/sorteios")
-async def adicionar_sorteio(dados: SorteioSchema):
+def adicionar_sorteio(dados: SorteioSchema):
     try:        
-        conn = conectar_banco()
-        cur = conn.cursor()
+        with conectar_banco() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT COALESCE(MAX(concurso), 0) FROM sorteios")
+            fora_de_ordem = dados.concurso < cur.fetchone()[0]
         
-        insert_query = """
-        INSERT INTO sorteios (concurso, data_sorteio, bola1, bola2, bola3, bola4, bola5, bola6)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-        ON CONFLICT (concurso) DO NOTHING;
-        """
+            insert_query = """
+            INSERT INTO sorteios (concurso, data_sorteio, bola1, bola2, bola3, bola4, bola5, bola6)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            ON CONFLICT (concurso) DO NOTHING;
+            """
         
-        cur.execute(insert_query, (
-            dados.concurso, dados.data,
-            dados.bolas[0], dados.bolas[1], dados.bolas[2],
-            dados.bolas[3], dados.bolas[4], dados.bolas[5]
-        ))
+            cur.execute(insert_query, (
+                dados.concurso, dados.data,
+                dados.bolas[0], dados.bolas[1], dados.bolas[2],
+                dados.bolas[3], dados.bolas[4], dados.bolas[5]
+            ))
+            inserido = cur.rowcount > 0
+            registrar_sorteio_atrasos(cur, dados.concurso, dados.bolas)
         
-        conn.commit()
-        cur.close()
-        conn.close()
+            conn.commit()
+            cur.close()
+        if inserido:
+            # Mesma atualização incremental do pipeline: só os pares do sorteio novo
+            # (concurso no meio do histórico refaz a matriz)
+            processar_matriz_afinidade(reconstruir=fora_de_ordem)
+        invalidar_cache()
         return {"status": "sucesso", "mensagem": f"Concurso {dados.concurso} adicionado!"}
     except Exception as e:
         return {"status": "erro", "mensagem": str(e)}
     
+def obter_agregados_dashboard():
+    # Mesma fonte das estratégias: atrasos e frequências do snapshot compartilhado
+    snap = obter_snapshot()
+    return snap.atrasos()[:10], snap.frequencia()[:10]
+
 @app.get("/api/dashboard")
-async def get_dashboard_stats():
+def get_dashboard_stats():
     try:
-        conn = conectar_banco()
-        cur = conn.cursor()
-
-        cur.execute("SELECT numero, concursos_de_atraso FROM v_atraso_numeros ORDER BY concursos_de_atraso DESC LIMIT 10;")
-        atraso_data = cur.fetchall()
-
-        cur.execute("SELECT numero, COUNT(*) FROM v_frequencia_numeros GROUP BY numero ORDER BY COUNT DESC LIMIT 10;")
-        freq_data = cur.fetchall()
-
-        cur.close()
-        conn.close()
+        atraso_data, freq_data = obter_agregados_dashboard()
 
         return {
             "atraso": {
@@ -131,9 +288,9 @@ async def get_dashboard_stats():
         return {"erro": str(e)}
     
 @app.get("/api/simulacao")
-async def get_simulacao(tipo: str = "favoritos"):
+def get_simulacao(tipo: str = "favoritos", concurso_inicio: int | None = None, concurso_fim: int | None = None, pontos_grafico: int = 50, janela_recente: int = 20):
     try:
-        dados_analise = processar_todas_estrategias()
+        dados_analise = processar_todas_estrategias(janela_recente=janela_recente)
         # Ajuste para os novos nomes das chaves
         if tipo == "favoritos":
             palpite = dados_analise["meta"]["Favoritos do Grupo"]
@@ -142,38 +299,51 @@ async def get_simulacao(tipo: str = "favoritos"):
         else:
             palpite = dados_analise["meta"]["Alta Convergência"] # Mudado para Alta Convergência como "Misto"
 
-        resultados = simular_performance(palpite)
+        # O resumo cobre todo o intervalo pedido (padrão: histórico inteiro);
+        # o gráfico mostra só os últimos `pontos_grafico` concursos dele
+        snap = obter_snapshot()
+        histograma, avaliados = simular_performance_lote([palpite], concurso_inicio, concurso_fim, snapshot=snap)
+        fim = snap.indice_do_concurso(concurso_fim + 1) if concurso_fim is not None else len(snap)
+        inicio = max(fim - pontos_grafico, snap.indice_do_concurso(concurso_inicio) if concurso_inicio is not None else 0)
+        acertos = contar_acertos(mascara(palpite), snap.mascaras[inicio:fim])
         return {
-            "labels": [f"C-{r['concurso']}" for r in resultados],
-            "acertos": [r["acertos"] for r in resultados],
+            "labels": [f"C-{c}" for c in snap.concursos[inicio:fim].tolist()],
+            "acertos": acertos.tolist(),
             "resumo": {
-                "quadras": len([r for r in resultados if r["acertos"] == 4]),
-                "quinas": len([r for r in resultados if r["acertos"] == 5]),
-                "senas": len([r for r in resultados if r["acertos"] == 6])
+                "concursos_avaliados": avaliados,
+                "quadras": int(histograma[0, 4]),
+                "quinas": int(histograma[0, 5]),
+                "senas": int(histograma[0, 6])
             }
         }
     except Exception as e:
         return {"erro": str(e)}
     
 @app.get("/api/ranking")
-async def get_ranking():
+def get_ranking(concurso_inicio: int | None = None, concurso_fim: int | None = None, janela_recente: int = 20):
     try:
-        dados = processar_todas_estrategias()
+        dados = processar_todas_estrategias(janela_recente=janela_recente)
         # Unificamos todas as estratégias em um único dicionário para testar
         todas_estrategias = {**dados["base"], **dados["meta"]}
+        nomes = list(todas_estrategias)
+
+        # Todas as estratégias contra todo o intervalo (padrão: histórico inteiro) de uma vez
+        histograma, avaliados = simular_performance_lote(
+            [todas_estrategias[n] for n in nomes], concurso_inicio, concurso_fim
+        )
+        total_acertos = histograma @ np.arange(7)
         
         ranking = []
         
-        for nome, palpite in todas_estrategias.items():
-            resultados = simular_performance(palpite)
-            total_acertos = sum([r["acertos"] for r in resultados])
-            quadras = len([r for r in resultados if r["acertos"] == 4])
-            
+        for i, nome in enumerate(nomes):
             ranking.append({
                 "estrategia": nome,
-                "pontuacao_total": total_acertos,
-                "quadras": quadras,
-                "palpite": palpite
+                "pontuacao_total": int(total_acertos[i]),
+                "quadras": int(histograma[i, 4]),
+                "quinas": int(histograma[i, 5]),
+                "senas": int(histograma[i, 6]),
+                "concursos_avaliados": avaliados,
+                "palpite": todas_estrategias[nome]
             })
             
         # Ordena pelo maior número de acertos totais
@@ -184,26 +354,25 @@ async def get_ranking():
         return {"erro": str(e)}
     
 @app.get("/api/ultimo-resumo")
-async def get_ultimo_resumo():
+def get_ultimo_resumo():
     try:
-        conn = conectar_banco()
-        cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) # Retorna como dicionário
+        with conectar_banco() as conn:
+            cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) # Retorna como dicionário
         
-        cur.execute("""
-            SELECT concurso, data_sorteio, bola1, bola2, bola3, bola4, bola5, bola6,
-                   ganhadores_sena, ganhadores_quina, ganhadores_quadra, 
-                   valor_estimado_proximo, acumulou
-            FROM sorteios ORDER BY concurso DESC LIMIT 1
-        """)
-        resumo = cur.fetchone()
-        cur.close()
-        conn.close()
+            cur.execute("""
+                SELECT concurso, data_sorteio, bola1, bola2, bola3, bola4, bola5, bola6,
+                       ganhadores_sena, ganhadores_quina, ganhadores_quadra, 
+                       valor_estimado_proximo, acumulou
+                FROM sorteios ORDER BY concurso DESC LIMIT 1
+            """)
+            resumo = cur.fetchone()
+            cur.close()
         return resumo
     except Exception as e:
         return {"erro": str(e)}
     
 @app.get("/api/estimativa-satelite/{concurso}")
-async def get_estimativa_satelite(concurso: int):
+def get_estimativa_satelite(concurso: int):
     try:
         from main import analisar_ancoras_sorteio
         numeros = analisar_ancoras_sorteio(concurso)
@@ -212,202 +381,105 @@ async def get_estimativa_satelite(concurso: int):
     except Exception as e:
         return {"erro": str(e)}
     
+def _resposta_job(tarefa, criada):
+    return {
+        "status": "enfileirado" if criada else "em_andamento",
+        "job_id": tarefa.id,
+        "acompanhar": f"/api/jobs/{tarefa.id}"
+    }
+
 @app.post("/api/sync-data")
-async def sync_data():
-    try:
-        # 1. Roda o sync.py para baixar o sorteio mais recente da Caixa
-        subprocess.run(["python", "sync.py"], check=True)
-        
-        # 2. Importa as ferramentas de inteligência do main.py
-        from main import (
-            conectar_banco, 
-            processar_aprendizado_reforco, 
-            processar_matriz_afinidade, 
-            otimizar_pesos_convergencia,
-            processar_todas_estrategias
-        )
-        
-        # 3. APRENDIZADO: A máquina olha o que previu e compara com o que saiu
-        # Ela ajusta a sensibilidade se houve erro no concurso anterior
-        processar_aprendizado_reforco()
-        
-        # 4. ATUALIZAÇÃO ESTATÍSTICA: Recalcula Afinidades e Popularidade
-        processar_matriz_afinidade()
-        
-        # 5. CALIBRAGEM: Roda o Backtest com foco em Quadra/Quina/Sena
-        config_otimizada = otimizar_pesos_convergencia()
-        
-        # 6. REGISTRO DE FUTURO: Salva o novo palpite para conferir no próximo sync
-        # Isso cria a 'memória' para o aprendizado do próximo sorteio
-        dados_novos = processar_todas_estrategias()
-        palpite_ia = dados_novos["meta"]["Alta Convergência"]
-        
-        # Pega o próximo número de concurso (último + 1)
-        conn = conectar_banco()
-        cur = conn.cursor()
-        cur.execute("SELECT MAX(concurso) FROM sorteios")
-        ultimo_concurso = cur.fetchone()[0]
-        proximo_concurso = ultimo_concurso + 1
-        
-        # Salva na tabela de histórico para a máquina conferir depois
-        import json
-        cur.execute("""
-            INSERT INTO historico_previsoes (concurso_alvo, dezenas_previstas, pesos_utilizados)
-            VALUES (%s, %s, %s)
-        """, (proximo_concurso, palpite_ia, json.dumps(config_otimizada)))
-        
-        conn.commit()
-        cur.close()
-        conn.close()
-        
-        return {
-            "status": "success", 
-            "message": f"Sincronizado! A máquina analisou o concurso {ultimo_concurso}, recalibrou os pesos e já projetou o concurso {proximo_concurso}."
-        }
-    except Exception as e:
-        return {"status": "error", "message": f"Falha no ciclo de aprendizado: {str(e)}"}
+def sync_data():
+    # O ciclo completo leva minutos: roda como job e o navegador acompanha por /api/jobs/{id}.
+    # Um segundo sync disparado durante a execução reaproveita o job existente.
+    tarefa, criada = enfileirar("sync", executar_ciclo_aprendizado, estagios_previstos=ESTAGIOS_SYNC)
+    return _resposta_job(tarefa, criada)
     
 @app.get("/api/auditoria-ia")
-async def get_auditoria_ia():
+def get_auditoria_ia():
     try:
-        conn = conectar_banco()
-        cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        with conectar_banco() as conn:
+            cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
         
-        cur.execute("""
-            SELECT DISTINCT ON (h.concurso_alvo) 
-                   h.concurso_alvo, h.dezenas_previstas, h.pesos_utilizados,
-                   s.bola1, s.bola2, s.bola3, s.bola4, s.bola5, s.bola6
-            FROM historico_previsoes h
-            LEFT JOIN sorteios s ON h.concurso_alvo = s.concurso
-            ORDER BY h.concurso_alvo DESC LIMIT 2
-        """)
-        dados = cur.fetchall()
+            cur.execute("""
+                SELECT DISTINCT ON (h.concurso_alvo) 
+                       h.concurso_alvo, h.dezenas_previstas, h.pesos_utilizados,
+                       s.bola1, s.bola2, s.bola3, s.bola4, s.bola5, s.bola6
+                FROM historico_previsoes h
+                LEFT JOIN sorteios s ON h.concurso_alvo = s.concurso
+                ORDER BY h.concurso_alvo DESC LIMIT 2
+            """)
+            dados = cur.fetchall()
         
-        primos_ref = [2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41, 43, 47, 53, 59]
-        relatorio = []
-
-        def calcular_metadados(nums):
-            if not nums or any(n is None for n in nums) or sum(nums) == 0:
-                return None
-            soma = sum(nums)
-            pares = len([n for n in nums if n % 2 == 0])
-            primos = len([n for n in nums if n in primos_ref])
-            return {"soma": soma, "paridade": f"{pares}P/{6-pares}I", "primos": primos}
-
-        for d in dados:
-            real_nums = [d['bola1'], d['bola2'], d['bola3'], d['bola4'], d['bola5'], d['bola6']]
-            tem_resultado = all(v is not None for v in real_nums)
-            previstos = d['dezenas_previstas']
+            def jogo_valido(nums):
+                return bool(nums) and len(nums) == 6 and all(n is not None for n in nums) and sum(nums) > 0
+
+            # Metadados (soma, paridade, primos, filtros) de todos os jogos em uma passada vetorizada
+            jogos = []
+            for d in dados:
+                jogos.append(d['dezenas_previstas'])
+                jogos.append([d['bola1'], d['bola2'], d['bola3'], d['bola4'], d['bola5'], d['bola6']])
+            validos = [j for j in jogos if jogo_valido(j)]
+            metadados = iter(metadados_lote(validos) if validos else [])
+            meta_por_jogo = [next(metadados) if jogo_valido(j) else None for j in jogos]
+            relatorio = []
+
+            for i, d in enumerate(dados):
+                real_nums = [d['bola1'], d['bola2'], d['bola3'], d['bola4'], d['bola5'], d['bola6']]
+                tem_resultado = all(v is not None for v in real_nums)
+                previstos = d['dezenas_previstas']
             
-            acertos_lista = list(set(previstos).intersection(set(real_nums))) if tem_resultado else []
+                acertos_lista = dezenas_da_mascara(mascara(previstos) & mascara(real_nums)) if tem_resultado else []
             
-            relatorio.append({
-                "concurso": d['concurso_alvo'],
-                "real": real_nums if tem_resultado else [0,0,0,0,0,0],
-                "previsto": previstos,
-                "acertos": acertos_lista,
-                "porcentagem": round((len(acertos_lista) / 6) * 100, 1) if tem_resultado else 0,
-                "faixa": "SENA!" if len(acertos_lista) == 6 else "QUINA!" if len(acertos_lista) == 5 else "QUADRA!" if len(acertos_lista) == 4 else "Terno" if len(acertos_lista) == 3 else "Nenhuma",
-                "tem_resultado": tem_resultado,
-                "meta_ia": calcular_metadados(previstos),
-                "meta_real": calcular_metadados(real_nums) if tem_resultado else None,
-                "pesos": d['pesos_utilizados']
-            })
+                relatorio.append({
+                    "concurso": d['concurso_alvo'],
+                    "real": real_nums if tem_resultado else [0,0,0,0,0,0],
+                    "previsto": previstos,
+                    "acertos": acertos_lista,
+                    "porcentagem": round((len(acertos_lista) / 6) * 100, 1) if tem_resultado else 0,
+                    "faixa": "SENA!" if len(acertos_lista) == 6 else "QUINA!" if len(acertos_lista) == 5 else "QUADRA!" if len(acertos_lista) == 4 else "Terno" if len(acertos_lista) == 3 else "Nenhuma",
+                    "tem_resultado": tem_resultado,
+                    "meta_ia": meta_por_jogo[2 * i],
+                    "meta_real": meta_por_jogo[2 * i + 1] if tem_resultado else None,
+                    "pesos": d['pesos_utilizados']
+                })
             
-        cur.close()
-        conn.close()
+            cur.close()
         return relatorio
     except Exception as e:
         return {"erro": str(e)}
     
-@app.post("/api/sync-data")
-async def sync_data():
-    try:
-        # 1. Download de dados novos
-        subprocess.run(["python", "sync.py"], check=True)
-        
-        from main import (
-            conectar_banco, 
-            processar_aprendizado_reforco, 
-            processar_matriz_afinidade, 
-            otimizar_pesos_convergencia,
-            obter_analise_sql,
-            obter_dezenas_por_popularidade,
-            obter_matriz_vizinhanca_historica,
-            obter_dezenas_momentum,
-            gerar_alta_convergencia_filtrada,
-            ZONAS_SILENCIOSAS
-        )
-        from collections import Counter
-        import json
-
-        # 2. Aprendizado com o erro do sorteio que acabou de sair
-        processar_aprendizado_reforco()
-        
-        # 3. Atualização das tabelas de suporte
-        processar_matriz_afinidade()
-        
-        # 4. Calibragem de Pesos (Backtest focado em Quadra/Quina)
-        config = otimizar_pesos_convergencia()
-        
-        # 5. GERAÇÃO DO PALPITE DE ELITE FILTRADO
-        hist, _, _ = obter_analise_sql()
-        pesos_final = Counter()
-        
-        # Aplicamos a mesma lógica de camadas do processar_todas_estrategias
-        for n in obter_dezenas_por_popularidade(top=15): pesos_final[n] += config["pop"]
-        for n in obter_matriz_vizinhanca_historica(top=10): pesos_final[n] += config["som"]
-        for n in ZONAS_SILENCIOSAS: pesos_final[n] += config["sil"]
-        for n in obter_dezenas_momentum(): pesos_final[n] += config["mom"]
-        
-        # AQUI ESTÁ A MUDANÇA: O palpite agora é filtrado pelas novas variáveis
-        palpite_ia_filtrado = gerar_alta_convergencia_filtrada(pesos_final)
-        
-        # 6. Registro do Futuro na Tabela de Auditoria
-        conn = conectar_banco()
-        cur = conn.cursor()
-        cur.execute("SELECT MAX(concurso) FROM sorteios")
-        proximo_concurso = cur.fetchone()[0] + 1
-        
-        cur.execute("""
-            INSERT INTO historico_previsoes (concurso_alvo, dezenas_previstas, pesos_utilizados)
-            VALUES (%s, %s, %s)
-            ON CONFLICT (concurso_alvo) DO UPDATE SET 
-                dezenas_previstas = EXCLUDED.dezenas_previstas,
-                pesos_utilizados = EXCLUDED.pesos_utilizados;
-        """, (proximo_concurso, palpite_ia_filtrado, json.dumps(config)))
-        
-        conn.commit()
-        cur.close()
-        conn.close()
-        
-        return {"status": "success", "message": "Ciclo completo de IA concluído com filtros de elite!"}
-    except Exception as e:
-        return {"status": "error", "message": str(e)}
-    
 @app.post("/api/executar-stress-test")
-async def rodar_stress():
-    try:
-        # Chamamos a função de processamento que você já validou no console
-        # Ela deve retornar um dicionário com os resultados
-        resultados = stress_test.executar_simulacao_completa(qtd_concursos=50)
-        return resultados
-    except Exception as e:
-        return {"status": "error", "message": str(e)}
+def rodar_stress(qtd_concursos: int = 50):
+    # O backtest roda em memória: o histórico inteiro (~3000 concursos) leva segundos
+    # Mesma quantidade em andamento reaproveita o job; outra quantidade é um job novo
+    tarefa, criada = enfileirar("stress_test", executar_stress_test, qtd_concursos=qtd_concursos,
+                                estagios_previstos=ESTAGIOS_STRESS)
+    return _resposta_job(tarefa, criada)
+
+@app.get("/api/jobs/{job_id}")
+def obter_job(job_id: str):
+    tarefa = obter_tarefa(job_id)
+    if tarefa is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return tarefa.como_dict()
+
+@app.get("/api/jobs")
+def get_jobs():
+    return listar_tarefas()
     
 @app.get("/api/historico-stress")
-async def obter_historico_stress():
+def obter_historico_stress():
     try:
-        conn = conectar_banco()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT data_execucao, media_acertos, total_quadras, total_quinas, total_senas
-            FROM auditoria_stress 
-            ORDER BY data_execucao DESC LIMIT 5
-        """)
-        rows = cur.fetchall()
-        cur.close()
-        conn.close()
+        with conectar_banco() as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                SELECT data_execucao, media_acertos, total_quadras, total_quinas, total_senas
+                FROM auditoria_stress 
+                ORDER BY data_execucao DESC LIMIT 5
+            """)
+            rows = cur.fetchall()
+            cur.close()
         
         historico = []
         for r in rows:
@@ -424,7 +496,7 @@ async def obter_historico_stress():
 async def get_comparativo_ia():
     try:
         # Rodamos o teste nos últimos 15 concursos para não pesar o carregamento
-        resultados = stress_test_neural_v2(n_concursos=15)
+        resultados = await em_processo(stress_test_neural_v2, 15)
         
         # Formatamos para o Chart.js
         return {
@@ -435,5 +507,24 @@ async def get_comparativo_ia():
     except Exception as e:
         return {"erro": str(e)}
     
+@app.get("/api/diagnostico")
+async def get_diagnostico():
+    # Contadores do pool de conexões e do cache de estratégias, para dimensionamento sob carga
+    return {
+        "pool_conexoes": estatisticas_pool(),
+        "cache_estrategias": estatisticas_cache(),
+        "executores": {"threads_io": API_THREADS_IO, "processos_cpu": API_PROCESSOS_CPU}
+    }
+
+@app.on_event("startup")
+async def configurar_executores():
+    anyio.to_thread.current_default_thread_limiter().total_tokens = API_THREADS_IO
+
+@app.on_event("shutdown")
+def encerrar_recursos():
+    encerrar_tarefas()
+    _pool_cpu.shutdown(wait=False, cancel_futures=True)
+    fechar_pool()
+    
 if __name__ == "__main__":
     uvicorn.run(app, host="127.0.0.1", port=8000)
\ No newline at end of file
@@ -0,0 +1,107 @@
+import argparse
+import csv
+import json
+import random
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- API DE RESULTADOS FALSA (DESENVOLVIMENTO E TESTES) ---
+# Serve os concursos de um CSV (padrão: resultados.csv) no mesmo formato da
+# API pública: /api/megasena (todos), /api/megasena/latest e /api/megasena/<n>.
+# `ate` limita o "último concurso publicado" e `falhas` devolve 503 numa
+# fração das requisições, para exercitar as retentativas do sync.
+# Uso: python api_falsa.py --ate 2950 --falhas 0.2
+#      LOTERIAS_API_URL=http://127.0.0.1:8765/api/megasena python sync.py
+
+_ROTA = re.compile(r"^/api/megasena(?:/(latest|\d+))?/?$")
+
+
+def carregar_fixtures(caminho_csv="resultados.csv"):
+    """CSV do histórico -> {concurso: payload no formato da API}."""
+    fixtures = {}
+    with open(caminho_csv, encoding="utf-8-sig", newline="") as arquivo:
+        leitor = csv.DictReader(arquivo)
+        leitor.fieldnames = [c.strip() for c in leitor.fieldnames]
+        for linha in leitor:
+            concurso = int(linha["Concurso"])
+            fixtures[concurso] = {
+                "concurso": concurso,
+                "data": linha["Data"],
+                "dezenas": [f"{int(linha[f'bola {i}']):02d}" for i in range(1, 7)],
+                "premiacoes": [{"ganhadores": 0}, {"ganhadores": 0}, {"ganhadores": 0}],
+                "acumulou": True,
+                "valorEstimadoProximoConcurso": 0,
+            }
+    return fixtures
+
+
+def criar_servidor(fixtures, porta=8765, ate=None, falhas=0.0, semente=None):
+    """
+    Servidor HTTP (ainda parado) sobre as fixtures. `servidor.requisicoes`
+    conta os acessos, `servidor.falhas_simuladas` os 503 devolvidos e
+    `servidor.entregues` lista os concursos servidos individualmente.
+    """
+    ultimo = max(c for c in fixtures if ate is None or c <= ate)
+    rng = random.Random(semente)
+
+    class Manipulador(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _responder(self, status, corpo):
+            dados = json.dumps(corpo).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(dados)))
+            self.end_headers()
+            self.wfile.write(dados)
+
+        def do_GET(self):
+            with servidor.lock:
+                servidor.requisicoes += 1
+                falhar = rng.random() < falhas
+            rota = _ROTA.match(self.path)
+            if rota is None:
+                return self._responder(404, {"erro": "rota inexistente"})
+            if falhar:
+                with servidor.lock:
+                    servidor.falhas_simuladas += 1
+                return self._responder(503, {"erro": "falha simulada"})
+            alvo = rota.group(1)
+            if alvo is None:
+                return self._responder(200, [fixtures[c] for c in sorted(fixtures) if c <= ultimo])
+            concurso = ultimo if alvo == "latest" else int(alvo)
+            if concurso > ultimo or concurso not in fixtures:
+                return self._responder(404, {"erro": f"concurso {concurso} não encontrado"})
+            if alvo != "latest":
+                with servidor.lock:
+                    servidor.entregues.append(concurso)
+            self._responder(200, fixtures[concurso])
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", porta), Manipulador)
+    servidor.lock = threading.Lock()
+    servidor.requisicoes = 0
+    servidor.falhas_simuladas = 0
+    servidor.entregues = []
+    return servidor
+
+
+def iniciar_em_thread(fixtures=None, porta=0, **opcoes):
+    """Sobe o servidor em segundo plano (porta 0 = qualquer livre) e devolve (servidor, url_base)."""
+    servidor = criar_servidor(fixtures if fixtures is not None else carregar_fixtures(), porta, **opcoes)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f"http://127.0.0.1:{servidor.server_address[1]}/api/megasena"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API de resultados falsa servindo fixtures de um CSV")
+    parser.add_argument("--csv", default="resultados.csv")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--ate", type=int, help="último concurso publicado (padrão: o último do CSV)")
+    parser.add_argument("--falhas", type=float, default=0.0, help="fração das requisições que responde 503")
+    args = parser.parse_args()
+
+    servidor = criar_servidor(carregar_fixtures(args.csv), args.porta, args.ate, args.falhas)
+    print(f"API falsa em http://127.0.0.1:{args.porta}/api/megasena")
+    servidor.serve_forever()
@@ -0,0 +1,190 @@
+from bisect import bisect_right
+
+import numpy as np
+import psycopg2.extras
+
+# --- TABELA DE ATRASOS (GAPS) POR DEZENA ---
+# Para cada dezena: último concurso em que saiu, maior atraso, soma e
+# quantidade de intervalos (atraso médio) e o histórico completo de aparições.
+# Um sorteio novo mexe só nas suas 6 dezenas (O(6)); o atraso atual de cada
+# uma é calculado na leitura (último concurso - último visto). A tabela
+# atraso_dezenas (60 linhas) espelha isso no banco e a view v_atraso_numeros
+# passa a ler dela. O espelho em memória é o do snapshot compartilhado, que
+# só enxerga sorteios já confirmados (um rollback não o deixa adiantado).
+
+SQL_REGISTRAR = """
+    UPDATE atraso_dezenas SET
+        maior_atraso = CASE WHEN ultimo_concurso > 0
+                            THEN GREATEST(maior_atraso, %(concurso)s - ultimo_concurso)
+                            ELSE maior_atraso END,
+        soma_atrasos = soma_atrasos + CASE WHEN ultimo_concurso > 0
+                                           THEN %(concurso)s - ultimo_concurso ELSE 0 END,
+        qtd_intervalos = qtd_intervalos + (ultimo_concurso > 0)::int,
+        qtd_aparicoes = qtd_aparicoes + 1,
+        ultimo_concurso = %(concurso)s
+    WHERE numero = ANY(%(dezenas)s) AND ultimo_concurso < %(concurso)s
+"""
+
+SQL_GRAVAR = """
+    INSERT INTO atraso_dezenas (numero, ultimo_concurso, maior_atraso, soma_atrasos, qtd_intervalos, qtd_aparicoes)
+    VALUES %s
+    ON CONFLICT (numero) DO UPDATE SET
+        ultimo_concurso = EXCLUDED.ultimo_concurso,
+        maior_atraso = EXCLUDED.maior_atraso,
+        soma_atrasos = EXCLUDED.soma_atrasos,
+        qtd_intervalos = EXCLUDED.qtd_intervalos,
+        qtd_aparicoes = EXCLUDED.qtd_aparicoes
+"""
+
+
+class TabelaAtrasos:
+    """
+    Estatísticas de atraso por dezena (arrays indexados pela dezena, 1..60),
+    mais as aparições de cada uma para consultar qualquer concurso passado.
+    `registrar` acrescenta um sorteio.
+    """
+
+    def __init__(self):
+        self.ultimo_visto = np.zeros(61, dtype=np.int64)
+        self.maior_atraso = np.zeros(61, dtype=np.int64)
+        self.soma_atrasos = np.zeros(61, dtype=np.int64)
+        self.qtd_intervalos = np.zeros(61, dtype=np.int64)
+        self.aparicoes = [[] for _ in range(61)]   # concursos em que cada dezena saiu, crescentes
+        self.ultimo_concurso = 0
+
+    @classmethod
+    def de_sorteios(cls, concursos, dezenas):
+        """Tabela de um histórico inteiro ((N,) concursos crescentes, (N, 6) dezenas)."""
+        tabela = cls()
+        concursos = np.asarray(concursos, dtype=np.int64)
+        dezenas = np.asarray(dezenas)
+        for n in range(1, 61):
+            vistos = concursos[(dezenas == n).any(axis=1)]
+            if not len(vistos):
+                continue
+            intervalos = np.diff(vistos)
+            tabela.aparicoes[n] = vistos.tolist()
+            tabela.ultimo_visto[n] = vistos[-1]
+            tabela.maior_atraso[n] = intervalos.max() if len(intervalos) else 0
+            tabela.soma_atrasos[n] = intervalos.sum()
+            tabela.qtd_intervalos[n] = len(intervalos)
+        tabela.ultimo_concurso = int(concursos[-1]) if len(concursos) else 0
+        return tabela
+
+    def copia(self):
+        nova = TabelaAtrasos()
+        for nome in ("ultimo_visto", "maior_atraso", "soma_atrasos", "qtd_intervalos"):
+            setattr(nova, nome, getattr(self, nome).copy())
+        nova.aparicoes = [list(a) for a in self.aparicoes]
+        nova.ultimo_concurso = self.ultimo_concurso
+        return nova
+
+    def registrar(self, concurso, dezenas):
+        """Atualiza só as 6 dezenas do sorteio. Concursos fora de ordem exigem reconstruir."""
+        concurso = int(concurso)
+        if concurso <= self.ultimo_concurso:
+            raise ValueError(f"concurso {concurso} não é posterior ao último ({self.ultimo_concurso})")
+        for n in dezenas:
+            n = int(n)
+            if self.ultimo_visto[n] > 0:
+                intervalo = concurso - self.ultimo_visto[n]
+                self.maior_atraso[n] = max(self.maior_atraso[n], intervalo)
+                self.soma_atrasos[n] += intervalo
+                self.qtd_intervalos[n] += 1
+            self.ultimo_visto[n] = concurso
+            self.aparicoes[n].append(concurso)
+        self.ultimo_concurso = concurso
+
+    @property
+    def qtd_aparicoes(self):
+        return np.array([len(a) for a in self.aparicoes], dtype=np.int64)
+
+    def atraso_medio(self):
+        return np.divide(self.soma_atrasos, self.qtd_intervalos, out=np.zeros(61),
+                         where=self.qtd_intervalos > 0)
+
+    def atrasos_em(self, concurso=None):
+        """
+        (61,) atraso de cada dezena logo após o sorteio `concurso` (padrão: o
+        último), como v_atraso_numeros teria mostrado naquele momento.
+        """
+        if concurso is None:
+            return self.ultimo_concurso - self.ultimo_visto
+        atrasos = np.zeros(61, dtype=np.int64)
+        for n in range(1, 61):
+            i = bisect_right(self.aparicoes[n], concurso)
+            atrasos[n] = concurso - (self.aparicoes[n][i - 1] if i else 0)
+        return atrasos
+
+    def momentum(self, concurso=None, min_atraso=3, max_atraso=15, top=10):
+        """Mesma regra de SnapshotHistorico.momentum, em qualquer concurso passado."""
+        atrasos = self.atrasos_em(concurso)
+        numeros = np.arange(1, 61)
+        ordem = np.lexsort((numeros, atrasos[1:]))
+        return [int(numeros[i]) for i in ordem if min_atraso <= atrasos[i + 1] <= max_atraso][:top]
+
+    def historico_atrasos(self, numero):
+        """Todos os intervalos (em concursos) entre aparições seguidas da dezena."""
+        return np.diff(self.aparicoes[numero]).tolist()
+
+    def linhas(self):
+        """Linhas de atraso_dezenas: (numero, ultimo_concurso, maior, soma, intervalos, aparicoes)."""
+        aparicoes = self.qtd_aparicoes
+        return [(n, int(self.ultimo_visto[n]), int(self.maior_atraso[n]), int(self.soma_atrasos[n]),
+                 int(self.qtd_intervalos[n]), int(aparicoes[n])) for n in range(1, 61)]
+
+    def resumo(self, concurso=None):
+        """Uma entrada por dezena com atraso atual (no `concurso`), maior e médio."""
+        atuais = self.atrasos_em(concurso)
+        medios = self.atraso_medio()
+        return [{"numero": n, "atraso_atual": int(atuais[n]), "maior_atraso": int(self.maior_atraso[n]),
+                 "atraso_medio": round(float(medios[n]), 2), "aparicoes": len(self.aparicoes[n])}
+                for n in range(1, 61)]
+
+
+def reconstruir_tabela_atrasos(cur):
+    """
+    Recalcula atraso_dezenas a partir de todos os sorteios (carga inicial,
+    migrações ou concurso inserido fora de ordem). Usa o cursor de quem chama
+    para enxergar linhas ainda não confirmadas na mesma transação.
+    """
+    cur.execute("SELECT concurso, bola1, bola2, bola3, bola4, bola5, bola6 FROM sorteios ORDER BY concurso")
+    linhas = cur.fetchall()
+    tabela = TabelaAtrasos.de_sorteios([l[0] for l in linhas], np.array([l[1:7] for l in linhas]).reshape(-1, 6))
+    psycopg2.extras.execute_values(cur, SQL_GRAVAR, tabela.linhas())
+    return tabela
+
+
+def registrar_sorteio_atrasos(cur, concurso, dezenas):
+    """
+    Chamado logo após inserir um sorteio, na mesma transação: atualiza as 6
+    linhas das dezenas sorteadas. Se o concurso não for posterior ao último
+    registrado (inserção fora de ordem), reconstrói a tabela inteira.
+    """
+    concurso = int(concurso)
+    dezenas = [int(n) for n in dezenas]
+    cur.execute("SELECT COALESCE(MAX(ultimo_concurso), 0), COUNT(*) FROM atraso_dezenas")
+    ultimo, linhas = cur.fetchone()
+    if linhas < 60 or concurso < ultimo:
+        reconstruir_tabela_atrasos(cur)
+        return
+    if concurso == ultimo:
+        return  # mesmo concurso sincronizado de novo: nada muda
+
+    cur.execute(SQL_REGISTRAR, {"concurso": concurso, "dezenas": dezenas})
+
+
+def obter_tabela_atrasos():
+    """Espelho em memória (com os históricos de aparição), do snapshot compartilhado."""
+    from historico import obter_snapshot
+    return obter_snapshot().tabela_atrasos
+
+
+if __name__ == "__main__":
+    from banco import conectar_banco
+    with conectar_banco() as conn:
+        cur = conn.cursor()
+        tabela = reconstruir_tabela_atrasos(cur)
+        conn.commit()
+        cur.close()
+    print(f"atraso_dezenas reconstruída até o concurso {tabela.ultimo_concurso}.")
@@ -0,0 +1,120 @@
+from collections import Counter
+
+import numpy as np
+
+from afinidade import MatrizAfinidade
+from historico import SnapshotHistorico
+from mascaras import contar_acertos, mascara
+from main import ZONAS_SILENCIOSAS, gerar_alta_convergencia_filtrada, validar_palpites_elite_lote
+from otimizador import CAMADAS, buscar_melhores_pesos
+
+# --- MOTOR DE BACKTEST PONTO-NO-TEMPO ---
+# Caminha pelo histórico em memória: para prever o concurso i só enxerga os
+# sorteios 0..i-1 (sem lookahead) e nunca escreve no banco. As estatísticas
+# das camadas são atualizadas sorteio a sorteio, em vez de recalculadas.
+
+# Grade mais enxuta que a da calibragem diária (5^5 = 3.125 combinações),
+# para que o histórico inteiro rode em segundos; passe `faixas` para mudar.
+FAIXAS_BACKTEST = {c: [1.0, 2.0, 3.0, 4.0, 5.0] for c in CAMADAS}
+
+
+class EstadoCamadas:
+    """
+    Contadores incrementais que reproduzem as camadas do SnapshotHistorico
+    para um prefixo do histórico. `absorver` acrescenta um sorteio.
+    """
+
+    def __init__(self):
+        self.frequencia = np.zeros(61, dtype=np.int64)
+        self.contagem_populares = np.zeros(61, dtype=np.int64)
+        self.afinidade = MatrizAfinidade()
+        self.ultimo_visto = np.zeros(61, dtype=np.int64)
+        self.ultimo_concurso = 0
+
+    @classmethod
+    def de_prefixo(cls, snap, fim):
+        """Estado equivalente a ter absorvido os sorteios [0, fim) de uma vez."""
+        estado = cls()
+        if fim <= 0:
+            return estado
+        prefixo = snap.dezenas[:fim].astype(np.intp)
+        pop = snap.popularidade[:fim]
+        estado.frequencia = SnapshotHistorico._contar(prefixo)
+        estado.contagem_populares = SnapshotHistorico._contar(prefixo[pop >= 1.2])
+        estado.afinidade = MatrizAfinidade.de_sorteios(prefixo, pop)
+        estado.ultimo_visto[prefixo] = snap.concursos[:fim, None]
+        estado.ultimo_concurso = int(snap.concursos[fim - 1])
+        return estado
+
+    def absorver(self, concurso, dezenas, popularidade):
+        dezenas = np.asarray(dezenas, dtype=np.intp)
+        self.frequencia[dezenas] += 1
+        if popularidade >= 1.2:
+            self.contagem_populares[dezenas] += 1
+        self.afinidade.absorver(dezenas, popularidade)
+        self.ultimo_visto[dezenas] = concurso
+        self.ultimo_concurso = int(concurso)
+
+    def camadas(self):
+        """Mesmas camadas usadas por otimizar_pesos_convergencia."""
+        ranking = SnapshotHistorico._ranking
+        atraso = self.ultimo_concurso - self.ultimo_visto
+        return {
+            "pop": [n for n, c in ranking(self.contagem_populares) if c > 0][:15],
+            "som": SnapshotHistorico.vizinhanca_de(self.afinidade, 10),
+            "sil": ZONAS_SILENCIOSAS,
+            "ruido": [n for n, c in ranking(self.frequencia) if c > 0][:10],
+            "mom": [n for n, a in ranking(atraso, desc=False) if 3 <= a <= 15][:10],
+        }
+
+
+def palpite_das_camadas(camadas, config):
+    """Motor de pontuação (Counter na ordem das camadas) + filtros de elite."""
+    pesos_final = Counter()
+    for nome in CAMADAS:
+        for n in camadas[nome]:
+            pesos_final[n] += config[nome]
+    return gerar_alta_convergencia_filtrada(pesos_final)
+
+
+def executar_backtest(snap, inicio=None, fim=None, limite_backtest=10, faixas=None, progresso=None):
+    """
+    Simula os concursos de índice [inicio, fim) do snapshot. Para cada um,
+    calibra os pesos nos `limite_backtest` sorteios anteriores e gera o
+    palpite apenas com o passado. Retorna uma linha de log por concurso.
+    Cada concurso depende só do histórico anterior a ele (os empates da
+    calibragem vão para PESOS_PADRAO, não para os pesos do passo anterior),
+    então qualquer fatiamento em shards dá o mesmo log.
+    """
+    fim = len(snap) if fim is None else min(fim, len(snap))
+    # Precisa de ao menos `limite_backtest` sorteios anteriores para calibrar
+    inicio = max(limite_backtest, 0 if inicio is None else inicio)
+    faixas = FAIXAS_BACKTEST if faixas is None else faixas
+
+    estado = EstadoCamadas.de_prefixo(snap, inicio)
+    log = []
+    total = max(0, fim - inicio)
+
+    for passo, i in enumerate(range(inicio, fim), start=1):
+        camadas = estado.camadas()
+        config, _, _ = buscar_melhores_pesos(camadas, snap.dezenas[i - limite_backtest:i], faixas, processos=1)
+        palpite = palpite_das_camadas(camadas, config)
+
+        log.append({
+            "concurso": int(snap.concursos[i]),
+            "acertos": int(contar_acertos(mascara(palpite), snap.mascaras[i])),
+            "filtros": None,
+            "palpite": [int(n) for n in palpite],
+            "pesos": config,
+        })
+
+        # Só depois de prever o concurso i ele entra nas estatísticas
+        estado.absorver(snap.concursos[i], snap.dezenas[i], snap.popularidade[i])
+        if progresso:
+            progresso(passo, total)
+
+    # Conformidade aos filtros de todos os palpites numa validação só
+    if log:
+        for linha, valido in zip(log, validar_palpites_elite_lote([l["palpite"] for l in log])):
+            linha["filtros"] = "OK" if valido else "FALHA"
+    return log
@@ -0,0 +1,202 @@
+import argparse
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from banco import conectar_banco
+from backtest import FAIXAS_BACKTEST, executar_backtest
+from historico import carregar_snapshot
+from otimizador import FAIXAS_PADRAO
+
+# --- WALK-FORWARD PARALELO EM SHARDS ---
+# Cada concurso do backtest só depende do histórico anterior a ele, então a
+# faixa de concursos pode ser fatiada em shards independentes. Os shards rodam
+# num pool de processos (mesma máquina) ou como invocações separadas da CLI
+# gravando arquivos JSON (várias máquinas), e depois são mesclados no mesmo
+# resumo da auditoria_stress.
+
+BACKTEST_PROCESSOS = int(os.getenv("BACKTEST_PROCESSOS", str(os.cpu_count() or 1)))
+# Mais shards que processos: equilibra a carga e dá um progresso mais fino
+SHARDS_POR_PROCESSO = 4
+# Abaixo disso o custo de subir os processos supera o ganho
+_MIN_CONCURSOS_PARALELO = 200
+
+GRADES = {"backtest": FAIXAS_BACKTEST, "completa": FAIXAS_PADRAO}
+
+
+def dividir_shards(inicio, fim, qtd_shards):
+    """Fatia [inicio, fim) em até `qtd_shards` intervalos contíguos."""
+    qtd_shards = max(1, min(qtd_shards, fim - inicio))
+    limites = [inicio + (fim - inicio) * k // qtd_shards for k in range(qtd_shards + 1)]
+    return [(a, b) for a, b in zip(limites, limites[1:]) if b > a]
+
+
+def _executar_shard(snap, inicio, fim, faixas, limite_backtest):
+    return executar_backtest(snap, inicio=inicio, fim=fim, limite_backtest=limite_backtest, faixas=faixas)
+
+
+def executar_backtest_paralelo(snap, inicio=None, fim=None, processos=None, faixas=None,
+                               limite_backtest=10, progresso=None):
+    """
+    Mesmo resultado de backtest.executar_backtest, dividido em shards que rodam
+    em `processos` processos. O snapshot é carregado uma vez e enviado aos
+    workers, que não tocam no banco.
+    """
+    fim = len(snap) if fim is None else min(fim, len(snap))
+    inicio = max(limite_backtest, 0 if inicio is None else inicio)
+    processos = BACKTEST_PROCESSOS if processos is None else processos
+    total = max(0, fim - inicio)
+
+    if processos <= 1 or total < _MIN_CONCURSOS_PARALELO:
+        return executar_backtest(snap, inicio=inicio, fim=fim, limite_backtest=limite_backtest,
+                                 faixas=faixas, progresso=progresso)
+
+    shards = dividir_shards(inicio, fim, processos * SHARDS_POR_PROCESSO)
+    resultados = []
+    # spawn: seguro mesmo quando chamado de dentro das threads da API
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=processos, mp_context=contexto) as executor:
+        futuros = [executor.submit(_executar_shard, snap, a, b, faixas, limite_backtest) for a, b in shards]
+        for futuro in as_completed(futuros):
+            resultados.append(futuro.result())
+            if progresso:
+                progresso(sum(len(r) for r in resultados), total)
+
+    return mesclar_logs(resultados)
+
+
+def mesclar_logs(logs):
+    """Junta os logs dos shards em ordem de concurso, recusando sobreposição."""
+    mesclado = sorted((linha for log in logs for linha in log), key=lambda l: l["concurso"])
+    concursos = [l["concurso"] for l in mesclado]
+    if len(concursos) != len(set(concursos)):
+        raise ValueError("Shards com concursos sobrepostos")
+    return mesclado
+
+
+def registrar_auditoria(log_performance):
+    """Resume o log por concurso e grava na auditoria_stress (com o detalhe em JSON)."""
+    df = pd.DataFrame(log_performance)
+
+    media = float(df['acertos'].mean()) if not df.empty else 0.0
+    quadras = int(len(df[df['acertos'] == 4]))
+    quinas = int(len(df[df['acertos'] == 5]))
+    senas = int(len(df[df['acertos'] == 6]))
+
+    print("\n" + "="*40)
+    print(f"📊 STRESS TEST CONCLUÍDO: Média {media:.2f} | Quadras: {quadras}")
+    print("="*40)
+
+    try:
+        with conectar_banco() as conn_audit:
+            cur_audit = conn_audit.cursor()
+            conformidade = (len(df[df['filtros'] == 'OK']) / len(df)) * 100 if not df.empty else 0
+
+            cur_audit.execute("""
+                INSERT INTO auditoria_stress
+                (qtd_concursos, media_acertos, total_quadras, total_quinas, total_senas, conformidade_filtros, historico_detalhado)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+            """, (
+                len(df), media, quadras, quinas, senas, conformidade,
+                json.dumps(log_performance)
+            ))
+
+            conn_audit.commit()
+            cur_audit.close()
+    except Exception as e:
+        print(f"❌ Erro ao salvar auditoria: {e}")
+
+    return {
+        "status": "success",
+        "media_acertos": media,
+        "total_quadras": quadras,
+        "total_quinas": quinas,
+        "total_senas": senas,
+        "historico": log_performance
+    }
+
+
+# --- SHARDS EM ARQUIVO (CLI) ---
+
+def salvar_shard(caminho, snap, log, grade, limite_backtest):
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump({
+            "ultimo_concurso_base": snap.ultimo_concurso,
+            "grade": grade,
+            "limite_backtest": limite_backtest,
+            "historico": log,
+        }, f)
+
+
+def mesclar_arquivos(caminhos):
+    """
+    Lê os arquivos de shard e devolve o log mesclado. Todos precisam ter sido
+    gerados sobre a mesma base (mesmo último concurso) e os mesmos parâmetros.
+    """
+    shards = []
+    for caminho in caminhos:
+        with open(caminho, encoding="utf-8") as f:
+            shards.append(json.load(f))
+
+    assinaturas = {(s["ultimo_concurso_base"], s["grade"], s["limite_backtest"]) for s in shards}
+    if len(assinaturas) > 1:
+        raise ValueError(f"Shards gerados com bases ou parâmetros diferentes: {sorted(assinaturas)}")
+    return mesclar_logs([s["historico"] for s in shards])
+
+
+def _faixa_de_indices(snap, args):
+    inicio = snap.indice_do_concurso(args.de) if args.de else None
+    fim = snap.indice_do_concurso(args.ate + 1) if args.ate else None
+    if args.ultimos:
+        inicio = max(0, len(snap) - args.ultimos)
+    return inicio, fim
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest walk-forward em shards paralelos")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    for nome in ("rodar", "shard"):
+        p = sub.add_parser(nome)
+        p.add_argument("--de", type=int, help="primeiro concurso simulado")
+        p.add_argument("--ate", type=int, help="último concurso simulado (inclusive)")
+        p.add_argument("--ultimos", type=int, help="simula só os N concursos mais recentes")
+        p.add_argument("--grade", choices=sorted(GRADES), default="backtest")
+        p.add_argument("--limite-backtest", type=int, default=10)
+        p.add_argument("--processos", type=int, default=None)
+    sub.choices["rodar"].add_argument("--salvar", action="store_true", help="grava na auditoria_stress")
+    sub.choices["shard"].add_argument("--saida", required=True, help="arquivo JSON do shard")
+
+    p = sub.add_parser("mesclar")
+    p.add_argument("arquivos", nargs="+")
+    p.add_argument("--salvar", action="store_true", help="grava na auditoria_stress")
+
+    args = parser.parse_args()
+
+    if args.comando == "mesclar":
+        log = mesclar_arquivos(args.arquivos)
+    else:
+        snap = carregar_snapshot()
+        inicio, fim = _faixa_de_indices(snap, args)
+        log = executar_backtest_paralelo(
+            snap, inicio, fim, args.processos, GRADES[args.grade], args.limite_backtest,
+            progresso=lambda atual, total: print(f"{atual}/{total} concursos", end="\r"),
+        )
+        if args.comando == "shard":
+            salvar_shard(args.saida, snap, log, args.grade, args.limite_backtest)
+            print(f"\nShard salvo em {args.saida}: {len(log)} concursos")
+            return
+
+    if args.salvar:
+        registrar_auditoria(log)
+    else:
+        acertos = [l["acertos"] for l in log]
+        print(f"\n{len(log)} concursos | Média {sum(acertos) / max(1, len(acertos)):.3f} | "
+              f"Quadras: {acertos.count(4)} | Quinas: {acertos.count(5)} | Senas: {acertos.count(6)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+import psycopg2.pool
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- CONFIGURAÇÃO DO POOL ---
+# Tamanhos ajustáveis via .env para dimensionar o pool sob carga
+POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+# Tempo máximo (s) que um pedido espera por uma conexão livre antes de falhar
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Conexões ociosas por mais tempo que isso recebem um "SELECT 1" antes do uso
+POOL_PING_OCIOSA = float(os.getenv("DB_POOL_PING_SEGUNDOS", "60"))
+
+_pool = None
+_pool_pid = None
+_vagas = None
+_ultimo_uso = {}
+_lock = threading.Lock()
+_stats = {
+    "checkouts": 0,
+    "em_uso": 0,
+    "pico_em_uso": 0,
+    "esperas": 0,
+    "tempo_espera_total": 0.0,
+    "descartadas": 0,
+    "timeouts": 0,
+}
+
+
+def _parametros_conexao():
+    return dict(
+        host=os.getenv("DB_HOST"),
+        database=os.getenv("DB_NAME"),
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASS"),
+        port=os.getenv("DB_PORT")
+    )
+
+
+def _obter_pool():
+    """Cria o pool sob demanda (um por processo, recriado após fork)."""
+    global _pool, _pool_pid, _vagas
+    pid = os.getpid()
+    if _pool is not None and _pool_pid == pid:
+        return _pool
+    with _lock:
+        if _pool is None or _pool_pid != pid:
+            # Conexões herdadas de outro processo não podem ser reutilizadas
+            _pool = psycopg2.pool.ThreadedConnectionPool(POOL_MIN, POOL_MAX, **_parametros_conexao())
+            _pool_pid = pid
+            _vagas = threading.BoundedSemaphore(POOL_MAX)
+            _ultimo_uso.clear()
+    return _pool
+
+
+def _conexao_saudavel(conn):
+    if conn.closed:
+        return False
+    ociosa = time.monotonic() - _ultimo_uso.get(id(conn), 0.0)
+    if ociosa < POOL_PING_OCIOSA:
+        return True
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+        conn.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+
+@contextmanager
+def conectar_banco():
+    """
+    Empresta uma conexão do pool do processo e a devolve ao sair do bloco.
+    Uso: `with conectar_banco() as conn:`. Em caso de erro a transação é
+    desfeita; conexões quebradas são descartadas em vez de voltarem ao pool.
+    """
+    pool = _obter_pool()
+    vagas = _vagas
+    inicio = time.monotonic()
+    if not vagas.acquire(blocking=False):
+        with _lock:
+            _stats["esperas"] += 1
+        if not vagas.acquire(timeout=POOL_TIMEOUT):
+            with _lock:
+                _stats["timeouts"] += 1
+            raise psycopg2.pool.PoolError(f"Nenhuma conexão livre após {POOL_TIMEOUT}s (DB_POOL_MAX={POOL_MAX})")
+
+    conn = None
+    try:
+        # Health check: troca conexões fechadas ou que não respondem
+        conn = pool.getconn()
+        if not _conexao_saudavel(conn):
+            pool.putconn(conn, close=True)
+            conn = None
+            with _lock:
+                _stats["descartadas"] += 1
+            conn = pool.getconn()
+
+        with _lock:
+            _stats["checkouts"] += 1
+            _stats["tempo_espera_total"] += time.monotonic() - inicio
+            _stats["em_uso"] += 1
+            _stats["pico_em_uso"] = max(_stats["pico_em_uso"], _stats["em_uso"])
+
+        try:
+            yield conn
+        except Exception:
+            if not conn.closed:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    pass
+            raise
+        finally:
+            with _lock:
+                _stats["em_uso"] -= 1
+    finally:
+        if conn is not None:
+            quebrada = bool(conn.closed)
+            if quebrada:
+                with _lock:
+                    _stats["descartadas"] += 1
+            else:
+                _ultimo_uso[id(conn)] = time.monotonic()
+            pool.putconn(conn, close=quebrada)
+        vagas.release()
+
+
+def estatisticas_pool():
+    """Retorna os contadores do pool para dimensionamento sob carga."""
+    with _lock:
+        stats = dict(_stats)
+    stats["min"] = POOL_MIN
+    stats["max"] = POOL_MAX
+    stats["ativo"] = _pool is not None and _pool_pid == os.getpid()
+    if stats["ativo"]:
+        stats["abertas"] = len(_pool._pool) + len(_pool._used)
+        stats["livres"] = len(_pool._pool)
+    else:
+        stats["abertas"] = stats["livres"] = 0
+    stats["tempo_espera_medio_ms"] = round(1000 * stats["tempo_espera_total"] / stats["checkouts"], 3) if stats["checkouts"] else 0.0
+    return stats
+
+
+def fechar_pool():
+    """Fecha todas as conexões do pool (encerramento do servidor)."""
+    global _pool
+    with _lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.closeall()
+        _pool = None
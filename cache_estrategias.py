@@ -0,0 +1,108 @@
+import copy
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from banco import conectar_banco
+from historico import ASSINATURA_SORTEIOS
+
+# Limites do cache (ajustáveis via .env)
+CACHE_TTL = float(os.getenv("CACHE_TTL_SEGUNDOS", "600"))
+CACHE_MAX_ITENS = int(os.getenv("CACHE_MAX_ITENS", "128"))
+
+_itens = OrderedDict()  # chave -> (expira_em, valor)
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "bypass": 0, "expirados": 0, "despejados": 0, "invalidacoes": 0}
+
+
+def versao_dados():
+    """
+    Versão atual dos dados que alimentam as estratégias: (MAX(concurso), versão
+    dos pesos, assinatura dos sorteios). Qualquer sorteio novo, edição de um
+    sorteio (cluster, popularidade) ou recalibragem muda a chave do cache.
+    """
+    with conectar_banco() as conn:
+        cur = conn.cursor()
+        cur.execute(f"""
+            SELECT (SELECT MAX(concurso) FROM sorteios),
+                   (SELECT ultima_atualizacao FROM configuracao_pesos WHERE id = 1),
+                   ({ASSINATURA_SORTEIOS})
+        """)
+        ultimo_concurso, versao_pesos, assinatura = cur.fetchone()
+        cur.close()
+    return (ultimo_concurso, str(versao_pesos), assinatura)
+
+
+def _ler(chave):
+    with _lock:
+        item = _itens.get(chave)
+        if item is None:
+            _stats["misses"] += 1
+            return None
+        expira_em, valor = item
+        if expira_em < time.monotonic():
+            del _itens[chave]
+            _stats["expirados"] += 1
+            _stats["misses"] += 1
+            return None
+        _itens.move_to_end(chave)
+        _stats["hits"] += 1
+        return item
+
+
+def _gravar(chave, valor):
+    with _lock:
+        _itens[chave] = (time.monotonic() + CACHE_TTL, valor)
+        _itens.move_to_end(chave)
+        while len(_itens) > CACHE_MAX_ITENS:
+            _itens.popitem(last=False)
+            _stats["despejados"] += 1
+
+
+def em_cache(func):
+    """
+    Memoriza o resultado da função por (nome, argumentos, versao_dados()).
+    Chamadas com argumentos não "hasheáveis" (ex.: um snapshot explícito)
+    passam direto, sem cache. Os valores são copiados na leitura para que
+    quem chama possa alterá-los à vontade.
+    """
+    @functools.wraps(func)
+    def envoltorio(*args, **kwargs):
+        try:
+            chave_args = (func.__qualname__, args, tuple(sorted(kwargs.items())))
+            hash(chave_args)
+        except TypeError:
+            with _lock:
+                _stats["bypass"] += 1
+            return func(*args, **kwargs)
+
+        chave = chave_args + (versao_dados(),)
+        item = _ler(chave)
+        if item is not None:
+            return copy.deepcopy(item[1])
+
+        valor = func(*args, **kwargs)
+        _gravar(chave, valor)
+        return copy.deepcopy(valor)
+
+    return envoltorio
+
+
+def invalidar_cache():
+    """Descarta tudo (chamado quando sorteios ou pesos mudam)."""
+    with _lock:
+        _itens.clear()
+        _stats["invalidacoes"] += 1
+
+
+def estatisticas_cache():
+    with _lock:
+        stats = dict(_stats)
+        stats["itens"] = len(_itens)
+    consultas = stats["hits"] + stats["misses"]
+    stats["taxa_acerto"] = round(stats["hits"] / consultas, 3) if consultas else 0.0
+    stats["ttl_segundos"] = CACHE_TTL
+    stats["max_itens"] = CACHE_MAX_ITENS
+    return stats
@@ -0,0 +1,195 @@
+import argparse
+import json
+import re
+import sys
+from math import comb
+
+import numpy as np
+
+from historico import carregar_snapshot
+from mascaras import histograma_acertos, mascaras_de_listas
+
+# --- CONFERIDOR DE BOLÕES EM LOTE ---
+# Lê os palpites linha a linha (CSV ou NDJSON), confere em blocos vetorizados
+# contra um concurso ou um intervalo do histórico e devolve uma linha de
+# resultado por palpite + o resumo no final. A memória fica limitada pelo
+# tamanho do bloco, não pelo tamanho do arquivo.
+
+MIN_DEZENAS, MAX_DEZENAS = 6, 15
+# Limite de células (palpites x sorteios) por bloco; define o tamanho do bloco
+LIMITE_CELULAS_BLOCO = 8_000_000
+
+# PREMIOS[k, h] = (quadras, quinas, senas) de uma aposta de k dezenas que
+# acertou h dezenas do sorteio: cada jogo de 6 dentro da aposta é um prêmio.
+PREMIOS = np.zeros((MAX_DEZENAS + 1, 7, 3), dtype=np.int64)
+for _k in range(MIN_DEZENAS, MAX_DEZENAS + 1):
+    for _h in range(7):
+        PREMIOS[_k, _h] = [comb(_h, j) * comb(_k - _h, 6 - j) for j in (4, 5, 6)]
+
+_SEPARADORES = re.compile(r"[;,\s]+")
+
+
+def _primeira_coluna_e_id(campos):
+    """
+    Sem indicação do arquivo, a primeira coluna do CSV só é tomada como id
+    quando não pode ser uma dezena da aposta: texto, fora de 1..60, repetida
+    nas colunas seguintes ou uma coluna além do máximo de dezenas.
+    """
+    if not campos[0].isdigit():
+        return True
+    primeira = int(campos[0])
+    resto = {int(c) for c in campos[1:] if c.isdigit()}
+    return not 1 <= primeira <= 60 or primeira in resto or len(campos) > MAX_DEZENAS
+
+
+def coluna_id_do_cabecalho(linha):
+    """Cabeçalho do CSV -> a primeira coluna é um id? ("id;d1;d2..." sim, "bola1;bola2..." não)."""
+    campos = [c for c in _SEPARADORES.split(linha.strip()) if c]
+    return bool(campos) and not any(ch.isdigit() for ch in campos[0])
+
+
+def interpretar_linha(linha, coluna_id=None):
+    """
+    Uma linha do arquivo -> (id, dezenas). Aceita CSV ("01;02;03;04;05;06",
+    vírgulas ou espaços, com um identificador opcional na primeira coluna) ou
+    NDJSON ([1, 2, ...] ou {"id": ..., "dezenas": [...]}).
+    `coluna_id` diz se a primeira coluna do CSV é o id; None detecta pela
+    própria linha (ver _primeira_coluna_e_id), o que não separa um id numérico
+    válido como dezena ("1;05;12;23;34;45;56" vira uma aposta de 7 dezenas).
+    Lança ValueError se a aposta for inválida.
+    """
+    linha = linha.strip()
+    if linha.startswith("{"):
+        dados = json.loads(linha)
+        ident, dezenas = dados.get("id"), dados.get("dezenas")
+    elif linha.startswith("["):
+        ident, dezenas = None, json.loads(linha)
+    else:
+        campos = [c for c in _SEPARADORES.split(linha) if c]
+        ident = None
+        if campos and (_primeira_coluna_e_id(campos) if coluna_id is None else coluna_id):
+            ident, campos = campos[0], campos[1:]
+        dezenas = [int(c) for c in campos]
+
+    dezenas = sorted(int(n) for n in dezenas)
+    if not MIN_DEZENAS <= len(dezenas) <= MAX_DEZENAS:
+        raise ValueError(f"aposta com {len(dezenas)} dezenas (aceito: {MIN_DEZENAS} a {MAX_DEZENAS})")
+    if len(set(dezenas)) != len(dezenas) or dezenas[0] < 1 or dezenas[-1] > 60:
+        raise ValueError("dezenas repetidas ou fora de 1..60")
+    return ident, dezenas
+
+
+def sorteios_alvo(snap, concurso=None, concurso_inicio=None, concurso_fim=None):
+    """Máscaras e números dos sorteios a conferir (padrão: o último concurso)."""
+    if concurso is not None:
+        concurso_inicio = concurso_fim = concurso
+    elif concurso_inicio is None and concurso_fim is None:
+        concurso_inicio = concurso_fim = snap.ultimo_concurso
+    inicio = snap.indice_do_concurso(concurso_inicio) if concurso_inicio is not None else 0
+    fim = snap.indice_do_concurso(concurso_fim + 1) if concurso_fim is not None else len(snap)
+    if fim <= inicio:
+        raise ValueError("Nenhum concurso no intervalo pedido")
+    return snap.mascaras[inicio:fim], snap.concursos[inicio:fim]
+
+
+def _conferir_bloco(bloco, sorteios):
+    """
+    Confere um bloco [(num_linha, id, dezenas, erro)] e devolve as linhas de
+    resultado na ordem do arquivo (linhas inválidas viram {"linha", "erro"}).
+    """
+    validos = [item for item in bloco if item[3] is None]
+    if validos:
+        mascaras = mascaras_de_listas([d for _, _, d, _ in validos])
+        tamanhos = np.array([len(d) for _, _, d, _ in validos])
+        histograma = histograma_acertos(mascaras, sorteios)                 # (B, 7)
+        premios = np.einsum("bh,bhp->bp", histograma, PREMIOS[tamanhos])    # (B, 3)
+    um_sorteio = len(sorteios) == 1
+
+    i = 0
+    for num, ident, dezenas, erro in bloco:
+        if erro is not None:
+            yield {"linha": num, "erro": erro}
+            continue
+        hist, (quadras, quinas, senas) = histograma[i], premios[i]
+        i += 1
+        resultado = {"linha": num, "dezenas": dezenas}
+        if ident is not None:
+            resultado["id"] = ident
+        if um_sorteio:
+            resultado["acertos"] = int(np.argmax(hist))
+        else:
+            resultado["histograma"] = hist.tolist()
+        resultado.update(quadras=int(quadras), quinas=int(quinas), senas=int(senas))
+        yield resultado
+
+
+def conferir_linhas(linhas, sorteios, concursos, coluna_id=None):
+    """
+    Gerador: consome as linhas dos palpites e produz um dict por palpite
+    (ou por linha inválida) e, por último, {"resumo": {...}}. Com `coluna_id`
+    None, um cabeçalho na linha 1 decide se a primeira coluna é o id.
+    """
+    tamanho_bloco = max(1, LIMITE_CELULAS_BLOCO // len(sorteios))
+    resumo = {"palpites": 0, "invalidos": 0, "quadras": 0, "quinas": 0, "senas": 0,
+              "concurso_inicio": int(concursos[0]), "concurso_fim": int(concursos[-1]),
+              "concursos": len(concursos)}
+    bloco = []
+
+    def descarregar():
+        for r in _conferir_bloco(bloco, sorteios):
+            if "erro" in r:
+                resumo["invalidos"] += 1
+            else:
+                resumo["palpites"] += 1
+                resumo["quadras"] += r["quadras"]
+                resumo["quinas"] += r["quinas"]
+                resumo["senas"] += r["senas"]
+            yield r
+        bloco.clear()
+
+    for num, linha in enumerate(linhas, start=1):
+        if isinstance(linha, bytes):
+            linha = linha.decode("utf-8-sig")
+        if not linha.strip():
+            continue
+        try:
+            ident, dezenas = interpretar_linha(linha, coluna_id)
+            bloco.append((num, ident, dezenas, None))
+        except (ValueError, TypeError, AttributeError) as e:
+            # Cabeçalho de CSV (linha 1 inválida e com texto): não é conferido,
+            # mas diz se a primeira coluna é o id
+            if num == 1 and any(c.isalpha() for c in linha):
+                if coluna_id is None and not linha.lstrip().startswith(("{", "[")):
+                    coluna_id = coluna_id_do_cabecalho(linha)
+                continue
+            bloco.append((num, None, None, str(e)))
+
+        if len(bloco) >= tamanho_bloco:
+            yield from descarregar()
+
+    if bloco:
+        yield from descarregar()
+    yield {"resumo": resumo}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Confere um bolão (CSV ou NDJSON) contra os sorteios")
+    parser.add_argument("arquivo", help="arquivo de palpites ('-' para a entrada padrão)")
+    parser.add_argument("--concurso", type=int, help="concurso único (padrão: o último)")
+    parser.add_argument("--de", type=int, help="primeiro concurso do intervalo")
+    parser.add_argument("--ate", type=int, help="último concurso do intervalo (inclusive)")
+    parser.add_argument("--resumo", action="store_true", help="imprime só o resumo final")
+    parser.add_argument("--coluna-id", action=argparse.BooleanOptionalAction, default=None,
+                        help="a primeira coluna do CSV é o id da aposta (padrão: detecta pelo cabeçalho/linha)")
+    args = parser.parse_args()
+
+    sorteios, concursos = sorteios_alvo(carregar_snapshot(), args.concurso, args.de, args.ate)
+    entrada = sys.stdin if args.arquivo == "-" else open(args.arquivo, encoding="utf-8-sig")
+    with entrada:
+        for resultado in conferir_linhas(entrada, sorteios, concursos, args.coluna_id):
+            if not args.resumo or "resumo" in resultado:
+                print(json.dumps(resultado, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
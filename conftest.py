@@ -0,0 +1,43 @@
+import atexit
+import csv
+import os
+import shutil
+import tempfile
+
+# Índice de elite e fechamentos dos testes num diretório temporário (definido
+# antes dos imports; os processos filhos herdam o ambiente)
+_TEMPORARIO = tempfile.mkdtemp(prefix="mega_sena_testes_")
+atexit.register(shutil.rmtree, _TEMPORARIO, ignore_errors=True)
+os.environ["INDICE_ELITE_DIR"] = _TEMPORARIO
+os.environ["FECHAMENTO_DIR"] = os.path.join(_TEMPORARIO, "fechamentos")
+
+import numpy as np  # noqa: E402
+import pytest  # noqa: E402
+
+from historico import SnapshotHistorico  # noqa: E402
+
+CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resultados.csv")
+
+
+def snapshot_do_csv(quantidade=None, semente=0):
+    """
+    SnapshotHistorico com os sorteios de resultados.csv (os `quantidade`
+    primeiros); popularidade e clusters são sorteados com `semente`.
+    """
+    with open(CSV, encoding="utf-8-sig", newline="") as arquivo:
+        linhas = sorted(list(csv.reader(arquivo))[1:], key=lambda l: int(l[0]))[:quantidade]
+    rng = np.random.default_rng(semente)
+    n = len(linhas)
+    return SnapshotHistorico(
+        concursos=np.array([int(l[0]) for l in linhas], dtype=np.int32),
+        dezenas=np.array([[int(x) for x in l[2:8]] for l in linhas], dtype=np.int8),
+        popularidade=rng.uniform(0.8, 1.6, n),
+        clusters=np.array(rng.choice(["PADRAO", "ZEBRA"], n), dtype=object),
+        acumulou=rng.random(n) < 0.7,
+        pesos={"pop": 2.0, "som": 1.0, "mom": 3.0, "sil": 1.0, "ruido": 1.0},
+    )
+
+
+@pytest.fixture(scope="session")
+def snap():
+    return snapshot_do_csv()
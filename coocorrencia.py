@@ -0,0 +1,137 @@
+from itertools import combinations
+from math import comb
+
+import numpy as np
+
+from indice_elite import BINOMIAL
+
+# --- COOCORRÊNCIA DE PARES, TRIOS E QUADRAS ---
+# Quantas vezes cada grupo de 2, 3 (e, opcionalmente, 4) dezenas saiu junto
+# no histórico inteiro. Os grupos são guardados pelo rank colexicográfico
+# (rank = soma de C(d_i - 1, i)): trios num vetor denso de C(60, 3) = 34.220
+# posições e quadras de forma esparsa (ranks ordenados + contagens), já que
+# só uma fração das 487.635 possíveis chegou a sair. Cada sorteio soma seus
+# 15 pares, 20 trios e 15 quadras; o snapshot compartilhado do processo
+# (historico.obter_snapshot) absorve assim cada sorteio novo que entra.
+
+TOTAL_PARES, TOTAL_TRIOS, TOTAL_QUADRAS = comb(60, 2), comb(60, 3), comb(60, 4)
+
+# Posições dos subgrupos dentro de um jogo ordenado de 6 dezenas
+_SUBGRUPOS = {k: np.array(list(combinations(range(6), k)), dtype=np.intp) for k in (2, 3, 4)}
+
+
+def ranks_grupos(grupos):
+    """(..., k) grupos de dezenas (qualquer ordem) -> (...,) rank colex entre os C(60, k)."""
+    grupos = np.sort(np.asarray(grupos, dtype=np.intp), axis=-1) - 1
+    return BINOMIAL[grupos, np.arange(1, grupos.shape[-1] + 1)].sum(axis=-1)
+
+
+def _ranks_subgrupos(jogos, k):
+    """(N, 6) jogos -> (N, C(6, k)) ranks de todos os seus subgrupos de k dezenas."""
+    ordenados = np.sort(np.asarray(jogos, dtype=np.intp).reshape(-1, 6), axis=1)
+    return ranks_grupos(ordenados[:, _SUBGRUPOS[k]])
+
+
+class Coocorrencia:
+    """
+    Contagens de pares, trios e (se `quadras`) quadras. `absorver` acrescenta
+    sorteios; `parceiros` e `pontuar` respondem sem nenhuma consulta SQL.
+    """
+
+    def __init__(self, quadras=True):
+        self.qtd_sorteios = 0
+        self.pares = np.zeros(TOTAL_PARES, dtype=np.int32)
+        self.trios = np.zeros(TOTAL_TRIOS, dtype=np.int32)
+        self.com_quadras = quadras
+        self.quadras_ranks = np.empty(0, dtype=np.int64)    # ordenados
+        self.quadras_contagem = np.empty(0, dtype=np.int32)
+
+    @classmethod
+    def de_sorteios(cls, dezenas, quadras=True):
+        cooc = cls(quadras)
+        cooc.absorver(dezenas)
+        return cooc
+
+    def absorver(self, dezenas):
+        """Soma os grupos de um ou mais sorteios ((6,) ou (N, 6))."""
+        dezenas = np.asarray(dezenas).reshape(-1, 6)
+        self.qtd_sorteios += len(dezenas)
+        self.pares += np.bincount(_ranks_subgrupos(dezenas, 2).ravel(), minlength=TOTAL_PARES).astype(np.int32)
+        self.trios += np.bincount(_ranks_subgrupos(dezenas, 3).ravel(), minlength=TOTAL_TRIOS).astype(np.int32)
+        if self.com_quadras:
+            novos, contagem = np.unique(_ranks_subgrupos(dezenas, 4), return_counts=True)
+            # Quadras já vistas só somam; as inéditas entram na posição ordenada
+            # (um sorteio novo mexe em 15 entradas, sem reordenar o vetor todo)
+            pos = np.searchsorted(self.quadras_ranks, novos)
+            existentes = pos < len(self.quadras_ranks)
+            existentes[existentes] = self.quadras_ranks[pos[existentes]] == novos[existentes]
+            self.quadras_contagem = self.quadras_contagem.copy()
+            self.quadras_contagem[pos[existentes]] += contagem[existentes].astype(np.int32)
+            ineditas = ~existentes
+            self.quadras_ranks = np.insert(self.quadras_ranks, pos[ineditas], novos[ineditas])
+            self.quadras_contagem = np.insert(self.quadras_contagem, pos[ineditas],
+                                              contagem[ineditas].astype(np.int32))
+
+    def copia(self):
+        nova = Coocorrencia(self.com_quadras)
+        nova.qtd_sorteios = self.qtd_sorteios
+        nova.pares, nova.trios = self.pares.copy(), self.trios.copy()
+        nova.quadras_ranks, nova.quadras_contagem = self.quadras_ranks.copy(), self.quadras_contagem.copy()
+        return nova
+
+    def _contagem_quadras(self, ranks):
+        if not self.com_quadras:
+            raise ValueError("contagem de quadras desligada (use quadras=True)")
+        if not len(self.quadras_ranks):
+            return np.zeros(np.shape(ranks), dtype=np.int32)
+        pos = np.minimum(np.searchsorted(self.quadras_ranks, ranks), len(self.quadras_ranks) - 1)
+        return np.where(self.quadras_ranks[pos] == ranks, self.quadras_contagem[pos], 0)
+
+    def contagem(self, grupos):
+        """(..., k) grupos de 2, 3 ou 4 dezenas -> quantas vezes cada um saiu junto."""
+        grupos = np.asarray(grupos)
+        ranks = ranks_grupos(grupos)
+        k = grupos.shape[-1]
+        if k == 2:
+            return self.pares[ranks]
+        if k == 3:
+            return self.trios[ranks]
+        if k == 4:
+            return self._contagem_quadras(ranks)
+        raise ValueError("grupos de 2, 3 ou 4 dezenas")
+
+    def parceiros(self, grupo, top=10):
+        """
+        As dezenas que mais saíram junto com o `grupo` (1 a 3 dezenas):
+        lista de (numero, vezes), da mais frequente para a menos.
+        """
+        grupo = sorted({int(n) for n in grupo})
+        if not 1 <= len(grupo) <= 3:
+            raise ValueError("o grupo deve ter de 1 a 3 dezenas")
+        outros = np.array([n for n in range(1, 61) if n not in grupo], dtype=np.intp)
+        grupos = np.column_stack([np.tile(grupo, (len(outros), 1)), outros])
+        vezes = self.contagem(grupos)
+        ordem = np.lexsort((outros, -vezes))
+        return [(int(outros[i]), int(vezes[i])) for i in ordem[:top] if vezes[i] > 0]
+
+    def pontuar(self, jogos):
+        """
+        Afinidade de grupo de cada jogo (N, 6): soma das contagens dos seus
+        15 pares, 20 trios e 15 quadras, e o "lift" = média das razões entre
+        o observado e o esperado ao acaso em cada nível (1.0 = neutro).
+        """
+        jogos = np.asarray(jogos).reshape(-1, 6)
+        n = max(self.qtd_sorteios, 1)
+        resultado = {
+            "pares": self.pares[_ranks_subgrupos(jogos, 2)].sum(axis=1),
+            "trios": self.trios[_ranks_subgrupos(jogos, 3)].sum(axis=1),
+        }
+        # Esperado ao acaso para um grupo: sorteios x C(6, k) / C(60, k)
+        lift = resultado["pares"] / (15 * n * 15 / TOTAL_PARES) + resultado["trios"] / (20 * n * 20 / TOTAL_TRIOS)
+        niveis = 2
+        if self.com_quadras:
+            resultado["quadras"] = self._contagem_quadras(_ranks_subgrupos(jogos, 4)).sum(axis=1)
+            lift = lift + resultado["quadras"] / (15 * n * 15 / TOTAL_QUADRAS)
+            niveis = 3
+        resultado["lift"] = lift / niveis
+        return resultado
@@ -0,0 +1,258 @@
+import hashlib
+import itertools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from math import ceil, comb
+
+import numpy as np
+
+from indice_elite import BINOMIAL
+from main import validar_palpites_elite_lote
+
+# --- FECHAMENTOS (COVERING DESIGNS) ---
+# Com v dezenas candidatas, gera o menor conjunto de jogos de 6 que garante
+# uma quadra (garantia = 4) sempre que 4 das dezenas sorteadas estiverem entre
+# as candidatas: todo subconjunto de 4 candidatas precisa estar dentro de ao
+# menos um jogo. Construção gulosa + busca local (remove jogos e recobre),
+# com várias sementes em paralelo; fica a menor solução.
+#
+# Com os filtros de elite ligados só entram jogos válidos; subconjuntos que
+# nenhum jogo válido contém (ex.: 4 dezenas no mesmo quadrante) são impossíveis
+# de cobrir e aparecem nas estatísticas.
+
+FECHAMENTO_DIR = os.getenv("FECHAMENTO_DIR", os.path.join("modelos_ia", "fechamentos"))
+FECHAMENTO_PROCESSOS = int(os.getenv("FECHAMENTO_PROCESSOS", str(os.cpu_count() or 1)))
+MIN_DEZENAS, MAX_DEZENAS = 7, 25
+GARANTIAS = (3, 4, 5)
+# Recozimento: temperatura cai geometricamente entre esses valores a cada rodada
+TEMPERATURA_INICIAL, TEMPERATURA_FINAL = 0.5, 0.05
+# Quantas remoções seguidas sem sucesso encerram a busca local
+TENTATIVAS_POR_TAMANHO = 3
+
+_cache = {}
+_lock_cache = threading.Lock()
+
+
+def limite_inferior(v, t, k=6):
+    """Cota de Schönheim: nenhum fechamento (v, k, t) tem menos jogos que isso."""
+    cota = 1
+    for i in range(t - 1, -1, -1):
+        cota = ceil((v - i) / (k - i) * cota)
+    return cota
+
+
+def _estrutura(v, t):
+    """
+    Todos os jogos de 6 sobre as posições 0..v-1 em ordem colex (o índice do
+    jogo é o seu rank) e, para cada um, os ranks dos seus C(6, t)
+    subconjuntos de t posições; e o inverso: para cada t-subconjunto, suas
+    posições e os jogos que o contêm.
+    """
+    jogos = np.array(list(itertools.combinations(range(v), 6)), dtype=np.intp)
+    jogos = jogos[np.argsort(BINOMIAL[jogos, np.arange(1, 7)].sum(axis=1))]
+    partes = np.array(list(itertools.combinations(range(6), t)), dtype=np.intp)
+    sub = jogos[:, partes]                                        # (B, C(6,t), t), crescente
+    incidencia = BINOMIAL[sub, np.arange(1, t + 1)].sum(axis=2)    # (B, C(6,t))
+    ordem = np.argsort(incidencia.ravel(), kind="stable")
+    contido_em = (ordem // incidencia.shape[1]).reshape(comb(v, t), -1)   # (T, C(v-t, 6-t))
+    subconjuntos = sub.reshape(-1, t)[ordem[::contido_em.shape[1]]]       # (T, t)
+    return jogos, incidencia, contido_em, subconjuntos
+
+
+def _guloso(incidencia, contido_em, permitidos, contagem, rng):
+    """Acrescenta jogos (maior ganho, desempate aleatório) até cobrir tudo que falta."""
+    escolhidos = []
+    ganho = (contagem[incidencia] == 0).sum(axis=1)
+    ganho[~permitidos] = -1
+    while True:
+        melhor = ganho.max()
+        if melhor <= 0:
+            return escolhidos
+        b = int(rng.choice(np.flatnonzero(ganho == melhor)))
+        for t in incidencia[b]:
+            if contagem[t] == 0:
+                ganho[contido_em[t]] -= 1
+        contagem[incidencia[b]] += 1
+        escolhidos.append(b)
+
+
+def _remover_redundantes(solucao, incidencia, contagem, rng):
+    """Tira os jogos cujos t-subconjuntos já estão todos cobertos por outros."""
+    mantidos = []
+    for b in rng.permutation(solucao):
+        if (contagem[incidencia[b]] >= 2).all():
+            contagem[incidencia[b]] -= 1
+        else:
+            mantidos.append(int(b))
+    return mantidos
+
+
+def _recozimento(solucao, jogos, incidencia, subconjuntos, permitidos, contagem, rng, iteracoes):
+    """
+    Recozimento simulado com tamanho fixo: escolhe um t-subconjunto descoberto
+    e um jogo da solução que tenha t-1 dezenas dele, troca uma dezena do jogo
+    pela que falta e aceita pelo critério de Metropolis (custo = descobertos).
+    Devolve True se zerou os descobertos.
+    """
+    pertence = np.zeros((len(solucao), jogos.max() + 1), dtype=np.int8)
+    for i, b in enumerate(solucao):
+        pertence[i, jogos[b]] = 1
+    t = subconjuntos.shape[1]
+    temperatura = TEMPERATURA_INICIAL
+    resfriamento = (TEMPERATURA_FINAL / TEMPERATURA_INICIAL) ** (1 / max(iteracoes, 1))
+    for _ in range(iteracoes):
+        descobertos = np.flatnonzero(contagem == 0)
+        if not len(descobertos):
+            return True
+        alvo = subconjuntos[rng.choice(descobertos)]
+        vizinhos = np.flatnonzero(pertence[:, alvo].sum(axis=1) == t - 1)
+        if not len(vizinhos):
+            continue
+        i = int(rng.choice(vizinhos))
+        antigo = jogos[solucao[i]]
+        entra = alvo[pertence[i, alvo] == 0][0]
+        sai = rng.choice(np.setdiff1d(antigo, alvo, assume_unique=True))
+        novo = np.sort(np.append(antigo[antigo != sai], entra))
+        b = int(BINOMIAL[novo, np.arange(1, 7)].sum())
+        if not permitidos[b]:
+            continue
+
+        contagem[incidencia[solucao[i]]] -= 1
+        delta = int((contagem[incidencia[solucao[i]]] == 0).sum()) - int((contagem[incidencia[b]] == 0).sum())
+        if delta <= 0 or rng.random() < np.exp(-delta / temperatura):
+            contagem[incidencia[b]] += 1
+            pertence[i, sai], pertence[i, entra] = 0, 1
+            solucao[i] = b
+        else:
+            contagem[incidencia[solucao[i]]] += 1
+        temperatura *= resfriamento
+    return not (contagem == 0).any()
+
+
+def _buscar(v, t, permitidos, semente, iteracoes):
+    """
+    Uma execução completa com uma semente: guloso + limpeza de redundâncias e,
+    enquanto o recozimento conseguir, tira o jogo menos útil e recobre.
+    """
+    rng = np.random.default_rng(semente)
+    jogos, incidencia, contido_em, subconjuntos = _estrutura(v, t)
+    # t-subconjuntos que nenhum jogo permitido contém ficam fora do alvo
+    cobriveis = permitidos[contido_em].any(axis=1)
+    contagem = np.where(cobriveis, 0, 1 << 20).astype(np.int64)
+
+    solucao = _guloso(incidencia, contido_em, permitidos, contagem, rng)
+    solucao = _remover_redundantes(solucao, incidencia, contagem, rng)
+    melhor = list(solucao)
+    falhas = 0
+
+    while len(solucao) > 1 and falhas < TENTATIVAS_POR_TAMANHO:
+        # Tira um jogo (na primeira tentativa, o que cobre sozinho menos
+        # t-subconjuntos; depois, um ao acaso) e tenta recobrir com um a menos
+        if falhas == 0:
+            exclusivos = [(contagem[incidencia[b]] == 1).sum() for b in solucao]
+            b = solucao.pop(int(np.argmin(exclusivos)))
+        else:
+            b = solucao.pop(int(rng.integers(len(solucao))))
+        contagem[incidencia[b]] -= 1
+        if _recozimento(solucao, jogos, incidencia, subconjuntos, permitidos, contagem, rng, iteracoes):
+            melhor, falhas = list(solucao), 0
+        else:
+            solucao, falhas = list(melhor), falhas + 1
+            contagem = np.where(cobriveis, 0, 1 << 20).astype(np.int64)
+            contagem += np.bincount(incidencia[solucao].ravel(), minlength=len(contagem))
+
+    return sorted(melhor)
+
+
+def _assinatura(permitidos):
+    if permitidos.all():
+        return "livre"
+    return hashlib.sha1(np.packbits(permitidos).tobytes()).hexdigest()[:12]
+
+
+def _caminho_cache(v, t, assinatura):
+    return os.path.join(FECHAMENTO_DIR, f"fechamento_v{v}_g{t}_{assinatura}.npy")
+
+
+def calcular_fechamento(v, garantia, permitidos=None, sementes=4, iteracoes=2000, processos=None):
+    """
+    Fechamento sobre as posições 0..v-1 -> (N, 6) posições. Em cache (memória
+    e disco) por (v, garantia, padrão de jogos permitidos): sem filtros a chave
+    é só (v, garantia).
+    """
+    if permitidos is None:
+        permitidos = np.ones(comb(v, 6), dtype=bool)
+    chave = (v, garantia, _assinatura(permitidos))
+
+    with _lock_cache:
+        if chave in _cache:
+            return _cache[chave]
+    caminho = _caminho_cache(*chave)
+    if os.path.exists(caminho):
+        posicoes = np.load(caminho)
+    else:
+        processos = FECHAMENTO_PROCESSOS if processos is None else processos
+        argumentos = [(v, garantia, permitidos, semente, iteracoes) for semente in range(sementes)]
+        if processos > 1 and sementes > 1:
+            contexto = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=min(processos, sementes), mp_context=contexto) as executor:
+                solucoes = list(executor.map(_buscar, *zip(*argumentos)))
+        else:
+            solucoes = [_buscar(*a) for a in argumentos]
+
+        jogos = _estrutura(v, garantia)[0]
+        posicoes = jogos[min(solucoes, key=len)]
+        os.makedirs(FECHAMENTO_DIR, exist_ok=True)
+        temporario = f"{caminho}.{os.getpid()}.tmp.npy"
+        np.save(temporario, posicoes)
+        os.replace(temporario, caminho)
+
+    with _lock_cache:
+        _cache[chave] = posicoes
+    return posicoes
+
+
+def estatisticas_cobertura(posicoes, v, garantia, permitidos=None):
+    """Quantos t-subconjuntos do pool o fechamento cobre (e quantas vezes)."""
+    _, incidencia, contido_em, _ = _estrutura(v, garantia)
+    escolhidos = BINOMIAL[np.sort(posicoes, axis=1), np.arange(1, 7)].sum(axis=1)
+    contagem = np.bincount(incidencia[escolhidos].ravel(), minlength=comb(v, garantia))
+    total = comb(v, garantia)
+    impossiveis = 0 if permitidos is None else int((~permitidos[contido_em].any(axis=1)).sum())
+    cobertos = int((contagem > 0).sum())
+    return {
+        "subconjuntos_alvo": total,
+        "cobertos": cobertos,
+        "cobertura_pct": round(100 * cobertos / total, 2),
+        "impossiveis_com_filtros": impossiveis,
+        "cobertura_possivel_pct": round(100 * cobertos / max(total - impossiveis, 1), 2),
+        "cobertura_media": round(float(contagem.mean()), 3),
+        "limite_inferior": limite_inferior(v, garantia),
+    }
+
+
+def gerar_fechamento(candidatas, garantia=4, filtros=True, **opcoes):
+    """
+    Fechamento para as dezenas candidatas: jogos (listas de dezenas) e as
+    estatísticas de cobertura. Com `filtros`, só entram jogos que passam em
+    validar_palpite_elite.
+    """
+    candidatas = np.array(sorted(set(int(n) for n in candidatas)), dtype=np.intp)
+    v = len(candidatas)
+    if not MIN_DEZENAS <= v <= MAX_DEZENAS:
+        raise ValueError(f"use de {MIN_DEZENAS} a {MAX_DEZENAS} dezenas candidatas (recebido: {v})")
+    if garantia not in GARANTIAS:
+        raise ValueError(f"garantia deve ser uma de {GARANTIAS}")
+
+    permitidos = None
+    if filtros:
+        jogos_pool = candidatas[_estrutura(v, garantia)[0]]
+        permitidos = validar_palpites_elite_lote(jogos_pool)
+
+    posicoes = calcular_fechamento(v, garantia, permitidos, **opcoes)
+    jogos = candidatas[posicoes].tolist()
+    stats = estatisticas_cobertura(posicoes, v, garantia, permitidos)
+    return {"candidatas": candidatas.tolist(), "garantia": garantia, "filtros": bool(filtros),
+            "qtd_jogos": len(jogos), "estatisticas": stats, "jogos": jogos}
@@ -0,0 +1,157 @@
+import heapq
+import os
+import time
+
+import numpy as np
+
+from main import validar_palpites_elite_lote
+from mascaras import mascaras_dezenas
+
+# --- GERAÇÃO EM MASSA DE PALPITES DE ALTA CONVERGÊNCIA ---
+# A partir da pontuação final de cada dezena (pesos_final do motor), gera
+# milhares de jogos distintos que passam nos filtros de elite:
+# - "melhores": enumeração best-first, em ordem decrescente de pontuação do jogo
+#   (soma das pontuações das 6 dezenas); cada jogo tem um único antecessor,
+#   então nada se repete e não há conjunto de jogos já vistos;
+# - "amostragem": sorteio ponderado (Gumbel top-k) das dezenas pela pontuação,
+#   com de-duplicação por máscara de bits; `temperatura` controla a dispersão.
+#   Quando quase todo sorteio repete jogo (pesos muito concentrados) ou o tempo
+#   acaba, completa a quantidade com os "melhores" ainda não entregues.
+# Os candidatos são validados em lotes (validar_palpites_elite_lote).
+
+GERADOR_MAX_PALPITES = int(os.getenv("GERADOR_MAX_PALPITES", "200000"))
+# Tempo máximo (s) da amostragem antes de completar com os "melhores"
+GERADOR_TEMPO_AMOSTRAGEM = float(os.getenv("GERADOR_TEMPO_AMOSTRAGEM", "10"))
+TAMANHO_LOTE = 512
+# Na amostragem, lotes seguidos com menos de _TAXA_MINIMA de jogos novos
+# indicam que a taxa de aceitação desabou
+_TAXA_MINIMA = 0.02
+_LOTES_TAXA_BAIXA = 5
+
+
+def _vetor_pesos(pesos_dezenas):
+    pesos = np.zeros(61, dtype=np.float64)
+    for n, p in pesos_dezenas.items():
+        pesos[int(n)] = float(p)
+    return pesos
+
+
+def gerar_melhores(pesos_dezenas, quantidade, excluir=None):
+    """
+    Best-first sobre as dezenas ordenadas pela pontuação: cada estado é uma
+    tupla de 6 posições crescentes. Regra canônica dos sucessores: a posição
+    p só avança em 1 se as posições anteriores ainda são 0..p-1; assim todo
+    jogo tem um único antecessor (o que recua a primeira posição que pode
+    recuar) e é gerado uma vez só. Como as pontuações estão em ordem
+    decrescente, o heap devolve os jogos do maior para o menor total.
+    `excluir`: máscaras de jogos que não devem ser entregues.
+    Gera (dezenas, pontuacao).
+    """
+    pesos = _vetor_pesos(pesos_dezenas)
+    ordem = np.argsort(-pesos[1:], kind="stable") + 1        # dezenas da mais forte para a mais fraca
+    valores = pesos[ordem].tolist()
+    n = len(ordem)
+
+    excluidas = np.fromiter(excluir or (), dtype=np.uint64)
+
+    inicial = tuple(range(6))
+    heap = [(-sum(valores[i] for i in inicial), inicial)]
+    entregues = 0
+
+    while heap and entregues < quantidade:
+        # Retira um lote em ordem de pontuação e valida tudo de uma vez
+        lote = []
+        while heap and len(lote) < TAMANHO_LOTE:
+            negativo, estado = heapq.heappop(heap)
+            lote.append((-negativo, estado))
+            for p in range(6):
+                limite = estado[p + 1] if p < 5 else n
+                if estado[p] + 1 < limite:
+                    sucessor = estado[:p] + (estado[p] + 1,) + estado[p + 1:]
+                    heapq.heappush(heap, (negativo + valores[estado[p]] - valores[estado[p] + 1], sucessor))
+                if estado[p] != p:
+                    break
+
+        jogos = np.sort(ordem[np.array([e for _, e in lote])], axis=1)
+        validos = validar_palpites_elite_lote(jogos)
+        if len(excluidas):
+            validos = validos & ~np.isin(mascaras_dezenas(jogos), excluidas)
+        for (pontuacao, _), jogo, valido in zip(lote, jogos, validos):
+            if valido:
+                yield jogo.tolist(), round(pontuacao, 4)
+                entregues += 1
+                if entregues >= quantidade:
+                    return
+
+
+def gerar_amostragem(pesos_dezenas, quantidade, temperatura=1.0, semente=None):
+    """
+    Cada jogo sorteia 6 dezenas sem reposição com probabilidade proporcional
+    a exp(pontuação / temperatura): somar ruído Gumbel aos logits e pegar os
+    6 maiores equivale a esse sorteio, e sai vetorizado para o lote inteiro.
+    Gera (dezenas, pontuacao) sem repetir jogos. Se a taxa de jogos novos
+    desabar ou passar GERADOR_TEMPO_AMOSTRAGEM, o restante vem de
+    gerar_melhores (sem repetir os já sorteados).
+    """
+    pesos = _vetor_pesos(pesos_dezenas)
+    logits = pesos[1:] / max(temperatura, 1e-6)
+    rng = np.random.default_rng(semente)
+    vistos = set()
+    entregues = 0
+    taxa_baixa = 0
+    prazo = time.monotonic() + GERADOR_TEMPO_AMOSTRAGEM
+
+    while entregues < quantidade and taxa_baixa < _LOTES_TAXA_BAIXA and time.monotonic() < prazo:
+        chaves = logits + rng.gumbel(size=(TAMANHO_LOTE, 60))
+        jogos = np.sort(np.argpartition(chaves, -6, axis=1)[:, -6:] + 1, axis=1)
+        mascaras = mascaras_dezenas(jogos)
+        validos = validar_palpites_elite_lote(jogos)
+        novos = 0
+        for jogo, m, valido in zip(jogos, mascaras.tolist(), validos):
+            if not valido or m in vistos:
+                continue
+            vistos.add(m)
+            novos += 1
+            yield jogo.tolist(), round(float(pesos[jogo].sum()), 4)
+            entregues += 1
+            if entregues >= quantidade:
+                return
+        taxa_baixa = taxa_baixa + 1 if novos < _TAXA_MINIMA * TAMANHO_LOTE else 0
+
+    yield from gerar_melhores(pesos_dezenas, quantidade - entregues, excluir=vistos)
+
+
+def _com_afinidade(lote, coocorrencia):
+    if not lote:
+        return
+    lift = coocorrencia.pontuar([d for d, _ in lote])["lift"]
+    for (dezenas, pontuacao), l in zip(lote, lift.tolist()):
+        yield {"dezenas": dezenas, "pontuacao": pontuacao, "afinidade": round(l, 4)}
+
+
+def gerar_palpites(pesos_dezenas, quantidade, modo="melhores", temperatura=1.0, semente=None, coocorrencia=None):
+    """
+    Ponto de entrada: gera até `quantidade` palpites únicos e válidos como
+    dicts. Com `coocorrencia` (ver coocorrencia.py), cada palpite ganha também
+    a sua afinidade de grupo ("lift"), calculada em lotes.
+    """
+    quantidade = min(int(quantidade), GERADOR_MAX_PALPITES)
+    if modo == "melhores":
+        fonte = gerar_melhores(pesos_dezenas, quantidade)
+    elif modo == "amostragem":
+        fonte = gerar_amostragem(pesos_dezenas, quantidade, temperatura, semente)
+    else:
+        raise ValueError(f"modo inválido: {modo} (use 'melhores' ou 'amostragem')")
+
+    if coocorrencia is None:
+        for dezenas, pontuacao in fonte:
+            yield {"dezenas": dezenas, "pontuacao": pontuacao}
+        return
+
+    lote = []
+    for item in fonte:
+        lote.append(item)
+        if len(lote) == TAMANHO_LOTE:
+            yield from _com_afinidade(lote, coocorrencia)
+            lote = []
+    yield from _com_afinidade(lote, coocorrencia)
@@ -0,0 +1,339 @@
+import copy
+import threading
+from dataclasses import dataclass
+from functools import cached_property
+
+import numpy as np
+
+from banco import conectar_banco
+from afinidade import MatrizAfinidade
+from atrasos import TabelaAtrasos
+from coocorrencia import Coocorrencia
+from mascaras import mascaras_dezenas
+
+# Assinatura dos dados: md5 de todas as colunas que o snapshot lê, linha a
+# linha em ordem de concurso. Qualquer edição (cluster reclassificado,
+# popularidade, dezenas, concurso apagado ou inserido) muda o valor.
+ASSINATURA_SORTEIOS = """
+    SELECT md5(string_agg(ROW(concurso, bola1, bola2, bola3, bola4, bola5, bola6,
+                              indice_popularidade, cluster_tipo, acumulou)::text, '|' ORDER BY concurso))
+    FROM sorteios
+"""
+
+# Uma única leitura traz todos os sorteios + os pesos em cache (id = 1) + a
+# assinatura, no mesmo instante. Pesos e assinatura se repetem em cada linha;
+# lemos apenas da primeira.
+QUERY_SNAPSHOT = f"""
+    SELECT s.concurso, s.bola1, s.bola2, s.bola3, s.bola4, s.bola5, s.bola6,
+           s.indice_popularidade, s.cluster_tipo, s.acumulou,
+           p.peso_popularidade, p.peso_sombra, p.peso_momentum, p.peso_silencio, p.peso_ruido,
+           ({ASSINATURA_SORTEIOS}) AS assinatura
+    FROM sorteios s
+    LEFT JOIN configuracao_pesos p ON p.id = 1
+    ORDER BY s.concurso ASC
+"""
+
+# Consulta feita a cada obter_snapshot: total de sorteios, assinatura dos
+# sorteios até o último concurso do snapshot (%s) e de todos, mais os pesos
+QUERY_ESTADO = """
+    SELECT COUNT(*),
+           md5(string_agg(linha, '|' ORDER BY concurso) FILTER (WHERE concurso <= %s)),
+           md5(string_agg(linha, '|' ORDER BY concurso)),
+           (SELECT peso_popularidade FROM configuracao_pesos WHERE id = 1),
+           (SELECT peso_sombra FROM configuracao_pesos WHERE id = 1),
+           (SELECT peso_momentum FROM configuracao_pesos WHERE id = 1),
+           (SELECT peso_silencio FROM configuracao_pesos WHERE id = 1),
+           (SELECT peso_ruido FROM configuracao_pesos WHERE id = 1)
+    FROM (
+        SELECT concurso, ROW(concurso, bola1, bola2, bola3, bola4, bola5, bola6,
+                             indice_popularidade, cluster_tipo, acumulou)::text AS linha
+        FROM sorteios
+    ) AS t
+"""
+
+QUERY_NOVOS = """
+    SELECT concurso, bola1, bola2, bola3, bola4, bola5, bola6, indice_popularidade, cluster_tipo, acumulou
+    FROM sorteios WHERE concurso > %s ORDER BY concurso ASC
+"""
+
+# Snapshot compartilhado pelo processo (ver obter_snapshot) e a assinatura
+# dos sorteios que ele contém
+_snapshot = None
+_assinatura = None
+_lock_snapshot = threading.Lock()
+
+
+@dataclass
+class SnapshotHistorico:
+    """
+    Fotografia do histórico completo em memória. Todas as camadas estatísticas
+    (frequência, janela recente, atraso, popularidade, vizinhança, momentum e
+    ciclo) são calculadas a partir destes arrays, sem novas idas ao banco.
+    """
+    concursos: np.ndarray      # (N,) int32, em ordem crescente
+    dezenas: np.ndarray        # (N, 6) int8
+    popularidade: np.ndarray   # (N,) float64, NaN quando nulo
+    clusters: np.ndarray       # (N,) object (str ou None)
+    acumulou: np.ndarray       # (N,) bool
+    pesos: dict | None = None  # configuracao_pesos (id = 1), se existir
+
+    def __len__(self):
+        return len(self.concursos)
+
+    @property
+    def ultimo_concurso(self):
+        return int(self.concursos[-1]) if len(self.concursos) else 0
+
+    @cached_property
+    def mascaras(self):
+        """(N,) uint64: cada sorteio como máscara de bits (ver mascaras.py)."""
+        return mascaras_dezenas(self.dezenas)
+
+    @cached_property
+    def tabela_atrasos(self):
+        """Atrasos por dezena com o histórico de aparições (ver atrasos.py)."""
+        return TabelaAtrasos.de_sorteios(self.concursos, self.dezenas)
+
+    @cached_property
+    def coocorrencia(self):
+        """Contagens de pares, trios e quadras do histórico inteiro (ver coocorrencia.py)."""
+        return Coocorrencia.de_sorteios(self.dezenas)
+
+    @cached_property
+    def afinidade(self):
+        """Pares dos sorteios com popularidade > 1.0: a matriz de afinidade (ver afinidade.py)."""
+        return MatrizAfinidade.de_sorteios(self.dezenas, self.popularidade)
+
+    @cached_property
+    def acumulada(self):
+        """
+        (N + 1, 61) int32: acumulada[i, n] = quantas vezes a dezena n saiu nos
+        sorteios [0, i). A frequência em qualquer janela é uma subtração de linhas.
+        """
+        return self._acumular(self.dezenas, np.zeros(61, dtype=np.int32))
+
+    @staticmethod
+    def _acumular(dezenas, base):
+        """Linha `base` seguida das contagens acumuladas de `dezenas` a partir dela."""
+        uns = np.zeros((len(dezenas), 61), dtype=np.int32)
+        uns[np.arange(len(dezenas))[:, None], dezenas.astype(np.intp)] = 1
+        return np.vstack([base, base + np.cumsum(uns, axis=0, dtype=np.int32)])
+
+    def prefixo(self, fim):
+        """Snapshot só com os sorteios [0, fim): o histórico como era antes do índice `fim`."""
+        novo = SnapshotHistorico(
+            concursos=self.concursos[:fim],
+            dezenas=self.dezenas[:fim],
+            popularidade=self.popularidade[:fim],
+            clusters=self.clusters[:fim],
+            acumulou=self.acumulou[:fim],
+            pesos=self.pesos,
+        )
+        # Estruturas já calculadas valem para o prefixo: são só fatias (sem cópia)
+        n = len(novo)
+        if "mascaras" in self.__dict__:
+            novo.__dict__["mascaras"] = self.mascaras[:n]
+        if "acumulada" in self.__dict__:
+            novo.__dict__["acumulada"] = self.acumulada[:n + 1]
+        return novo
+
+    def anexar(self, concursos, dezenas, popularidade=None, clusters=None, acumulou=None):
+        """
+        Snapshot com novos sorteios no fim (concursos maiores que o último).
+        As estruturas já calculadas são estendidas só com as linhas novas.
+        """
+        concursos = np.asarray(concursos, dtype=np.int32)
+        dezenas = np.asarray(dezenas, dtype=np.int8).reshape(-1, 6)
+        k = len(concursos)
+        if k and len(self) and concursos[0] <= self.ultimo_concurso:
+            raise ValueError(f"concurso {int(concursos[0])} não é posterior ao último ({self.ultimo_concurso})")
+        novo = SnapshotHistorico(
+            concursos=np.concatenate([self.concursos, concursos]),
+            dezenas=np.concatenate([self.dezenas, dezenas]),
+            popularidade=np.concatenate([self.popularidade, np.full(k, np.nan) if popularidade is None
+                                         else np.asarray(popularidade, dtype=np.float64)]),
+            clusters=np.concatenate([self.clusters, np.array([None] * k if clusters is None else list(clusters),
+                                                             dtype=object)]),
+            acumulou=np.concatenate([self.acumulou, np.zeros(k, dtype=bool) if acumulou is None
+                                     else np.asarray(acumulou, dtype=bool)]),
+            pesos=self.pesos,
+        )
+        if "mascaras" in self.__dict__:
+            novo.__dict__["mascaras"] = np.concatenate([self.mascaras, mascaras_dezenas(dezenas)])
+        if "acumulada" in self.__dict__:
+            novo.__dict__["acumulada"] = np.vstack([self.acumulada[:-1],
+                                                    self._acumular(dezenas, self.acumulada[-1])])
+        if "coocorrencia" in self.__dict__:
+            cooc = self.coocorrencia.copia()
+            cooc.absorver(dezenas)
+            novo.__dict__["coocorrencia"] = cooc
+        if "afinidade" in self.__dict__:
+            matriz = self.afinidade.copia()
+            matriz.absorver(dezenas, novo.popularidade[len(self):])
+            novo.__dict__["afinidade"] = matriz
+        if "tabela_atrasos" in self.__dict__:
+            tabela = self.tabela_atrasos.copia()
+            for concurso, linha in zip(concursos, dezenas):
+                tabela.registrar(concurso, linha)
+            novo.__dict__["tabela_atrasos"] = tabela
+        return novo
+
+    def indice_do_concurso(self, concurso):
+        """Posição do primeiro sorteio com número >= `concurso`."""
+        return int(np.searchsorted(self.concursos, concurso))
+
+    @staticmethod
+    def _contar(dezenas):
+        return np.bincount(dezenas.ravel().astype(np.intp), minlength=61)[:61]
+
+    @staticmethod
+    def _ranking(contagem, desc=True):
+        """Lista de tuplas (numero, valor) no formato devolvido pelas queries SQL."""
+        numeros = np.arange(1, 61)
+        valores = contagem[1:61]
+        ordem = np.lexsort((numeros, -valores if desc else valores))
+        return [(int(numeros[i]), int(valores[i])) for i in ordem]
+
+    # --- CAMADAS ---
+
+    def frequencia_entre(self, inicio, fim):
+        """(61,) int32: frequência de cada dezena nos sorteios de índice [inicio, fim)."""
+        return self.acumulada[fim] - self.acumulada[inicio]
+
+    def frequencia(self):
+        """Equivalente a v_frequencia_numeros: (numero, frequencia) decrescente."""
+        contagem = self.frequencia_entre(0, len(self))
+        return [t for t in self._ranking(contagem) if t[1] > 0]
+
+    def janela_recente(self, tamanho=20):
+        """Frequência nos últimos `tamanho` sorteios: (numero, frequencia) decrescente."""
+        if tamanho < 1:
+            raise ValueError("a janela recente precisa de ao menos 1 concurso")
+        contagem = self.frequencia_entre(max(len(self) - tamanho, 0), len(self))
+        return [t for t in self._ranking(contagem) if t[1] > 0]
+
+    def _atraso_por_numero(self):
+        ultimo_visto = np.zeros(61, dtype=np.int64)
+        # Como os concursos estão em ordem crescente, a última escrita vence
+        ultimo_visto[self.dezenas.astype(np.intp)] = self.concursos[:, None]
+        return self.ultimo_concurso - ultimo_visto
+
+    def atrasos(self):
+        """Equivalente a v_atraso_numeros: (numero, concursos_de_atraso) decrescente."""
+        return self._ranking(self._atraso_por_numero())
+
+    def populares(self, limite_popularidade=1.2, top=20):
+        mascara = self.popularidade >= limite_popularidade
+        contagem = self._contar(self.dezenas[mascara])
+        return [n for n, c in self._ranking(contagem) if c > 0][:top]
+
+    def vizinhanca(self, top=10):
+        """Dezenas com maior força na matriz de afinidade (somada por numero_b)."""
+        return self.vizinhanca_de(self.afinidade, top)
+
+    @classmethod
+    def vizinhanca_de(cls, matriz, top=10):
+        return [n for n, f in cls._ranking(matriz.forca()) if f > 0][:top]
+
+    def momentum(self, min_atraso=3, max_atraso=15, top=10):
+        crescente = self._ranking(self._atraso_por_numero(), desc=False)
+        return [n for n, a in crescente if min_atraso <= a <= max_atraso][:top]
+
+    def pendentes_ciclo(self):
+        """
+        Dezenas que ainda não saíram no ciclo atual. Um ciclo fecha quando as
+        60 dezenas aparecem ao menos uma vez; a contagem recomeça no sorteio
+        seguinte.
+        """
+        vistas = set()
+        for linha in self.dezenas:
+            vistas.update(int(n) for n in linha)
+            if len(vistas) == 60:
+                vistas = set()
+        return sorted(set(range(1, 61)) - vistas)
+
+    def ultimos_clusters(self, quantidade=3):
+        return list(self.clusters[-quantidade:][::-1])
+
+
+def _pesos(linha):
+    """Pesos de configuracao_pesos a partir das 5 colunas peso_*, ou None se não houver."""
+    if linha[0] is None:
+        return None
+    return {"pop": float(linha[0]), "som": float(linha[1]), "mom": float(linha[2]), "sil": float(linha[3]),
+            "ruido": float(linha[4]) if linha[4] is not None else 1.0}
+
+
+def _colunas(linhas):
+    """Linhas (concurso, bola1..6, popularidade, cluster, acumulou, ...) -> arrays do snapshot."""
+    return dict(
+        concursos=np.array([l[0] for l in linhas], dtype=np.int32),
+        dezenas=np.array([l[1:7] for l in linhas], dtype=np.int8).reshape(-1, 6),
+        popularidade=np.array([np.nan if l[7] is None else float(l[7]) for l in linhas], dtype=np.float64),
+        clusters=np.array([l[8] for l in linhas], dtype=object),
+        acumulou=np.array([bool(l[9]) for l in linhas], dtype=bool),
+    )
+
+
+def _ler_snapshot(cur):
+    """Lê o histórico inteiro e devolve (snapshot, assinatura dos sorteios lidos)."""
+    cur.execute(QUERY_SNAPSHOT)
+    linhas = cur.fetchall()
+    if not linhas:
+        return SnapshotHistorico(**_colunas(linhas)), None
+    return SnapshotHistorico(**_colunas(linhas), pesos=_pesos(linhas[0][10:15])), linhas[0][15]
+
+
+def carregar_snapshot():
+    """Carrega o histórico inteiro em uma única ida ao banco."""
+    with conectar_banco() as conn:
+        cur = conn.cursor()
+        snap, _ = _ler_snapshot(cur)
+        cur.close()
+    return snap
+
+
+def obter_snapshot():
+    """
+    Snapshot compartilhado pelo processo, para não reler o histórico inteiro
+    a cada requisição. Cada chamada faz só a consulta de estado: sorteios
+    novos no fim entram via `anexar` (as estruturas já calculadas recebem só
+    as linhas novas). Se a assinatura dos sorteios que o snapshot já tem
+    mudou (concursos inseridos fora de ordem ou apagados, clusters
+    reclassificados, popularidade editada), recarrega tudo; pesos novos só
+    trocam o campo `pesos`. Quem recebe o snapshot não deve alterá-lo.
+    """
+    global _snapshot, _assinatura
+    with _lock_snapshot:
+        with conectar_banco() as conn:
+            cur = conn.cursor()
+            if _snapshot is None:
+                _snapshot, _assinatura = _ler_snapshot(cur)
+            else:
+                snap = _snapshot
+                cur.execute(QUERY_ESTADO, (snap.ultimo_concurso,))
+                total, assinatura_anteriores, assinatura, *pesos = cur.fetchone()
+                novos = []
+                if assinatura_anteriores == _assinatura and total != len(snap):
+                    cur.execute(QUERY_NOVOS, (snap.ultimo_concurso,))
+                    novos = cur.fetchall()
+                if assinatura_anteriores != _assinatura or total != len(snap) + len(novos):
+                    _snapshot, _assinatura = _ler_snapshot(cur)
+                else:
+                    if novos:
+                        snap = snap.anexar(**_colunas(novos))
+                    pesos = _pesos(pesos)
+                    if pesos != snap.pesos:
+                        # Cópia rasa: as estruturas calculadas não dependem dos pesos
+                        snap = copy.copy(snap)
+                        snap.pesos = pesos
+                    _snapshot, _assinatura = snap, assinatura
+            cur.close()
+        return _snapshot
+
+
+def invalidar_snapshot():
+    """Força a releitura completa na próxima chamada de obter_snapshot."""
+    global _snapshot, _assinatura
+    with _lock_snapshot:
+        _snapshot = _assinatura = None
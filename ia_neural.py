@@ -2,20 +2,60 @@ import numpy as np
 import pandas as pd
 from sklearn.neural_network import MLPRegressor
 from sklearn.preprocessing import MinMaxScaler
-from main import conectar_banco
+from main import conectar_banco, gerar_consenso_probabilidade
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import copy
+import glob
+import hashlib
+import json
+import joblib
+import multiprocessing
+import os
 import random
+import shutil
+import tempfile
+import threading
 import warnings
 
 warnings.filterwarnings("ignore", category=UserWarning)
 
-# Cache do modelo para evitar re-treino desnecessário na mesma sessão
-_cached_model = None
-_cached_scaler = None
+# --- REGISTRO DE MODELOS PERSISTIDOS ---
+# Os modelos treinados ficam em disco, versionados pelo último concurso do
+# histórico e pelos hiperparâmetros. Só há re-treino quando o histórico muda.
+# Cada versão é um diretório mlp_{versao}/ com um arquivo por semente; ele é
+# montado num diretório temporário e publicado com um único rename atômico,
+# então quem lê nunca vê um ensemble pela metade ou misturado.
+MODELOS_DIR = os.getenv("IA_MODELOS_DIR", "modelos_ia")
+# Quantidade de modelos com sementes diferentes guardados por versão.
+# A variedade dos palpites vem de sortear um deles a cada requisição.
+QTD_MODELOS = int(os.getenv("IA_QTD_MODELOS", "5"))
+# Processos usados para treinar o ensemble em paralelo (padrão: todos os núcleos)
+PROCESSOS_TREINO = int(os.getenv("IA_PROCESSOS_TREINO", str(os.cpu_count() or 1)))
+# Atualização incremental (warm start) após cada sync
+JANELA_REPLAY = int(os.getenv("IA_JANELA_REPLAY", "200"))       # concursos antigos revisitados
+EPOCAS_INCREMENTAIS = int(os.getenv("IA_EPOCAS_INCREMENTAIS", "20"))
+REFIT_A_CADA = int(os.getenv("IA_REFIT_A_CADA", "10"))           # incrementais antes de um re-treino completo
+
+HIPERPARAMETROS = {
+    "hidden_layer_sizes": (250, 150, 50), # Aumentamos a densidade
+    "activation": "relu",                 # Mantemos relu para não achatar
+    "solver": "adam",                     # Adam lida melhor com o ruído inserido
+    "max_iter": 3000,
+    "shuffle": True,                      # Embaralha os dados para evitar padrões lineares
+}
+
+# Modelos já carregados nesta sessão: {versao: [artefatos]}
+_registro = {}
+_lock_registro = threading.Lock()
+# Treinos em segundo plano: uma única thread coordena, os núcleos fazem o trabalho
+_agendador_treino = ThreadPoolExecutor(max_workers=1, thread_name_prefix="treino-ia")
+_treinos_agendados = {}
+# Versões com atualização incremental em andamento
+_incrementais_em_andamento = set()
 
 def preparar_dados():
-    conn = conectar_banco()
-    df = pd.read_sql("SELECT bola1, bola2, bola3, bola4, bola5, bola6 FROM sorteios ORDER BY concurso ASC", conn)
-    conn.close()
+    with conectar_banco() as conn:
+        df = pd.read_sql("SELECT bola1, bola2, bola3, bola4, bola5, bola6 FROM sorteios ORDER BY concurso ASC", conn)
 
     if len(df) < 20:
         return None, None, None
@@ -24,60 +64,359 @@ def preparar_dados():
     scaler = MinMaxScaler()
     dados_norm = scaler.fit_transform(df)
 
-    # Injeção de Ruído (Jitter): Adiciona uma variação mínima de 0.1% 
+    dados_norm_ruidoso = _aplicar_ruido(dados_norm)
+
+    X = dados_norm_ruidoso[:-1]
+    y = dados_norm_ruidoso[1:]
+
+    return X, y, scaler
+
+def _aplicar_ruido(dados_norm):
+    # Injeção de Ruído (Jitter): Adiciona uma variação mínima de 0.1%
     # para evitar que a rede memorize a média central
     ruido = np.random.normal(0, 0.001, dados_norm.shape)
-    dados_norm_ruidoso = np.clip(dados_norm + ruido, 0, 1)
+    return np.clip(dados_norm + ruido, 0, 1)
 
-    X = dados_norm_ruidoso[:-1] 
-    y = dados_norm_ruidoso[1:]  
-    
-    return X, y, scaler
+def obter_ultimo_concurso():
+    with conectar_banco() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT MAX(concurso) FROM sorteios")
+        ultimo = cur.fetchone()[0]
+        cur.close()
+    return ultimo or 0
 
-def prever_proximo_sorteio():
-    global _cached_model, _cached_scaler
+def versao_modelo(ultimo_concurso):
+    """Identificador da versão: último concurso + hash dos hiperparâmetros."""
+    assinatura = json.dumps(HIPERPARAMETROS, sort_keys=True, default=str)
+    return f"c{ultimo_concurso}_{hashlib.sha1(assinatura.encode()).hexdigest()[:8]}"
+
+def _diretorio_versao(versao):
+    return os.path.join(MODELOS_DIR, f"mlp_{versao}")
+
+def _caminho_modelo(diretorio, semente):
+    return os.path.join(diretorio, f"s{semente}.joblib")
+
+def treinar_modelo(X, y, scaler, semente, ultimo_concurso):
+    """Treina um MLP com a semente indicada e devolve o artefato persistível."""
+    modelo = MLPRegressor(random_state=semente, **HIPERPARAMETROS)
+    modelo.fit(X, y)
+    return {
+        "modelo": modelo,
+        "scaler": scaler,
+        # Último sorteio real (normalizado) usado como entrada da previsão
+        "entrada": y[-1].reshape(1, -1),
+        "semente": semente,
+        "ultimo_concurso": ultimo_concurso,
+        "hiperparametros": HIPERPARAMETROS,
+        # Quantas atualizações incrementais o modelo recebeu desde o último fit completo
+        "atualizacoes_incrementais": 0,
+    }
+
+def _novo_diretorio_temporario(versao):
+    os.makedirs(MODELOS_DIR, exist_ok=True)
+    return tempfile.mkdtemp(prefix=f".tmp_{versao}_", dir=MODELOS_DIR)
+
+def salvar_artefato(artefato, diretorio):
+    joblib.dump(artefato, _caminho_modelo(diretorio, artefato["semente"]))
+
+def publicar_versao(diretorio_temporario, versao):
+    """
+    Renomeia o diretório temporário completo para o da versão (atômico).
+    Se outra atualização já publicou essa versão, descarta este conjunto e
+    devolve False: a versão publicada continua inteira e sem mistura.
+    """
+    try:
+        os.rename(diretorio_temporario, _diretorio_versao(versao))
+        return True
+    except OSError:
+        shutil.rmtree(diretorio_temporario, ignore_errors=True)
+        return False
+
+def carregar_artefatos(versao):
+    """Carrega do disco os modelos de uma versão publicada (lista vazia se não houver)."""
+    caminhos = sorted(glob.glob(os.path.join(_diretorio_versao(versao), "s*.joblib")))
+    return [joblib.load(c) for c in caminhos]
+
+def remover_versoes_antigas(versao_atual):
+    """Apaga as outras versões (e arquivos soltos do formato antigo); temporários em uso ficam."""
+    atual = os.path.basename(_diretorio_versao(versao_atual))
+    for caminho in glob.glob(os.path.join(MODELOS_DIR, "mlp_*")):
+        if os.path.basename(caminho) == atual:
+            continue
+        if os.path.isdir(caminho):
+            shutil.rmtree(caminho, ignore_errors=True)
+        else:
+            os.remove(caminho)
+
+def _treinar_e_salvar(X, y, scaler, semente, ultimo_concurso, diretorio):
+    artefato = treinar_modelo(X, y, scaler, semente, ultimo_concurso)
+    salvar_artefato(artefato, diretorio)
+    return artefato
+
+def _publicar_e_registrar(diretorio, versao, artefatos):
+    """Publica a versão montada em `diretorio` e a coloca no registro em memória."""
+    if not publicar_versao(diretorio, versao):
+        artefatos = carregar_artefatos(versao)
+    remover_versoes_antigas(versao)
+    with _lock_registro:
+        _registro.clear()
+        _registro[versao] = artefatos
+    return artefatos
+
+def treinar_registro(ultimo_concurso, qtd_modelos=QTD_MODELOS):
+    """
+    Treina e persiste `qtd_modelos` MLPs com sementes distintas para a versão
+    atual, um por processo, para usar todos os núcleos disponíveis.
+    """
     X, y, scaler = preparar_dados()
-    
     if X is None:
-        return [1, 10, 20, 30, 40, 50] # Fallback mais distribuído
+        return []
 
-    # Forçamos o re-treino com uma semente aleatória para gerar palpites diferentes
-    # Se o modelo for sempre o mesmo (random_state=42), o palpite nunca muda.
-    semente_viva = random.randint(1, 9999)
+    versao = versao_modelo(ultimo_concurso)
+    sementes = random.sample(range(1, 10000), qtd_modelos)
+    processos = max(1, min(PROCESSOS_TREINO, qtd_modelos))
 
-    _cached_model = MLPRegressor(
-        hidden_layer_sizes=(250, 150, 50), # Aumentamos a densidade
-        activation='relu',                 # Mantemos relu para não achatar
-        solver='adam',                     # Adam lida melhor com o ruído inserido
-        max_iter=3000,
-        shuffle=True,                      # Embaralha os dados para evitar padrões lineares
-        random_state=semente_viva          # A mágica da variação está aqui
-    )
+    diretorio = _novo_diretorio_temporario(versao)
+    try:
+        if processos == 1:
+            artefatos = [_treinar_e_salvar(X, y, scaler, s, ultimo_concurso, diretorio) for s in sementes]
+        else:
+            # spawn: o treino é disparado de uma thread do servidor (fork copiaria locks travados)
+            contexto = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=processos, mp_context=contexto) as executor:
+                futuros = [executor.submit(_treinar_e_salvar, X, y, scaler, s, ultimo_concurso, diretorio)
+                           for s in sementes]
+                artefatos = [f.result() for f in futuros]
+    except Exception:
+        shutil.rmtree(diretorio, ignore_errors=True)
+        raise
 
-    _cached_model.fit(X, y)
-    _cached_scaler = scaler
+    return _publicar_e_registrar(diretorio, versao, artefatos)
 
-    # Pegamos o último sorteio real e aplicamos uma leve perturbação para prever
-    ultimo_sorteio = y[-1].reshape(1, -1)
-    
-    # Geramos 3 previsões e pegamos a média ponderada ou apenas a última
-    previsao_norm = _cached_model.predict(ultimo_sorteio)
-    
+def agendar_treinamento(ultimo_concurso=None):
+    """
+    Agenda o treino do ensemble em segundo plano (ex.: logo após um sync).
+    Pedidos repetidos para a mesma versão reaproveitam o treino já agendado.
+    """
+    if ultimo_concurso is None:
+        ultimo_concurso = obter_ultimo_concurso()
+    versao = versao_modelo(ultimo_concurso)
+
+    with _lock_registro:
+        futuro = _treinos_agendados.get(versao)
+        if futuro is not None and not futuro.done():
+            return futuro
+        if versao in _registro:
+            return None
+        futuro = _agendador_treino.submit(treinar_registro, ultimo_concurso)
+        _treinos_agendados.clear()
+        _treinos_agendados[versao] = futuro
+    return futuro
+
+def _carregar_versao_mais_recente():
+    """Modelos em disco com os hiperparâmetros atuais, da versão mais nova disponível."""
+    sufixo = versao_modelo(0).split("_", 1)[1]
+    versoes = set()
+    for caminho in glob.glob(os.path.join(MODELOS_DIR, f"mlp_c*_{sufixo}")):
+        versoes.add(os.path.basename(caminho).split("_")[1])
+    if not versoes:
+        return None, []
+    mais_recente = max(versoes, key=lambda v: int(v[1:]))
+    versao = f"{mais_recente}_{sufixo}"
+    return versao, carregar_artefatos(versao)
+
+def _incremental_possivel(base, ultimo_concurso):
+    """
+    A versão `base` pode ser levada até `ultimo_concurso` por uma atualização
+    incremental? Precisa ser anterior a ele e ainda não ter esgotado as
+    REFIT_A_CADA atualizações antes de um re-treino completo.
+    """
+    return (bool(base) and base[0]["ultimo_concurso"] < ultimo_concurso
+            and base[0].get("atualizacoes_incrementais", 0) + 1 < REFIT_A_CADA)
+
+def obter_modelos(ultimo_concurso=None):
+    """
+    Devolve os modelos da versão atual: memória -> disco -> re-treino.
+    Se o histórico mudou mas já existe uma versão anterior, ela continua
+    respondendo (resposta instantânea) enquanto a nova é preparada em
+    segundo plano: atualização incremental se a anterior ainda admite uma,
+    senão re-treino completo. Assim um sorteio inserido fora do pipeline
+    (POST /api/sorteios, sync.py) também chega ao ensemble.
+    Só há treino síncrono quando não existe modelo algum.
+    """
+    if ultimo_concurso is None:
+        ultimo_concurso = obter_ultimo_concurso()
+    versao = versao_modelo(ultimo_concurso)
+
+    artefatos = _registro.get(versao)
+    if artefatos:
+        return artefatos
+
+    anteriores = None
+    with _lock_registro:
+        # Outra thread pode ter carregado/treinado enquanto esperávamos
+        artefatos = _registro.get(versao) or carregar_artefatos(versao)
+        if artefatos:
+            _registro.clear()
+            _registro[versao] = artefatos
+            return artefatos
+        anteriores = next(iter(_registro.values()), None)
+        if not anteriores:
+            versao_anterior, anteriores = _carregar_versao_mais_recente()
+            if anteriores:
+                _registro[versao_anterior] = anteriores
+        if anteriores and versao in _incrementais_em_andamento:
+            return anteriores
+        if _incremental_possivel(anteriores, ultimo_concurso):
+            _incrementais_em_andamento.add(versao)
+            _agendador_treino.submit(_incremental_reservado, anteriores, ultimo_concurso, versao)
+            return anteriores
+
+    futuro = agendar_treinamento(ultimo_concurso)
+    if anteriores:
+        return anteriores
+    # Primeira execução: aguarda o treino (compartilhado entre requisições simultâneas)
+    return futuro.result() if futuro is not None else _registro.get(versao, [])
+
+def atualizar_modelos_incremental(ultimo_concurso=None):
+    """
+    Atualiza o ensemble com os concursos novos sem re-treinar do zero: cada
+    modelo recebe `partial_fit` (warm start) nos sorteios novos somados a uma
+    janela de replay dos anteriores, usando o MinMaxScaler persistido.
+    A cada REFIT_A_CADA atualizações (ou sem modelo base) agenda um re-treino
+    completo em segundo plano. Retorna o modo usado.
+    """
+    if ultimo_concurso is None:
+        ultimo_concurso = obter_ultimo_concurso()
+    versao = versao_modelo(ultimo_concurso)
+
+    with _lock_registro:
+        if versao in _registro:
+            return "atualizado"
+        if versao in _incrementais_em_andamento:
+            return "em_andamento"
+        futuro = _treinos_agendados.get(versao)
+        if futuro is not None and not futuro.done():
+            return "refit_completo"
+        base = next(iter(_registro.values()), None)
+        if not base:
+            _, base = _carregar_versao_mais_recente()
+        if not _incremental_possivel(base, ultimo_concurso):
+            base = None
+        else:
+            _incrementais_em_andamento.add(versao)
+
+    if not base:
+        agendar_treinamento(ultimo_concurso)
+        return "refit_completo"
+
+    return _incremental_reservado(base, ultimo_concurso, versao)
+
+def _incremental_reservado(base, ultimo_concurso, versao):
+    """Roda a atualização de `versao` já marcada em _incrementais_em_andamento e libera a marca."""
+    try:
+        return _atualizar_incremental(base, ultimo_concurso, versao)
+    finally:
+        with _lock_registro:
+            _incrementais_em_andamento.discard(versao)
+
+def _atualizar_incremental(base, ultimo_concurso, versao):
+    concurso_base = base[0]["ultimo_concurso"]
+    with conectar_banco() as conn:
+        df = pd.read_sql(
+            "SELECT bola1, bola2, bola3, bola4, bola5, bola6 FROM sorteios WHERE concurso > %s ORDER BY concurso ASC",
+            conn, params=(concurso_base - JANELA_REPLAY,)
+        )
+    if len(df) < 2:
+        return "sem_dados"
+
+    scaler = base[0]["scaler"]
+    dados_norm = _aplicar_ruido(np.clip(scaler.transform(df), 0, 1))
+    X, y = dados_norm[:-1], dados_norm[1:]
+
+    diretorio = _novo_diretorio_temporario(versao)
+    atualizados = []
+    try:
+        for artefato in base:
+            # Cópia: a versão anterior continua atendendo requisições durante o ajuste
+            modelo = copy.deepcopy(artefato["modelo"])
+            for _ in range(EPOCAS_INCREMENTAIS):
+                modelo.partial_fit(X, y)
+            novo = dict(
+                artefato,
+                modelo=modelo,
+                entrada=y[-1].reshape(1, -1),
+                ultimo_concurso=ultimo_concurso,
+                atualizacoes_incrementais=artefato.get("atualizacoes_incrementais", 0) + 1,
+            )
+            salvar_artefato(novo, diretorio)
+            atualizados.append(novo)
+    except Exception:
+        shutil.rmtree(diretorio, ignore_errors=True)
+        raise
+
+    _publicar_e_registrar(diretorio, versao, atualizados)
+    return "incremental"
+
+def _pos_processar(previsao_norm, scaler):
+    """Converte a saída normalizada da rede em 6 dezenas distintas entre 1 e 60."""
     # Desnormalizar
-    resultado = _cached_scaler.inverse_transform(previsao_norm)
-    
+    resultado = scaler.inverse_transform(previsao_norm)
+
     # Tratar os números
     palpite = np.round(resultado[0]).astype(int)
-    
+
     # Pós-processamento para garantir que as dezenas não fiquem coladas (ex: 30, 31, 32)
     palpite_final = []
     # Ordenamos os candidatos brutos
     candidatos = sorted([max(1, min(60, n)) for n in palpite])
-    
+
     for n in candidatos:
         # Se o número já existe ou é muito próximo (colado), aplica um salto aleatório
         while n in palpite_final:
             n = random.randint(1, 60)
         palpite_final.append(n)
-        
-    return sorted(palpite_final)
\ No newline at end of file
+
+    return sorted(palpite_final)
+
+def prever_proximo_sorteio():
+    artefatos = obter_modelos()
+
+    if not artefatos:
+        return [1, 10, 20, 30, 40, 50] # Fallback mais distribuído
+
+    # Sorteamos um dos modelos já treinados (cada um com sua semente) para gerar
+    # palpites diferentes a cada chamada sem precisar re-treinar.
+    artefato = random.choice(artefatos)
+    modelo = artefato["modelo"]
+    scaler = artefato["scaler"]
+
+    # Pegamos o último sorteio real e aplicamos uma leve perturbação para prever
+    ultimo_sorteio = artefato["entrada"]
+
+    # Geramos 3 previsões e pegamos a média ponderada ou apenas a última
+    previsao_norm = modelo.predict(ultimo_sorteio)
+
+    return _pos_processar(previsao_norm, scaler)
+
+MODOS_ENSEMBLE = ("media", "voto")
+
+def prever_ensemble(modo="media"):
+    """
+    Previsão combinando todos os modelos da versão atual, sem re-treino.
+    modo="media": média das saídas das redes antes de desnormalizar.
+    modo="voto": cada rede dá seu palpite e ficam as 6 dezenas mais votadas.
+    """
+    if modo not in MODOS_ENSEMBLE:
+        raise ValueError(f"modo deve ser um de {MODOS_ENSEMBLE}, recebido {modo!r}")
+    artefatos = obter_modelos()
+
+    if not artefatos:
+        return [1, 10, 20, 30, 40, 50] # Fallback mais distribuído
+
+    previsoes = [a["modelo"].predict(a["entrada"]) for a in artefatos]
+    scaler = artefatos[0]["scaler"]
+
+    if modo == "voto":
+        return gerar_consenso_probabilidade([_pos_processar(p, scaler) for p in previsoes])
+    return _pos_processar(np.mean(previsoes, axis=0), scaler)
@@ -0,0 +1,194 @@
+import itertools
+import os
+import threading
+from functools import lru_cache
+from math import comb
+
+import numpy as np
+
+# --- ÍNDICE DE VALIDADE DOS 50.063.860 JOGOS ---
+# Um bit por jogo de 6 dezenas, na ordem do ranking colexicográfico, marcando
+# quem passa nos filtros de elite (soma, paridade, primos e quadrantes).
+# São ~6 MB gerados uma única vez e abertos via memmap: "este jogo é válido?"
+# vira uma leitura de bit e "quais jogos válidos existem entre estas
+# candidatas?" vira uma varredura de poucos bits.
+
+# Constantes dos filtros (as mesmas de validar_palpite_elite)
+SOMA_MIN, SOMA_MAX = 150, 220
+PARES_ACEITOS = (2, 3, 4)
+PRIMOS = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41, 43, 47, 53, 59)
+PRIMOS_ACEITOS = (1, 2)
+MAX_POR_QUADRANTE = 3
+
+TOTAL_JOGOS = comb(60, 6)
+# Mude a versão sempre que os filtros mudarem: o arquivo antigo é ignorado
+VERSAO_INDICE = 1
+INDICE_ELITE_DIR = os.getenv("INDICE_ELITE_DIR", "modelos_ia")
+
+# BINOMIAL[a, i] = C(a, i), base do ranking colexicográfico
+BINOMIAL = np.array([[comb(a, i) for i in range(7)] for a in range(61)], dtype=np.int64)
+
+_indice = None
+_lock_indice = threading.Lock()
+
+
+def quadrante(n):
+    """Quadrante do volante (0..3): linhas 1-3 / 4-6 x colunas 1-5 / 6-10."""
+    linha, coluna = (n - 1) // 10, (n - 1) % 10
+    return (2 if linha >= 3 else 0) + (1 if coluna >= 5 else 0)
+
+
+# Características de cada dezena empacotadas num inteiro aditivo: somar os
+# códigos das 6 dezenas soma cada campo separadamente (nenhum transborda).
+#   bits 0-8: soma | 9-11: pares | 12-14: primos | 15-26: 4 quadrantes x 3 bits
+_CODIGO = np.zeros(61, dtype=np.int32)
+for _n in range(1, 61):
+    _CODIGO[_n] = _n | ((_n % 2 == 0) << 9) | ((_n in PRIMOS) << 12) | (1 << (15 + 3 * quadrante(_n)))
+
+
+def codigos(dezenas):
+    """
+    (..., 6) dezenas -> códigos somados (...,): três consultas de tabela por
+    dezena viram uma só, e os filtros passam a ser operações de array.
+    """
+    return _CODIGO[np.asarray(dezenas, dtype=np.intp)].sum(axis=-1, dtype=np.int32)
+
+
+def decompor_codigos(codigo):
+    """Separa os campos dos códigos somados: soma, pares, primos e contagem por quadrante (N, 4)."""
+    codigo = np.asarray(codigo)
+    return {
+        "soma": codigo & 0x1FF,
+        "pares": (codigo >> 9) & 7,
+        "primos": (codigo >> 12) & 7,
+        "quadrantes": np.stack([(codigo >> (15 + 3 * q)) & 7 for q in range(4)], axis=-1),
+    }
+
+
+def validos_por_codigo(codigo):
+    """Aplica os quatro filtros de elite sobre os códigos somados."""
+    soma = codigo & 0x1FF
+    ok = (soma >= SOMA_MIN) & (soma <= SOMA_MAX)
+    ok &= np.isin((codigo >> 9) & 7, PARES_ACEITOS) & np.isin((codigo >> 12) & 7, PRIMOS_ACEITOS)
+    for q in range(4):
+        ok &= ((codigo >> (15 + 3 * q)) & 7) <= MAX_POR_QUADRANTE
+    return ok
+
+
+# --- RANK / UNRANK (ORDEM COLEXICOGRÁFICA) ---
+
+def rank(dezenas):
+    """Jogo (6 dezenas, qualquer ordem) -> posição 0..TOTAL_JOGOS-1."""
+    return int(ranks(np.asarray([dezenas]))[0])
+
+
+def ranks(jogos):
+    """(N, 6) jogos -> (N,) int64. rank = soma de C(d_i - 1, i) com as dezenas em ordem crescente."""
+    a = np.sort(np.asarray(jogos, dtype=np.intp), axis=1) - 1
+    return BINOMIAL[a, np.arange(1, 7)].sum(axis=1)
+
+
+def unrank(r):
+    """Posição -> jogo (lista crescente de 6 dezenas)."""
+    return unranks(np.asarray([r]))[0].tolist()
+
+
+def unranks(posicoes):
+    """(N,) posições -> (N, 6) jogos. Para i = 6..1 escolhe o maior a com C(a, i) <= resto."""
+    resto = np.asarray(posicoes, dtype=np.int64).copy()
+    jogos = np.empty((len(resto), 6), dtype=np.int64)
+    for i in range(6, 0, -1):
+        a = np.searchsorted(BINOMIAL[:, i], resto, side="right") - 1
+        jogos[:, i - 1] = a + 1
+        resto -= BINOMIAL[a, i]
+    return jogos
+
+
+# --- CONSTRUÇÃO E CARGA DO BITSET ---
+
+def caminho_indice():
+    return os.path.join(INDICE_ELITE_DIR, f"indice_elite_v{VERSAO_INDICE}.bin")
+
+
+def construir_indice(caminho=None):
+    """
+    Gera o bitset completo. Em ordem colex, os k-jogos com maior dezena m vêm
+    logo após todos os k-jogos com dezenas < m, e estes são um prefixo da
+    lista; assim os códigos de cada nível saem por concatenação do anterior.
+    """
+    caminho = caminho or caminho_indice()
+    cod = _CODIGO[1:61].copy()                       # 1-jogos: índice a = dezena - 1
+    for k in range(2, 6):
+        cod = np.concatenate([cod[:comb(m, k - 1)] + _CODIGO[m + 1] for m in range(k - 1, 60)])
+
+    validos = np.zeros(TOTAL_JOGOS, dtype=bool)
+    for m in range(5, 60):                           # jogos de 6 cuja maior dezena é m + 1
+        validos[comb(m, 6):comb(m + 1, 6)] = validos_por_codigo(cod[:comb(m, 5)] + _CODIGO[m + 1])
+
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    np.packbits(validos, bitorder="little").tofile(temporario)
+    os.replace(temporario, caminho)
+    return int(validos.sum())
+
+
+def obter_indice():
+    """Bitset em memmap (uint8); gera o arquivo na primeira vez."""
+    global _indice
+    if _indice is not None:
+        return _indice
+    with _lock_indice:
+        if _indice is None:
+            caminho = caminho_indice()
+            if not os.path.exists(caminho) or os.path.getsize(caminho) != (TOTAL_JOGOS + 7) // 8:
+                construir_indice(caminho)
+            _indice = np.memmap(caminho, dtype=np.uint8, mode="r")
+    return _indice
+
+
+def validos_por_rank(posicoes):
+    posicoes = np.asarray(posicoes, dtype=np.int64)
+    bits = obter_indice()[posicoes >> 3]
+    return ((bits >> (posicoes & 7).astype(np.uint8)) & 1).astype(bool)
+
+
+def eh_valido(dezenas):
+    """O(1): o jogo passa nos filtros de elite?"""
+    return bool(validos_por_rank([rank(dezenas)])[0])
+
+
+@lru_cache(maxsize=32)
+def _combinacoes_indices(qtd, tamanho):
+    """Todas as combinações de posições 0..qtd-1, em ordem lexicográfica (reaproveitadas)."""
+    return np.array(list(itertools.combinations(range(qtd), tamanho)), dtype=np.intp).reshape(-1, tamanho)
+
+
+def _jogos_entre(candidatas):
+    candidatas = np.array(sorted(set(int(n) for n in candidatas)), dtype=np.intp)
+    if len(candidatas) < 6:
+        return np.empty((0, 6), dtype=np.intp)
+    return candidatas[_combinacoes_indices(len(candidatas), 6)]
+
+
+def validos_entre(candidatas):
+    """
+    Todos os jogos válidos formados só com as `candidatas`, na mesma ordem de
+    itertools.combinations(sorted(candidatas), 6).
+    """
+    jogos = _jogos_entre(candidatas)
+    return jogos[validos_por_rank(ranks(jogos))].tolist()
+
+
+def primeiro_valido_entre(candidatas):
+    """O primeiro jogo válido (em ordem lexicográfica) entre as candidatas, ou None."""
+    jogos = _jogos_entre(candidatas)
+    posicoes = np.flatnonzero(validos_por_rank(ranks(jogos)))
+    return jogos[posicoes[0]].tolist() if len(posicoes) else None
+
+
+if __name__ == "__main__":
+    import time
+    inicio = time.time()
+    total = construir_indice()
+    print(f"Índice gerado em {time.time() - inicio:.1f}s: {total} de {TOTAL_JOGOS} jogos passam nos filtros "
+          f"({caminho_indice()})")
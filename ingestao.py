@@ -0,0 +1,99 @@
+import time
+from itertools import islice
+
+# --- CARGA EM LOTE DE SORTEIOS (COPY + UPSERT ÚNICO) ---
+# As linhas são transmitidas sob demanda para uma tabela temporária via COPY
+# (sem um round trip por sorteio) e depois mescladas em `sorteios` com um
+# único INSERT ... SELECT ... ON CONFLICT. Usado pelas migrações.
+
+COLUNAS_BASICAS = ("concurso", "data_sorteio", "bola1", "bola2", "bola3", "bola4", "bola5", "bola6")
+COLUNAS_COMPLETAS = COLUNAS_BASICAS + ("ganhadores_sena", "ganhadores_quina", "ganhadores_quadra",
+                                       "valor_estimado_proximo", "acumulou")
+
+# Tamanho de cada bloco entregue ao COPY e linhas formatadas por vez
+_TAMANHO_BLOCO = 64 * 1024
+_LINHAS_POR_LEITURA = 512
+
+
+class _FluxoCopy:
+    """
+    Arquivo só-leitura sobre um iterador de tuplas, no formato texto do COPY
+    (tab entre colunas, \\N para nulo). O COPY puxa os dados em blocos, então
+    nada precisa caber inteiro na memória.
+    """
+
+    def __init__(self, linhas):
+        self._linhas = iter(linhas)
+        self._resto = ""
+        self.total = 0
+
+    @staticmethod
+    def _linha(linha):
+        return "\t".join(r"\N" if v is None else str(v) for v in linha) + "\n"
+
+    def read(self, tamanho=-1):
+        while tamanho < 0 or len(self._resto) < tamanho:
+            lote = list(islice(self._linhas, _LINHAS_POR_LEITURA))
+            if not lote:
+                break
+            self._resto += "".join(self._linha(l) for l in lote)
+            self.total += len(lote)
+        if tamanho < 0:
+            dados, self._resto = self._resto, ""
+        else:
+            dados, self._resto = self._resto[:tamanho], self._resto[tamanho:]
+        return dados
+
+
+def data_iso(data):
+    """'DD/MM/AAAA' -> 'AAAA-MM-DD' (o COPY não conhece o formato brasileiro)."""
+    if not data:
+        return None
+    dia, mes, ano = data.strip().split("/")
+    return f"{ano}-{mes}-{dia}"
+
+
+def linha_api(dados):
+    """Um concurso no formato da API de resultados -> tupla no formato de COLUNAS_COMPLETAS."""
+    dezenas = [int(n) for n in dados['dezenas']]
+    premiacoes = (dados.get('premiacoes') or [])[:3]
+    ganhadores = [p.get('ganhadores') for p in premiacoes] + [None] * (3 - len(premiacoes))
+    return (
+        int(dados['concurso']), data_iso(dados['data']), *dezenas[:6],
+        *ganhadores, dados.get('valorEstimadoProximoConcurso'), dados.get('acumulou')
+    )
+
+
+def carregar_sorteios(cur, linhas, colunas=COLUNAS_BASICAS, atualizar=()):
+    """
+    Carrega as `linhas` (tuplas na ordem de `colunas`) em `sorteios`: COPY
+    para a tabela temporária sorteios_carga e um único upsert. Com `atualizar`,
+    essas colunas são sobrescritas em concursos já existentes; sem, os
+    existentes ficam como estão. Não faz commit.
+    Devolve (linhas_lidas, linhas_gravadas, segundos).
+    """
+    inicio = time.perf_counter()
+    lista = ", ".join(colunas)
+    cur.execute("CREATE TEMP TABLE IF NOT EXISTS sorteios_carga (LIKE sorteios INCLUDING DEFAULTS) ON COMMIT DROP")
+    cur.execute("TRUNCATE sorteios_carga")
+
+    fluxo = _FluxoCopy(linhas)
+    cur.copy_expert(f"COPY sorteios_carga ({lista}) FROM STDIN", fluxo, size=_TAMANHO_BLOCO)
+
+    if atualizar:
+        conflito = "DO UPDATE SET " + ", ".join(f"{c} = EXCLUDED.{c}" for c in atualizar)
+    else:
+        conflito = "DO NOTHING"
+    # DISTINCT ON: um concurso repetido na carga não pode ser atualizado duas vezes
+    cur.execute(f"""
+        INSERT INTO sorteios ({lista})
+        SELECT DISTINCT ON (concurso) {lista} FROM sorteios_carga ORDER BY concurso
+        ON CONFLICT (concurso) {conflito}
+    """)
+    gravadas = cur.rowcount
+    return fluxo.total, gravadas, time.perf_counter() - inicio
+
+
+def relatorio(lidas, gravadas, segundos):
+    taxa = lidas / segundos if segundos > 0 else float("inf")
+    return f"{lidas} linhas lidas, {gravadas} gravadas em {segundos:.2f}s ({taxa:,.0f} linhas/s)"
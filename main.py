@@ -1,11 +1,17 @@
-import psycopg2
-import os
 import random
-import itertools
 from collections import Counter
-from dotenv import load_dotenv
-
-load_dotenv()
+import numpy as np
+import psycopg2.extras
+from banco import conectar_banco
+from historico import invalidar_snapshot, obter_snapshot
+from afinidade import sincronizar_matriz_afinidade
+from cache_estrategias import em_cache, invalidar_cache
+from otimizador import PESOS_PADRAO, buscar_melhores_pesos
+from mascaras import contar_acertos, histograma_acertos, mascara, mascaras_de_listas
+from indice_elite import (
+    MAX_POR_QUADRANTE, PARES_ACEITOS, PRIMOS, PRIMOS_ACEITOS, SOMA_MAX, SOMA_MIN,
+    codigos, decompor_codigos, primeiro_valido_entre, validos_por_codigo
+)
 
 # --- CONSTANTES GLOBAIS ---
 # Dezenas que historicamente acumulam mais por serem menos jogadas
@@ -13,217 +19,73 @@ ZONAS_SILENCIOSAS = [41, 42, 43, 51, 52, 53, 54, 58, 59, 60]
 # Dezenas com maior frequência histórica (corrigido erro de zeros à esquerda)
 DEZENAS_MAIS_FREQUENTES_HISTORICAS = [10, 53, 5, 37, 23, 33, 4, 41, 30, 42]
 
-def conectar_banco():
-    return psycopg2.connect(
-        host=os.getenv("DB_HOST"),
-        database=os.getenv("DB_NAME"),
-        user=os.getenv("DB_USER"),
-        password=os.getenv("DB_PASS"),
-        port=os.getenv("DB_PORT")
-    )
-
 # --- FUNÇÕES DE APOIO ESTATÍSTICO ---
 
-def obter_analise_sql():
-    conn = conectar_banco()
-    cur = conn.cursor()
-    
-    # 1. Histórico Total
-    cur.execute("SELECT numero, COUNT(*) FROM v_frequencia_numeros GROUP BY numero ORDER BY COUNT DESC;")
-    hist = cur.fetchall()
-
-    # 2. Janela Recente (20 concursos)
-    query_recente = """
-        WITH ultimos_sorteios AS (
-            SELECT bola1, bola2, bola3, bola4, bola5, bola6 
-            FROM sorteios ORDER BY concurso DESC LIMIT 20
-        )
-        SELECT numero, COUNT(*) FROM (
-            SELECT bola1 AS numero FROM ultimos_sorteios
-            UNION ALL SELECT bola2 FROM ultimos_sorteios
-            UNION ALL SELECT bola3 FROM ultimos_sorteios
-            UNION ALL SELECT bola4 FROM ultimos_sorteios
-            UNION ALL SELECT bola5 FROM ultimos_sorteios
-            UNION ALL SELECT bola6 FROM ultimos_sorteios
-        ) t GROUP BY numero ORDER BY COUNT DESC;
-    """
-    cur.execute(query_recente)
-    rec = cur.fetchall()
-
-    # 3. Atraso (Maduros)
-    cur.execute("SELECT numero FROM v_atraso_numeros ORDER BY concursos_de_atraso DESC;")
-    atraso = cur.fetchall()
-
-    cur.close()
-    conn.close()
-    return hist, rec, atraso
-
 def gerar_jogo(lista_base, quantidade=15):
     """Extrai uma lista de inteiros de tuplas SQL."""
     return [int(n[0]) for n in lista_base[:quantidade]]
 
-def obter_dezenas_por_popularidade(limite_popularidade=1.2, top=20):
-    conn = conectar_banco()
-    cur = conn.cursor()
-    query = """
-        WITH sorteios_populares AS (
-            SELECT bola1, bola2, bola3, bola4, bola5, bola6 
-            FROM sorteios WHERE indice_popularidade >= %s
-        ),
-        contagem AS (
-            SELECT numero, COUNT(*) as freq FROM (
-                SELECT bola1 AS numero FROM sorteios_populares UNION ALL SELECT bola2 FROM sorteios_populares
-                UNION ALL SELECT bola3 FROM sorteios_populares UNION ALL SELECT bola4 FROM sorteios_populares
-                UNION ALL SELECT bola5 FROM sorteios_populares UNION ALL SELECT bola6 FROM sorteios_populares
-            ) t GROUP BY numero
-        )
-        SELECT numero FROM contagem ORDER BY freq DESC LIMIT %s;
-    """
-    cur.execute(query, (limite_popularidade, top))
-    res = cur.fetchall()
-    cur.close()
-    conn.close()
-    return [int(n[0]) for n in res]
-
-def obter_matriz_vizinhanca_historica(top=10):
-    conn = conectar_banco()
-    cur = conn.cursor()
-    # Adicionamos um filtro WHERE para garantir que não pegamos nulos durante o reprocessamento
-    cur.execute("""
-        SELECT numero_b, SUM(peso_conexao) as forca 
-        FROM matriz_afinidade 
-        WHERE numero_b IS NOT NULL 
-        GROUP BY numero_b 
-        ORDER BY forca DESC LIMIT %s
-    """, (top,))
-    res = cur.fetchall()
-    cur.close()
-    conn.close()
-    return [int(n[0]) for n in res if n[0] is not None]
-
-def obter_dezenas_momentum(min_atraso=3, max_atraso=15, top=10):
-    conn = conectar_banco()
-    cur = conn.cursor()
-    cur.execute("SELECT numero FROM v_atraso_numeros WHERE concursos_de_atraso BETWEEN %s AND %s ORDER BY concursos_de_atraso ASC LIMIT %s", (min_atraso, max_atraso, top))
-    res = cur.fetchall()
-    cur.close()
-    conn.close()
-    return [int(n[0]) for n in res]
-
 # --- MOTOR DE OTIMIZAÇÃO (BACKTEST) ---
 
-def otimizar_pesos_convergencia(limite_backtest=10):
+def otimizar_pesos_convergencia(limite_backtest=10, faixas=None, snapshot=None):
     """
     Analisa os últimos concursos para definir os melhores pesos das camadas,
     focando em maximizar acertos de Quadra, Quina e Sena.
-    Salva o resultado na tabela configuracao_pesos.
+    O grid search é vetorizado (otimizador.py) e cobre as cinco camadas,
+    inclusive silêncio e ruído. Salva o resultado na tabela configuracao_pesos.
     """
-    conn = conectar_banco()
-    cur = conn.cursor()
-    
-    # Busca os resultados reais mais recentes para o teste
-    cur.execute("""
-        SELECT concurso, bola1, bola2, bola3, bola4, bola5, bola6 
-        FROM sorteios ORDER BY concurso DESC LIMIT %s
-    """, (limite_backtest,))
-    resultados_reais = cur.fetchall()
-    cur.close()
-    conn.close()
-
-    # Definição das faixas de peso para testar (Grid Search)
-    faixas = [1.0, 2.0, 3.0]
-    melhor_config = {"pop": 3.0, "som": 1.5, "sil": 1.0, "mom": 2.0}
-    melhor_pontuacao = -1
-
-    # Pré-carregamento dos dados das camadas (ganho de performance)
-    populares = obter_dezenas_por_popularidade(top=15)
-    sombras = obter_matriz_vizinhanca_historica(top=10)
-    momentum = obter_dezenas_momentum()
-    
-    # Obtemos o histórico para definir o "ruído" dinamicamente
-    hist_base, _, _ = obter_analise_sql()
-    dezenas_ruido = [int(n[0]) for n in hist_base[:10]]
+    snap = snapshot if snapshot is not None else obter_snapshot()
+
+    # Pré-carregamento dos dados das camadas a partir do snapshot (uma leitura)
+    camadas = {
+        "pop": snap.populares(top=15),
+        "som": snap.vizinhanca(top=10),
+        "sil": ZONAS_SILENCIOSAS,
+        # O "ruído" vem das dezenas mais frequentes do histórico
+        "ruido": [n for n, _ in snap.frequencia()[:10]],
+        "mom": snap.momentum(),
+    }
+    # Resultados reais mais recentes para o teste
+    resultados_reais = snap.dezenas[-limite_backtest:]
 
     print(f"Iniciando Otimização (Backtest) nos últimos {limite_backtest} concursos...")
-
-    # Loop de combinações de pesos
-    for p_pop in faixas:
-        for p_som in faixas:
-            for p_mom in faixas:
-                acertos_totais = 0
-                
-                for res in resultados_reais:
-                    gabarito = set(res[1:])
-                    
-                    # Simula o motor de pontuação para esta combinação específica
-                    teste_pesos = Counter()
-                    for n in populares: teste_pesos[n] += p_pop
-                    for n in sombras: teste_pesos[n] += p_som
-                    for n in ZONAS_SILENCIOSAS: teste_pesos[n] += 1.0
-                    for n in dezenas_ruido: teste_pesos[n] += 1.0
-                    for n in momentum: teste_pesos[n] += p_mom
-                    
-                    # Gera o palpite de 6 números desta simulação
-                    palpite = [n for n, c in teste_pesos.most_common(6)]
-                    acertos = len(set(palpite).intersection(gabarito))
-                    
-                    # --- NOVA LÓGICA DE PONTUAÇÃO (FOCO EM GRANDES PRÊMIOS) ---
-                    # NOVA TABELA DE RECOMPENSA (REINFORCEMENT LEARNING)
-                    if acertos == 6: 
-                        pontos_tentativa = 5000  # Foco na Sena
-                    elif acertos == 5: 
-                        pontos_tentativa = 800   # Quina agora vale 80x mais que o normal
-                    elif acertos == 4: 
-                        pontos_tentativa = 50    # Quadra vale 5x mais que o terno
-                    elif acertos == 3:
-                        pontos_tentativa = 5     # Terno é apenas um "bom sinal"
-                    else:
-                        pontos_tentativa = 0     # 0, 1 ou 2 acertos são considerados erro total
-                        
-                    acertos_totais += pontos_tentativa
-
-                # Verifica se esta combinação de pesos superou a anterior
-                if acertos_totais > melhor_pontuacao:
-                    melhor_pontuacao = acertos_totais
-                    melhor_config = {
-                        "pop": p_pop, 
-                        "som": p_som, 
-                        "sil": 1.0, 
-                        "mom": p_mom
-                    }
+    melhor_config, melhor_pontuacao, testadas = buscar_melhores_pesos(
+        camadas, resultados_reais, faixas, referencia=snap.pesos
+    )
 
     # Salva a melhor configuração encontrada no banco de dados (Cache)
     salvar_pesos_otimizados(melhor_config)
     
-    print(f"Otimização concluída! Melhor Pontuação Histórica: {melhor_pontuacao}")
+    print(f"Otimização concluída ({testadas} combinações)! Melhor Pontuação Histórica: {melhor_pontuacao}")
     print(f"Pesos salvos: {melhor_config}")
     
     return melhor_config
 
 # --- PROCESSAMENTO PRINCIPAL ---
 
-def processar_todas_estrategias():
+@em_cache
+def processar_todas_estrategias(snapshot=None, janela_recente=20):
     """
     Motor Central de Decisão: Orquestra todas as camadas estatísticas,
     aplica pesos adaptativos via Clusters e integra a lógica de Ciclos.
+    Todas as camadas saem de um único snapshot do histórico (uma leitura no banco).
+    `janela_recente` é o tamanho (em concursos) da janela de "Tendência Recente".
     """
-    conn = conectar_banco()
-    cur = conn.cursor()
-    
+    snap = snapshot if snapshot is not None else obter_snapshot()
+
     # 1. Identificação da Tendência via Clusters (Padrão vs Zebra)
-    cur.execute("SELECT cluster_tipo FROM sorteios ORDER BY concurso DESC LIMIT 3")
-    ultimos_clusters = [r[0] for r in cur.fetchall()]
+    ultimos_clusters = snap.ultimos_clusters(3)
     # Lógica de Reversão à Média: Se muito caos, espera-se ordem (e vice-versa)
     tendencia_proxima = "PADRAO" if ultimos_clusters.count("ZEBRA") >= 2 else "ZEBRA"
 
     # 2. Obtenção dos Dados Base
-    hist, rec, atraso = obter_analise_sql()
+    hist, rec, atraso = snap.frequencia(), snap.janela_recente(janela_recente), snap.atrasos()
     
     # 3. Definição de Pesos Base (IA Cache)
-    try:
-        config = obter_pesos_cache()
-    except:
-        config = {"pop": 3.0, "som": 1.5, "mom": 2.0, "sil": 1.0}
+    if snap.pesos is not None:
+        config = dict(snap.pesos)
+    else:
+        config = dict(PESOS_PADRAO)
 
     # AJUSTE DINÂMICO POR CLUSTER
     if tendencia_proxima == "PADRAO":
@@ -249,24 +111,24 @@ def processar_todas_estrategias():
     pesos_final = Counter()
     
     # Sub-camada A: Popularidade
-    populares = obter_dezenas_por_popularidade(top=15)
+    populares = snap.populares(top=15)
     for n in populares: pesos_final[n] += config["pop"]
 
     # Sub-camada B: Sombras/Vizinhança
-    sombras = obter_matriz_vizinhanca_historica(top=10)
+    sombras = snap.vizinhanca(top=10)
     for n in sombras: pesos_final[n] += config["som"]
 
     # Sub-camada C: Ruído e Zonas Silenciosas
     for n in ZONAS_SILENCIOSAS: pesos_final[n] += config["sil"]
     dezenas_ruido = [int(n[0]) for n in hist[:10]]
-    for n in dezenas_ruido: pesos_final[n] += 1.0
+    for n in dezenas_ruido: pesos_final[n] += config.get("ruido", 1.0)
 
     # Sub-camada D: Momentum (Atraso)
-    momentum = obter_dezenas_momentum()
+    momentum = snap.momentum()
     for n in momentum: pesos_final[n] += config["mom"]
     
     # Sub-camada E: Ciclo de Fechamento (Urgência)
-    dezenas_pendentes = obter_dezenas_pendentes_ciclo()
+    dezenas_pendentes = snap.pendentes_ciclo()
     pesos_urgencia = calcular_peso_urgencia(dezenas_pendentes)
     for n, peso_extra in pesos_urgencia.items():
         pesos_final[n] += peso_extra
@@ -281,82 +143,72 @@ def processar_todas_estrategias():
     # "Misto do Grupo" é igual a "Alta Convergência" para consistência
     misto = sorted(palpite_ia)
 
-    cur.close()
-    conn.close()
+    base = {
+        "Mais Saem": sorted(e1_mais_saem[:6]),
+        "Tendência Recente": sorted(e3_recente[:6]),
+        "Números Atrasados": sorted(e4_atrasados[:6]),
+        "Aleatório": sorted(e6_aleatoria)
+    }
+    meta = {
+        "Alta Convergência": sorted(palpite_ia),
+        "Favoritos do Grupo": sorted(meta_frequentes),
+        "Misto do Grupo": misto
+    }
+
+    # Afinidade de grupo (pares, trios e quadras do histórico) de cada perfil
+    perfis = {nome: jogo for nome, jogo in {**base, **meta}.items() if len(jogo) == 6}
+    lift = snap.coocorrencia.pontuar(list(perfis.values()))["lift"] if perfis else []
 
     return {
-        "base": {
-            "Mais Saem": sorted(e1_mais_saem[:6]),
-            "Tendência Recente": sorted(e3_recente[:6]),
-            "Números Atrasados": sorted(e4_atrasados[:6]),
-            "Aleatório": sorted(e6_aleatoria)
-        },
-        "meta": {
-            "Alta Convergência": sorted(palpite_ia),
-            "Favoritos do Grupo": sorted(meta_frequentes),
-            "Misto do Grupo": misto
-        },
+        "base": base,
+        "meta": meta,
+        "afinidade_grupo": {nome: round(float(l), 3) for nome, l in zip(perfis, lift)},
         "debug_ia": {
             "tendencia_detectada": tendencia_proxima,
             "total_pendentes": len(dezenas_pendentes)
         },
-        "palpite_ia_raw": palpite_ia
+        "palpite_ia_raw": palpite_ia,
+        # Pontuação final de cada dezena (base da geração em massa, gerador.py)
+        "pesos_dezenas": {int(n): float(p) for n, p in pesos_final.items()}
     }
 
-def processar_matriz_afinidade():
-    conn = conectar_banco()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM matriz_afinidade;")
-    cur.execute("SELECT bola1, bola2, bola3, bola4, bola5, bola6 FROM sorteios WHERE indice_popularidade > 1.0")
-    sorteios = cur.fetchall()
-    
-    conexoes = Counter()
-    for s in sorteios:
-        nums = sorted(list(s))
-        for par in itertools.combinations(nums, 2):
-            conexoes[par] += 1
-            
-    for (a, b), peso in conexoes.items():
-        cur.execute("INSERT INTO matriz_afinidade (numero_a, numero_b, peso_conexao) VALUES (%s, %s, %s)", (a, b, peso))
-    
-    conn.commit()
-    cur.close()
-    conn.close()
-    print("Matriz de Afinidade atualizada!")
+def processar_matriz_afinidade(reconstruir=False):
+    """
+    Grava na tabela só as células da matriz do snapshot que mudaram (ver
+    afinidade.py). `reconstruir` quando entraram concursos fora de ordem.
+    """
+    alteradas = sincronizar_matriz_afinidade(reconstruir)
+    print(f"Matriz de Afinidade atualizada! ({alteradas} células alteradas)")
+    return alteradas
 
-# Funções extras (simular_performance e analisar_ancoras_sorteio) permanecem iguais
-    
-def simular_performance(dezenas_palpite, limite_concursos=50):
-    conn = conectar_banco()
-    cur = conn.cursor()
-    
-    # Busca os últimos X resultados reais
-    cur.execute("""
-        SELECT concurso, bola1, bola2, bola3, bola4, bola5, bola6 
-        FROM sorteios ORDER BY concurso DESC LIMIT %s
-    """, (limite_concursos,))
-    sorteios_reais = cur.fetchall()
-    cur.close()
-    conn.close()
-
-    historico_acertos = []
-    palpite_set = set(dezenas_palpite)
-
-    for s in reversed(sorteios_reais): # Do mais antigo para o mais novo
-        concurso = s[0]
-        dezenas_reais = set(s[1:])
-        acertos = len(palpite_set.intersection(dezenas_reais))
-        historico_acertos.append({"concurso": concurso, "acertos": acertos})
-        
-    return historico_acertos
+# Palpites conferidos por vez no lote (limita a matriz palpites x sorteios em memória)
+_BLOCO_SIMULACAO = 4096
+
+def simular_performance_lote(palpites, concurso_inicio=None, concurso_fim=None, snapshot=None):
+    """
+    Confere M palpites (de qualquer tamanho) contra todos os sorteios do
+    intervalo [concurso_inicio, concurso_fim] do histórico, numa passada só.
+    Retorna (histograma, qtd_sorteios): histograma é (M, 7), com quantas vezes
+    cada palpite fez 0, 1, ..., 6 acertos.
+    """
+    snap = snapshot if snapshot is not None else obter_snapshot()
+    inicio = snap.indice_do_concurso(concurso_inicio) if concurso_inicio is not None else 0
+    fim = snap.indice_do_concurso(concurso_fim + 1) if concurso_fim is not None else len(snap)
+    sorteios = snap.mascaras[inicio:fim]
+
+    mascaras_palpites = mascaras_de_listas(palpites)
+    histograma = np.zeros((len(mascaras_palpites), 7), dtype=np.int64)
+    for i in range(0, len(mascaras_palpites), _BLOCO_SIMULACAO):
+        histograma[i:i + _BLOCO_SIMULACAO] = histograma_acertos(mascaras_palpites[i:i + _BLOCO_SIMULACAO], sorteios)
+
+    return histograma, len(sorteios)
 
 def analisar_ancoras_sorteio(concurso_id):
-    conn = conectar_banco()
-    cur = conn.cursor()
-    cur.execute("SELECT bola1, bola2, bola3, bola4, bola5, bola6 FROM sorteios WHERE concurso = %s", (concurso_id,))
-    sorteio = cur.fetchone()
-    cur.close()
-    conn.close()
+    with conectar_banco() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT bola1, bola2, bola3, bola4, bola5, bola6 FROM sorteios WHERE concurso = %s", (concurso_id,))
+        sorteio = cur.fetchone()
+        cur.close()
 
     if not sorteio: return []
 
@@ -380,78 +232,75 @@ def analisar_ancoras_sorteio(concurso_id):
 
 def salvar_pesos_otimizados(config):
     """Salva a melhor configuração encontrada no banco de dados."""
-    conn = conectar_banco()
-    cur = conn.cursor()
-    cur.execute("""
-        UPDATE configuracao_pesos 
-        SET peso_popularidade = %s, peso_sombra = %s, peso_momentum = %s, 
-            peso_silencio = %s, ultima_atualizacao = CURRENT_TIMESTAMP
-        WHERE id = 1
-    """, (config['pop'], config['som'], config['mom'], config['sil']))
-    conn.commit()
-    cur.close()
-    conn.close()
-
-def obter_pesos_cache():
-    """Lê os pesos salvos no banco para carregamento instantâneo."""
-    conn = conectar_banco()
-    cur = conn.cursor()
-    cur.execute("SELECT peso_popularidade, peso_sombra, peso_momentum, peso_silencio FROM configuracao_pesos WHERE id = 1")
-    res = cur.fetchone()
-    cur.close()
-    conn.close()
-    return {"pop": float(res[0]), "som": float(res[1]), "mom": float(res[2]), "sil": float(res[3])}
-
-def processar_aprendizado_reforco():
-    conn = conectar_banco()
-    cur = conn.cursor()
-    
-    # 1. Pega o último sorteio real
-    cur.execute("SELECT concurso, bola1, bola2, bola3, bola4, bola5, bola6 FROM sorteios ORDER BY concurso DESC LIMIT 1")
-    ultimo_real = cur.fetchone()
-    concurso_num = ultimo_real[0]
-    gabarito = set(ultimo_real[1:])
-
-    # 2. Busca a última previsão que a máquina fez para esse concurso
-    cur.execute("SELECT dezenas_previstas, pesos_utilizados FROM historico_previsoes WHERE concurso_alvo = %s", (concurso_num,))
-    previsao = cur.fetchone()
-
-    if previsao:
-        previstos = set(previsao[0])
-        pesos_antigos = previsao[1]
-        acertos = len(previstos.intersection(gabarito))
-        
-        # 3. LÓGICA DE AJUSTE (O "APRENDIZADO")
-        # Se acertamos pouco (menos de 3), vamos forçar uma re-otimização agressiva
-        # Se acertamos Quadra ou Quina, vamos "congelar" e dar bônus para esses pesos
-        novo_ajuste_necessario = acertos < 4 
-
-        if novo_ajuste_necessario:
-            print(f"Acertos: {acertos}. Iniciando recalibragem para aprender com o erro...")
-            # Chamamos a otimização aumentando o limite de busca (olhando mais para trás)
-            otimizar_pesos_convergencia(limite_backtest=20) 
+    with conectar_banco() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            UPDATE configuracao_pesos 
+            SET peso_popularidade = %s, peso_sombra = %s, peso_momentum = %s, 
+                peso_silencio = %s, peso_ruido = %s, ultima_atualizacao = CURRENT_TIMESTAMP
+            WHERE id = 1
+        """, (config['pop'], config['som'], config['mom'], config['sil'], config.get('ruido', 1.0)))
+        conn.commit()
+        cur.close()
+    # Pesos novos mudam todas as estratégias calculadas
+    invalidar_cache()
+
+def processar_aprendizado_reforco(concursos=None, recalibrar=True):
+    """
+    Confere as previsões registradas para os `concursos` (padrão: só o último)
+    e devolve {concurso: acertos}. Se algum teve menos de 4 acertos e
+    `recalibrar`, re-otimiza os pesos olhando mais para trás; o pipeline passa
+    recalibrar=False e roda a otimização uma vez só no estágio seguinte.
+    """
+    with conectar_banco() as conn:
+        cur = conn.cursor()
+
+        # 1. Pega os sorteios reais e a previsão que a máquina fez para cada um
+        if concursos is None:
+            cur.execute("SELECT MAX(concurso) FROM sorteios")
+            concursos = [cur.fetchone()[0]]
+        cur.execute("""
+            SELECT s.concurso, s.bola1, s.bola2, s.bola3, s.bola4, s.bola5, s.bola6, h.dezenas_previstas
+            FROM sorteios s JOIN historico_previsoes h ON h.concurso_alvo = s.concurso
+            WHERE s.concurso = ANY(%s) ORDER BY s.concurso
+        """, (list(concursos),))
+        conferidos = cur.fetchall()
+        cur.close()
+
+    acertos = {l[0]: int(contar_acertos(mascara(l[7]), mascara(l[1:7]))) for l in conferidos}
+
+    # 2. LÓGICA DE AJUSTE (O "APRENDIZADO")
+    # Se acertamos pouco (menos de 4), vamos forçar uma re-otimização agressiva
+    # Se acertamos Quadra ou Quina, vamos "congelar" e dar bônus para esses pesos
+    for concurso, n in acertos.items():
+        if n < 4:
+            print(f"Concurso {concurso}: {n} acertos. Iniciando recalibragem para aprender com o erro...")
         else:
-            print(f"Excelente performance ({acertos} acertos). Mantendo e reforçando pesos.")
-            
-    cur.close()
-    conn.close()
-    
+            print(f"Concurso {concurso}: excelente performance ({n} acertos). Mantendo e reforçando pesos.")
+    if recalibrar and precisa_recalibrar(acertos):
+        # Chamamos a otimização aumentando o limite de busca (olhando mais para trás)
+        otimizar_pesos_convergencia(limite_backtest=20)
+    return acertos
+
+
+def precisa_recalibrar(acertos):
+    return any(n < 4 for n in acertos.values())
+
 def validar_palpite_elite(dezenas):
     """Verifica se o jogo respeita as constantes matemáticas da Mega-Sena."""
     # 1. Filtro de Soma (Intervalo de maior probabilidade)
     soma = sum(dezenas)
-    if not (150 <= soma <= 220):
+    if not (SOMA_MIN <= soma <= SOMA_MAX):
         return False
 
     # 2. Filtro de Paridade (Equilíbrio entre Pares e Ímpares)
     pares = len([n for n in dezenas if n % 2 == 0])
-    if pares not in [2, 3, 4]: # Aceita proporções 2x4, 3x3 ou 4x2
+    if pares not in PARES_ACEITOS: # Aceita proporções 2x4, 3x3 ou 4x2
         return False
 
     # 3. Filtro de Números Primos (Histórico de 1 a 2 por sorteio)
-    primos_ref = [2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41, 43, 47, 53, 59]
-    qtd_primos = len([n for n in dezenas if n in primos_ref])
-    if qtd_primos not in [1, 2]:
+    qtd_primos = len([n for n in dezenas if n in PRIMOS])
+    if qtd_primos not in PRIMOS_ACEITOS:
         return False
 
     # 4. Filtro de Quadrantes (Distribuição no volante)
@@ -465,56 +314,44 @@ def validar_palpite_elite(dezenas):
         else: q4 += 1
     
     # Evita que um único quadrante tenha mais de 3 números (concentração excessiva)
-    if any(q > 3 for q in [q1, q2, q3, q4]):
+    if any(q > MAX_POR_QUADRANTE for q in [q1, q2, q3, q4]):
         return False
 
     return True
 
+def validar_palpites_elite_lote(jogos):
+    """
+    Versão vetorizada de validar_palpite_elite: (N, 6) jogos -> (N,) bool.
+    Soma, pares, primos e quadrantes saem de uma tabela por dezena (indice_elite.py).
+    """
+    jogos = np.asarray(jogos).reshape(-1, 6)
+    return validos_por_codigo(codigos(jogos))
+
+def metadados_lote(jogos):
+    """(N, 6) jogos -> lista de {"soma", "paridade", "primos", "elite"} para a auditoria."""
+    jogos = np.asarray(jogos).reshape(-1, 6)
+    cod = codigos(jogos)
+    partes = decompor_codigos(cod)
+    elite = validos_por_codigo(cod)
+    return [
+        {"soma": int(s), "paridade": f"{int(p)}P/{6 - int(p)}I", "primos": int(q), "elite": bool(e)}
+        for s, p, q, e in zip(partes["soma"], partes["pares"], partes["primos"], elite)
+    ]
+
 def gerar_alta_convergencia_filtrada(pesos_final):
     """Gera o palpite de elite utilizando os pesos da IA e os filtros biométricos."""
     # Extrai as 12 melhores dezenas segundo a IA para criar combinações
     candidatos = [n for n, c in pesos_final.most_common(12)]
     
-    # Testa combinações de 6 números entre as 12 melhores dezenas
-    # O itertools.combinations garante que buscaremos a melhor harmonia estatística
-    for combo in itertools.combinations(sorted(candidatos), 6):
-        if validar_palpite_elite(combo):
-            return list(combo)
+    # Primeira combinação de 6 entre as 12 melhores (em ordem lexicográfica)
+    # que passa nos filtros, consultada no índice pré-calculado (indice_elite.py)
+    combo = primeiro_valido_entre(candidatos)
+    if combo is not None:
+        return combo
             
     # Fallback de segurança: caso nenhuma combinação passe nos filtros rigorosos
     return [n for n, c in pesos_final.most_common(6)]
 
-def obter_dezenas_pendentes_ciclo():
-    """
-    Rastreia o ciclo atual: identifica quais dezenas ainda não saíram 
-    desde que o último ciclo de 60 números foi completado.
-    """
-    conn = conectar_banco()
-    cur = conn.cursor()
-    
-    # Buscamos os sorteios do mais recente para o mais antigo
-    cur.execute("SELECT bola1, bola2, bola3, bola4, bola5, bola6 FROM sorteios ORDER BY concurso DESC")
-    sorteios = cur.fetchall()
-    cur.close()
-    conn.close()
-
-    dezenas_encontradas = set()
-    dezenas_pendentes = set(range(1, 61))
-
-    # Vamos voltando no tempo até que tenhamos encontrado as 60 dezenas
-    # ou até acabar o histórico (início de um novo ciclo)
-    for s in sorteios:
-        for bola in s:
-            if bola in dezenas_pendentes:
-                dezenas_pendentes.remove(bola)
-        
-        # Se as pendentes acabarem, significa que o ciclo fechou exatamente aqui
-        # Mas queremos as pendentes do ciclo ATUAL, então paramos se o ciclo anterior fechar
-        if len(dezenas_pendentes) == 0:
-            break
-            
-    return list(dezenas_pendentes)
-
 def calcular_peso_urgencia(dezenas_pendentes):
     """
     Atribui um bônus de peso para dezenas baseando-se na proximidade do fim do ciclo.
@@ -552,20 +389,34 @@ def classificar_cluster_sorteio(dezenas, acumulou):
     
     return "ZEBRA" if is_zebra else "PADRAO"
 
+def classificar_clusters_lote(jogos, acumulou):
+    """Versão vetorizada de classificar_cluster_sorteio: (N, 6) jogos + (N,) acumulou -> (N,) rótulos."""
+    partes = decompor_codigos(codigos(np.asarray(jogos).reshape(-1, 6)))
+    zebra = (partes["soma"] < SOMA_MIN) | (partes["soma"] > SOMA_MAX)
+    zebra |= ~np.isin(partes["pares"], PARES_ACEITOS)
+    zebra |= np.asarray(acumulou, dtype=bool)
+    return np.where(zebra, "ZEBRA", "PADRAO")
+
 def atualizar_clusters_historicos():
-    """Percorre o banco e classifica todos os sorteios existentes."""
-    conn = conectar_banco()
-    cur = conn.cursor()
-    cur.execute("SELECT concurso, bola1, bola2, bola3, bola4, bola5, bola6, acumulou FROM sorteios")
-    sorteios = cur.fetchall()
-    
-    for s in sorteios:
-        tipo = classificar_cluster_sorteio(list(s[1:7]), s[7])
-        cur.execute("UPDATE sorteios SET cluster_tipo = %s WHERE concurso = %s", (tipo, s[0]))
+    """Percorre o banco e classifica todos os sorteios existentes (um único UPDATE em lote)."""
+    with conectar_banco() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT concurso, bola1, bola2, bola3, bola4, bola5, bola6, acumulou, cluster_tipo FROM sorteios")
+        sorteios = cur.fetchall()
+
+        if sorteios:
+            tipos = classificar_clusters_lote([s[1:7] for s in sorteios], [bool(s[7]) for s in sorteios])
+            # Só regrava quem mudou de cluster
+            mudancas = [(str(t), s[0]) for s, t in zip(sorteios, tipos) if s[8] != t]
+            psycopg2.extras.execute_values(cur, """
+                UPDATE sorteios AS s SET cluster_tipo = v.tipo
+                FROM (VALUES %s) AS v(tipo, concurso)
+                WHERE s.concurso = v.concurso
+            """, mudancas, page_size=1000)
     
-    conn.commit()
-    cur.close()
-    conn.close()
+        conn.commit()
+        cur.close()
+    invalidar_snapshot()
     print("Clusters históricos atualizados com sucesso!")
     
 def gerar_fusao_cibernetica(palpite_neural, palpite_ia_estatistico):
@@ -0,0 +1,66 @@
+import numpy as np
+
+# --- DEZENAS COMO MÁSCARAS DE BITS ---
+# Cada sorteio/palpite vira um inteiro de 64 bits com o bit n ligado para a
+# dezena n (1..60). Conferir acertos passa a ser um AND seguido de popcount,
+# o que permite comparar um palpite com o histórico inteiro (ou milhões de
+# palpites com um sorteio) numa única operação de array.
+
+_UM = np.uint64(1)
+
+
+def mascara(dezenas):
+    """Uma lista de dezenas -> np.uint64."""
+    m = 0
+    for n in dezenas:
+        m |= 1 << int(n)
+    return np.uint64(m)
+
+
+def mascaras_dezenas(dezenas):
+    """(N, k) dezenas -> (N,) uint64 com o bit n ligado para cada dezena n."""
+    dezenas = np.asarray(dezenas, dtype=np.uint64)
+    return np.bitwise_or.reduce(np.left_shift(_UM, dezenas), axis=-1)
+
+
+def mascaras_de_listas(palpites):
+    """Lista de palpites de tamanhos variados (ex.: 6 a 15 dezenas) -> (M,) uint64."""
+    return np.array([mascara(p) for p in palpites], dtype=np.uint64)
+
+
+def popcount(x):
+    """Quantidade de bits ligados, elemento a elemento."""
+    x = np.asarray(x, dtype=np.uint64)
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(x)
+    # numpy < 2.0: soma dos bits byte a byte
+    return np.unpackbits(x.view(np.uint8).reshape(*x.shape, 8), axis=-1).sum(axis=-1).astype(np.uint8)
+
+
+def contar_acertos(palpites, sorteios):
+    """
+    Acertos de cada palpite em cada sorteio: (M,) x (N,) -> (M, N) uint8.
+    Escalares também servem: um palpite contra o histórico devolve (N,).
+    """
+    palpites = np.asarray(palpites, dtype=np.uint64)
+    sorteios = np.asarray(sorteios, dtype=np.uint64)
+    if palpites.ndim and sorteios.ndim:
+        return popcount(palpites[:, None] & sorteios[None, :])
+    return popcount(palpites & sorteios)
+
+
+def histograma_acertos(palpites, sorteios):
+    """
+    (M,) palpites x (N,) sorteios -> (M, 7) int64: quantas vezes cada palpite
+    fez 0, 1, ..., 6 acertos. Um único bincount: cada linha ganha seu próprio
+    trecho de 7 posições.
+    """
+    acertos = contar_acertos(palpites, sorteios).astype(np.int64)
+    deslocado = acertos + 7 * np.arange(len(acertos))[:, None]
+    return np.bincount(deslocado.ravel(), minlength=7 * len(acertos)).reshape(-1, 7)
+
+
+def dezenas_da_mascara(m):
+    """np.uint64 -> lista ordenada das dezenas ligadas."""
+    m = int(m)
+    return [n for n in range(1, 61) if m >> n & 1]
@@ -1,7 +1,9 @@
+import csv
 import psycopg2
-import pandas as pd
 import os
 from dotenv import load_dotenv
+from atrasos import reconstruir_tabela_atrasos
+from ingestao import COLUNAS_BASICAS, carregar_sorteios, data_iso, relatorio
 
 # Carrega as variáveis do arquivo .env
 load_dotenv()
@@ -15,36 +17,30 @@ def conectar_banco():
         port=os.getenv("DB_PORT")
     )
 
+def linhas_csv(caminho_csv):
+    """Lê o CSV linha a linha (sem carregar o arquivo inteiro) no formato de COLUNAS_BASICAS."""
+    with open(caminho_csv, encoding="utf-8-sig", newline="") as arquivo:
+        leitor = csv.DictReader(arquivo)
+        leitor.fieldnames = [c.strip() for c in leitor.fieldnames]
+        for linha in leitor:
+            yield (
+                int(linha['Concurso']),
+                data_iso(linha['Data']),
+                *(int(linha[f'bola {i}']) for i in range(1, 7))
+            )
+
 def migrar_dados(caminho_csv):
+    conn = None
     try:
         conn = conectar_banco()
         cur = conn.cursor()
 
-        # Lendo o CSV
-        df = pd.read_csv("resultados.csv", dtype=str)
-        df.columns = df.columns.str.strip()
-
-        # Query de inserção otimizada (usando a estrutura de SMALLINT que criamos)
-        insert_query = """
-        INSERT INTO sorteios (concurso, data_sorteio, bola1, bola2, bola3, bola4, bola5, bola6)
-        VALUES (%s, TO_DATE(%s, 'DD/MM/YYYY'), %s, %s, %s, %s, %s, %s)
-        ON CONFLICT (concurso) DO NOTHING;
-        """
-
-        for _, linha in df.iterrows():
-            cur.execute(insert_query, (
-                int(linha['Concurso']),
-                linha['Data'],
-                int(linha['bola 1']),
-                int(linha['bola 2']),
-                int(linha['bola 3']),
-                int(linha['bola 4']),
-                int(linha['bola 5']),
-                int(linha['bola 6'])
-            ))
+        # COPY para a tabela de carga + um único upsert (concursos existentes ficam como estão)
+        lidas, gravadas, segundos = carregar_sorteios(cur, linhas_csv(caminho_csv), COLUNAS_BASICAS)
+        reconstruir_tabela_atrasos(cur)
 
         conn.commit()
-        print(f"Sucesso: {len(df)} registros processados.")
+        print(f"Sucesso: {relatorio(lidas, gravadas, segundos)}.")
 
     except Exception as e:
         print(f"Erro na migração: {e}")
@@ -54,4 +50,4 @@ def migrar_dados(caminho_csv):
             conn.close()
 
 if __name__ == "__main__":
-    migrar_dados("resultados.csv")
\ No newline at end of file
+    migrar_dados("resultados.csv")
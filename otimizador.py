@@ -0,0 +1,118 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from mascaras import contar_acertos, mascaras_dezenas
+
+# --- GRID SEARCH VETORIZADO DOS PESOS DAS CAMADAS ---
+# Cada combinação de pesos vira uma linha de uma matriz; o motor de pontuação
+# inteiro (camadas -> score por dezena -> top 6 -> acertos -> recompensa) é
+# calculado com operações de matriz para todas as combinações de uma vez.
+
+# Ordem das camadas nas matrizes (a mesma ordem em que o motor soma os pesos)
+CAMADAS = ("pop", "som", "sil", "ruido", "mom")
+
+# TABELA DE RECOMPENSA (REINFORCEMENT LEARNING), indexada pela quantidade de acertos:
+# 0, 1 ou 2 acertos = erro total | Terno = 5 | Quadra = 50 | Quina = 800 | Sena = 5000
+PONTOS_POR_ACERTO = np.array([0, 0, 0, 5, 50, 800, 5000], dtype=np.int64)
+
+# Faixas padrão: 9 valores por camada (1.0 a 5.0) -> 59.049 combinações.
+# O piso fica acima de zero: peso 0 desligaria a camada de vez (os
+# multiplicadores por cluster não a trazem de volta)
+FAIXAS_PADRAO = {c: np.round(np.arange(1.0, 5.01, 0.5), 2) for c in CAMADAS}
+
+# Pesos usados quando ainda não há configuração salva (mesmos do motor)
+PESOS_PADRAO = {"pop": 3.0, "som": 1.5, "sil": 1.0, "ruido": 1.0, "mom": 2.0}
+
+OTIMIZADOR_PROCESSOS = int(os.getenv("OTIMIZADOR_PROCESSOS", str(os.cpu_count() or 1)))
+# Abaixo disso não compensa abrir processos
+_MIN_COMBINACOES_PARALELO = 50_000
+_TAMANHO_BLOCO = 20_000
+
+
+def matriz_camadas(camadas):
+    """
+    Recebe {camada: [dezenas]} e devolve:
+    - membros (5, 61): 1.0 onde a dezena pertence à camada;
+    - ordem (61,): posição da dezena na ordem de inserção do Counter original,
+      usada como desempate (Counter.most_common mantém a ordem de inserção).
+    """
+    membros = np.zeros((len(CAMADAS), 61), dtype=np.float64)
+    ordem = np.full(61, 61, dtype=np.int64)
+    proxima = 0
+    for i, nome in enumerate(CAMADAS):
+        for n in camadas.get(nome, []):
+            membros[i, n] = 1.0
+            if ordem[n] == 61:
+                ordem[n] = proxima
+                proxima += 1
+    return membros, ordem
+
+
+def gerar_grade(faixas=None):
+    """Produto cartesiano das faixas -> matriz (C, 5) na ordem de CAMADAS."""
+    faixas = {**FAIXAS_PADRAO, **(faixas or {})}
+    eixos = [np.asarray(faixas[c], dtype=np.float64) for c in CAMADAS]
+    malha = np.meshgrid(*eixos, indexing="ij")
+    return np.stack([m.ravel() for m in malha], axis=1)
+
+
+def palpites_da_grade(grade, membros, ordem):
+    """Top 6 dezenas de cada combinação de pesos, como máscaras de bits (C,)."""
+    # Só as dezenas presentes em alguma camada podem entrar no top 6 (as
+    # camadas somam bem mais de 6 dezenas); as demais colunas são descartadas
+    ativas = np.flatnonzero(membros.any(axis=0))
+    scores = grade @ membros[:, ativas]           # (C, A)
+    # Chave inteira exata: score (6 casas) e, no empate, a ordem de inserção
+    chave = np.rint(scores * 1e6).astype(np.int64) * 64 + (63 - ordem[ativas])
+    top6 = np.argpartition(chave, -6, axis=1)[:, -6:]
+    return mascaras_dezenas(ativas[top6])
+
+
+def pontuar_grade(grade, membros, ordem, alvos):
+    """Recompensa total de cada combinação contra todos os sorteios-alvo (C,)."""
+    palpites = palpites_da_grade(grade, membros, ordem)
+    acertos = contar_acertos(palpites, alvos)     # (C, T)
+    return PONTOS_POR_ACERTO[acertos].sum(axis=1)
+
+
+def _pontuar_bloco(args):
+    return pontuar_grade(*args)
+
+
+def _mais_proxima(grade, empatadas, referencia):
+    """Índice (em `grade`) da combinação empatada mais próxima dos pesos de referência."""
+    alvo = np.array([float((referencia or {}).get(c, PESOS_PADRAO[c])) for c in CAMADAS])
+    distancias = np.abs(grade[empatadas] - alvo).sum(axis=1)
+    return int(empatadas[np.argmin(distancias)])
+
+
+def buscar_melhores_pesos(camadas, sorteios_alvo, faixas=None, processos=None, referencia=None):
+    """
+    Avalia todas as combinações da grade contra os sorteios-alvo e devolve
+    (melhor_config, melhor_pontuacao, qtd_combinacoes). Janelas curtas empatam
+    com frequência: entre as empatadas vence a mais próxima (distância L1) da
+    `referencia` (os pesos atuais; sem ela, PESOS_PADRAO), para a calibragem
+    não saltar para um canto arbitrário da grade.
+    """
+    membros, ordem = matriz_camadas(camadas)
+    alvos = mascaras_dezenas(sorteios_alvo)
+    grade = gerar_grade(faixas)
+
+    processos = OTIMIZADOR_PROCESSOS if processos is None else processos
+    blocos = [grade[i:i + _TAMANHO_BLOCO] for i in range(0, len(grade), _TAMANHO_BLOCO)]
+    tarefas = [(b, membros, ordem, alvos) for b in blocos]
+
+    if processos > 1 and len(grade) >= _MIN_COMBINACOES_PARALELO:
+        # spawn: a calibragem roda a partir de uma thread do servidor (fork copiaria locks travados)
+        contexto = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=processos, mp_context=contexto) as executor:
+            pontos = np.concatenate(list(executor.map(_pontuar_bloco, tarefas)))
+    else:
+        pontos = np.concatenate([_pontuar_bloco(t) for t in tarefas])
+
+    melhor = _mais_proxima(grade, np.flatnonzero(pontos == pontos.max()), referencia)
+    config = {c: float(v) for c, v in zip(CAMADAS, grade[melhor])}
+    return config, int(pontos[melhor]), len(grade)
@@ -0,0 +1,125 @@
+import json
+
+import stress_test
+from main import (
+    conectar_banco,
+    processar_aprendizado_reforco,
+    processar_matriz_afinidade,
+    otimizar_pesos_convergencia,
+    precisa_recalibrar,
+    processar_todas_estrategias
+)
+from cache_estrategias import invalidar_cache
+from historico import obter_snapshot
+from ia_neural import atualizar_modelos_incremental
+from sync import sincronizar_caixa
+
+# Estágios do ciclo de aprendizado, na ordem em que rodam (usados no progresso do job)
+ESTAGIOS_SYNC = [
+    "download",
+    "aprendizado_reforco",
+    "matriz_afinidade",
+    "calibragem_pesos",
+    "modelos_neurais",
+    "registro_previsao",
+]
+ESTAGIOS_STRESS = ["backtest"]
+
+
+def _previsao_registrada(concurso_alvo):
+    with conectar_banco() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT 1 FROM historico_previsoes WHERE concurso_alvo = %s", (concurso_alvo,))
+        existe = cur.fetchone() is not None
+        cur.close()
+    return existe
+
+
+def executar_ciclo_aprendizado(tarefa):
+    """
+    Pipeline completo disparado pelo /api/sync-data: baixa os sorteios novos,
+    aprende com o erro, recalcula afinidades, recalibra pesos, atualiza a IA
+    neural e registra o palpite do próximo concurso. O sync roda no próprio
+    processo e os estágios seguintes trabalham só sobre os concursos que ele
+    inseriu; sem concurso novo (e com o palpite do próximo já registrado),
+    eles são pulados.
+    """
+    # 1. Sincroniza com a API da Caixa (no processo, sem subprocess); o
+    # snapshot compartilhado recebe só os concursos novos
+    with tarefa.estagio("download"):
+        sync = sincronizar_caixa()
+        if sync.inseridos:
+            invalidar_cache()
+        snap = obter_snapshot()
+        ultimo_concurso = int(snap.concursos[-1])
+        proximo_concurso = ultimo_concurso + 1
+
+    resumo_sync = {
+        "concursos_inseridos": sync.inseridos,
+        "falhas_download": {str(c): erro for c, erro in sync.falhas.items()},
+        "ultimo_concurso": ultimo_concurso,
+        "proximo_concurso": proximo_concurso,
+    }
+    if not sync.inseridos and _previsao_registrada(proximo_concurso):
+        for nome in ESTAGIOS_SYNC[1:]:
+            tarefa.pular(nome, "nenhum concurso novo")
+        return dict(
+            resumo_sync, status="success",
+            message=f"Nada novo: o banco já está no concurso {ultimo_concurso} e o palpite do {proximo_concurso} já foi registrado.",
+        )
+
+    # 2. APRENDIZADO: A máquina olha o que previu para cada concurso novo e
+    # compara com o que saiu. A recalibragem, se precisar, fica para o estágio 4
+    with tarefa.estagio("aprendizado_reforco"):
+        acertos = processar_aprendizado_reforco(sync.inseridos or [ultimo_concurso], recalibrar=False)
+
+    # 3. ATUALIZAÇÃO ESTATÍSTICA: soma os pares dos sorteios novos; concursos
+    # que preencheram buracos no meio do histórico exigem refazer a matriz
+    with tarefa.estagio("matriz_afinidade"):
+        processar_matriz_afinidade(reconstruir=sync.fora_de_ordem)
+
+    # 4. CALIBRAGEM: Roda o Backtest com foco em Quadra/Quina/Sena (olhando
+    # mais para trás se o aprendizado pediu recalibragem), uma vez só
+    with tarefa.estagio("calibragem_pesos"):
+        limite = 20 if precisa_recalibrar(acertos) else 10
+        config_otimizada = otimizar_pesos_convergencia(limite_backtest=limite, snapshot=snap)
+        snap = obter_snapshot()   # mesmo histórico, com os pesos recém-salvos
+
+    # 5. IA NEURAL: atualização incremental (warm start); o re-treino
+    # completo periódico roda em segundo plano
+    with tarefa.estagio("modelos_neurais"):
+        modo_ia = atualizar_modelos_incremental(ultimo_concurso)
+
+    # 6. REGISTRO DE FUTURO: Salva o novo palpite para conferir no próximo sync
+    # Isso cria a 'memória' para o aprendizado do próximo sorteio
+    with tarefa.estagio("registro_previsao"):
+        dados_novos = processar_todas_estrategias(snapshot=snap)
+        palpite_ia = dados_novos["meta"]["Alta Convergência"]
+
+        with conectar_banco() as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                INSERT INTO historico_previsoes (concurso_alvo, dezenas_previstas, pesos_utilizados)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (concurso_alvo) DO UPDATE SET
+                    dezenas_previstas = EXCLUDED.dezenas_previstas,
+                    pesos_utilizados = EXCLUDED.pesos_utilizados;
+            """, (proximo_concurso, palpite_ia, json.dumps(config_otimizada)))
+            conn.commit()
+            cur.close()
+
+    return dict(
+        resumo_sync,
+        status="success",
+        message=f"Sincronizado! A máquina analisou o concurso {ultimo_concurso}, recalibrou os pesos e já projetou o concurso {proximo_concurso}.",
+        acertos={str(c): n for c, n in acertos.items()},
+        palpite=[int(n) for n in palpite_ia],
+        pesos=config_otimizada,
+        modo_ia=modo_ia,
+    )
+
+
+def executar_stress_test(tarefa, qtd_concursos=50):
+    """Backtest retroativo como job, reportando o avanço concurso a concurso."""
+    with tarefa.estagio("backtest"):
+        return stress_test.executar_simulacao_completa(qtd_concursos=qtd_concursos, progresso=tarefa.progresso)
@@ -1,102 +1,22 @@
-import json
-from collections import Counter
-import pandas as pd
-from main import (
-    conectar_banco, 
-    otimizar_pesos_convergencia, 
-    obter_analise_sql,
-    obter_dezenas_por_popularidade,
-    obter_matriz_vizinhanca_historica,
-    obter_dezenas_momentum,
-    gerar_alta_convergencia_filtrada,
-    ZONAS_SILENCIOSAS,
-    validar_palpite_elite
-)
+from historico import carregar_snapshot
+from backtest_paralelo import executar_backtest_paralelo, registrar_auditoria
 
-def executar_simulacao_completa(qtd_concursos=50):
+def executar_simulacao_completa(qtd_concursos=50, progresso=None, faixas=None, processos=None):
     """
     Executa uma simulação retroativa (Backtest) para validar a eficácia da IA.
+    Cada concurso é previsto só com os sorteios anteriores a ele, em memória
+    (backtest.py), sem consultar nem alterar o banco durante a simulação.
+    Históricos longos são divididos em shards paralelos (backtest_paralelo.py).
     Retorna os dados formatados para o Dashboard.
+    `progresso(atual, total)` é chamado conforme os concursos são simulados, se informado.
     """
-    conn = conectar_banco()
-    cur = conn.cursor()
+    snap = carregar_snapshot()
+    inicio = max(0, len(snap) - qtd_concursos)
     
-    cur.execute("""
-        SELECT concurso, bola1, bola2, bola3, bola4, bola5, bola6 
-        FROM sorteios 
-        ORDER BY concurso DESC LIMIT %s
-    """, (qtd_concursos,))
-    
-    sorteios = cur.fetchall()[::-1] 
-    
-    print(f"🚀 Iniciando Stress Test nos últimos {len(sorteios)} concursos...")
-    log_performance = []
-
-    for i in range(len(sorteios) - 1):
-        conc_alvo = int(sorteios[i+1][0]) # Garante int puro
-        gabarito = set(sorteios[i+1][1:])
-        
-        config = otimizar_pesos_convergencia(limite_backtest=10)
-        
-        pesos_final = Counter()
-        for n in obter_dezenas_por_popularidade(top=15): pesos_final[n] += config["pop"]
-        for n in obter_matriz_vizinhanca_historica(top=10): pesos_final[n] += config["som"]
-        for n in ZONAS_SILENCIOSAS: pesos_final[n] += config["sil"]
-        for n in obter_dezenas_momentum(): pesos_final[n] += config["mom"]
-        
-        palpite = gerar_alta_convergencia_filtrada(pesos_final)
-        
-        acertos = len(set(palpite).intersection(gabarito))
-        passou_filtros = validar_palpite_elite(palpite)
-        
-        # O USO DO int() AQUI EVITA O ERRO 500 NA API
-        log_performance.append({
-            "concurso": int(conc_alvo),
-            "acertos": int(acertos),
-            "filtros": "OK" if passou_filtros else "FALHA"
-        })
-        
-        print(f"Simulado Concurso {conc_alvo}: {acertos} acertos | Filtros: {'✅' if passou_filtros else '❌'}")
-
-    cur.close()
-    conn.close()
-
-    df = pd.DataFrame(log_performance)
-    
-    media = float(df['acertos'].mean()) if not df.empty else 0.0
-    quadras = int(len(df[df['acertos'] == 4]))
-    quinas = int(len(df[df['acertos'] == 5]))
-    senas = int(len(df[df['acertos'] == 6]))
-
-    print("\n" + "="*40)
-    print(f"📊 STRESS TEST CONCLUÍDO: Média {media:.2f} | Quadras: {quadras}")
-    print("="*40)
+    print(f"🚀 Iniciando Stress Test nos últimos {len(snap) - inicio} concursos...")
+    log_performance = executar_backtest_paralelo(snap, inicio=inicio, processos=processos, faixas=faixas, progresso=progresso)
 
-    try:
-        conn_audit = conectar_banco()
-        cur_audit = conn_audit.cursor()
-        conformidade = (len(df[df['filtros'] == 'OK']) / len(df)) * 100 if not df.empty else 0
-        
-        cur_audit.execute("""
-            INSERT INTO auditoria_stress 
-            (qtd_concursos, media_acertos, total_quadras, total_quinas, total_senas, conformidade_filtros, historico_detalhado)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-        """, (
-            len(df), media, quadras, quinas, senas, conformidade, 
-            json.dumps(log_performance)
-        ))
-        
-        conn_audit.commit()
-        cur_audit.close()
-        conn_audit.close()
-    except Exception as e:
-        print(f"❌ Erro ao salvar auditoria: {e}")
+    for linha in log_performance:
+        print(f"Simulado Concurso {linha['concurso']}: {linha['acertos']} acertos | Filtros: {'✅' if linha['filtros'] == 'OK' else '❌'}")
 
-    return {
-        "status": "success",
-        "media_acertos": media,
-        "total_quadras": quadras,
-        "total_quinas": quinas,
-        "total_senas": senas,
-        "historico": log_performance
-    }
\ No newline at end of file
+    return registrar_auditoria(log_performance)
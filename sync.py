@@ -1,52 +1,140 @@
-import requests
-import psycopg2
 import os
-from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from banco import conectar_banco
+from atrasos import reconstruir_tabela_atrasos, registrar_sorteio_atrasos
+from ingestao import COLUNAS_COMPLETAS, carregar_sorteios, linha_api, relatorio
+
+# --- SINCRONIZAÇÃO INCREMENTAL COM A API DE RESULTADOS ---
+# Busca o último concurso publicado, descobre todos os concursos que faltam
+# no banco (inclusive buracos deixados por syncs que falharam), baixa só
+# esses em paralelo por uma sessão HTTP com pool e retentativas e grava
+# tudo com um único upsert em lote.
+# LOTERIAS_API_URL aponta para outra API (ex.: a falsa de api_falsa.py).
+
+URL_API = os.getenv("LOTERIAS_API_URL", "https://loteriascaixa-api.herokuapp.com/api/megasena").rstrip("/")
+SYNC_CONEXOES = int(os.getenv("SYNC_CONEXOES", "8"))
+SYNC_TENTATIVAS = int(os.getenv("SYNC_TENTATIVAS", "4"))
+SYNC_TIMEOUT = float(os.getenv("SYNC_TIMEOUT", "15"))
+# Acima disso, sai mais barato baixar o histórico inteiro numa requisição só
+SYNC_MAX_INDIVIDUAIS = int(os.getenv("SYNC_MAX_INDIVIDUAIS", "200"))
+
+
+@dataclass
+class ResultadoSync:
+    """O que um sync gravou: usado pelos estágios seguintes do pipeline."""
+    inseridos: list                     # concursos novos, crescentes
+    ultimo_concurso: int                # último concurso publicado pela API
+    fora_de_ordem: bool = False         # preencheu buracos abaixo do maior concurso que já existia
+    falhas: dict = field(default_factory=dict)   # concurso -> erro do download (fica para o próximo sync)
+    lidas: int = 0
+    gravadas: int = 0
+    segundos: float = 0.0
+
+
+def criar_sessao():
+    """Sessão com pool de SYNC_CONEXOES conexões e retentativa com backoff em falhas transitórias."""
+    retentativa = Retry(
+        total=SYNC_TENTATIVAS,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET",),
+    )
+    adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=SYNC_CONEXOES, max_retries=retentativa)
+    sessao = requests.Session()
+    sessao.mount("http://", adaptador)
+    sessao.mount("https://", adaptador)
+    return sessao
+
+
+def buscar_concurso(sessao, concurso="latest"):
+    resposta = sessao.get(f"{URL_API}/{concurso}", timeout=SYNC_TIMEOUT)
+    resposta.raise_for_status()
+    return resposta.json()
+
+
+def concursos_faltantes(cur, ate):
+    """Concursos de 1 até `ate` que não estão em `sorteios`."""
+    cur.execute("""
+        SELECT s.concurso FROM generate_series(1, %s) AS s(concurso)
+        LEFT JOIN sorteios t ON t.concurso = s.concurso
+        WHERE t.concurso IS NULL
+        ORDER BY s.concurso
+    """, (ate,))
+    return [l[0] for l in cur.fetchall()]
 
-load_dotenv()
 
 def sincronizar_caixa():
-    url = "https://loteriascaixa-api.herokuapp.com/api/megasena/latest"
+    """
+    Traz o banco até o último concurso publicado e devolve um ResultadoSync
+    com os concursos inseridos; o último concurso também tem os ganhadores
+    atualizados se já existia. Erros de banco ou da API no último concurso
+    sobem para quem chamou; concursos antigos que falharem ficam em `falhas`.
+    """
+    with criar_sessao() as sessao:
+        ultimo = buscar_concurso(sessao)
+        with conectar_banco() as conn:
+            cur = conn.cursor()
+            faltantes = concursos_faltantes(cur, int(ultimo['concurso']))
+
+            # O último já veio; os demais são baixados em paralelo
+            baixar = [c for c in faltantes if c != int(ultimo['concurso'])]
+            falhas = {}
+
+            def baixar_um(concurso):
+                try:
+                    return buscar_concurso(sessao, concurso)
+                except (requests.RequestException, ValueError) as e:
+                    falhas[concurso] = str(e)
+                    return None
+
+            if len(baixar) > SYNC_MAX_INDIVIDUAIS:
+                resposta = sessao.get(URL_API, timeout=SYNC_TIMEOUT)
+                resposta.raise_for_status()
+                pendentes = set(baixar)
+                payloads = [p for p in resposta.json() if int(p['concurso']) in pendentes]
+            else:
+                with ThreadPoolExecutor(max_workers=SYNC_CONEXOES) as executor:
+                    payloads = [p for p in executor.map(baixar_um, baixar) if p is not None]
+            payloads.append(ultimo)
+
+            cur.execute("SELECT COALESCE(MAX(concurso), 0) FROM sorteios")
+            maximo_antes = cur.fetchone()[0]
+            lidas, gravadas, segundos = carregar_sorteios(
+                cur, (linha_api(p) for p in payloads), COLUNAS_COMPLETAS,
+                atualizar=("ganhadores_sena", "ganhadores_quina", "ganhadores_quadra")
+            )
+
+            pendentes = set(faltantes)
+            inseridos = sorted(int(p['concurso']) for p in payloads if int(p['concurso']) in pendentes)
+            fora_de_ordem = bool(inseridos) and inseridos[0] < maximo_antes
+            # Vários concursos (ex.: primeira carga), buracos abaixo do último ou
+            # tabela incompleta: a tabela de atrasos é refeita uma única vez.
+            # Um concurso novo no fim: atualização incremental das 6 dezenas
+            cur.execute("SELECT COUNT(*) FROM atraso_dezenas")
+            tabela_completa = cur.fetchone()[0] >= 60
+            if fora_de_ordem or len(inseridos) > 1 or (inseridos and not tabela_completa):
+                reconstruir_tabela_atrasos(cur)
+            elif inseridos:
+                dezenas = next(p['dezenas'] for p in payloads if int(p['concurso']) == inseridos[0])
+                registrar_sorteio_atrasos(cur, inseridos[0], dezenas)
+
+            conn.commit()
+            cur.close()
+
+    print(f"Sucesso! Concursos inseridos: {inseridos or 'nenhum'} ({relatorio(lidas, gravadas, segundos)}).")
+    if falhas:
+        print(f"Não foi possível baixar {len(falhas)} concurso(s): {sorted(falhas)} (ficam para o próximo sync).")
+    return ResultadoSync(inseridos, int(ultimo['concurso']), fora_de_ordem, falhas, lidas, gravadas, segundos)
+
+
+if __name__ == "__main__":
     try:
-        dados = requests.get(url).json()
-        
-        conn = psycopg2.connect(
-            host=os.getenv("DB_HOST"),
-            database=os.getenv("DB_NAME"),
-            user=os.getenv("DB_USER"),
-            password=os.getenv("DB_PASS")
-        )
-        cur = conn.cursor()
-
-        query = """
-        INSERT INTO sorteios (
-            concurso, data_sorteio, bola1, bola2, bola3, bola4, bola5, bola6,
-            ganhadores_sena, ganhadores_quina, ganhadores_quadra,
-            valor_estimado_proximo, acumulou
-        ) VALUES (%s, TO_DATE(%s, 'DD/MM/YYYY'), %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        ON CONFLICT (concurso) DO UPDATE SET
-            ganhadores_sena = EXCLUDED.ganhadores_sena,
-            ganhadores_quina = EXCLUDED.ganhadores_quina,
-            ganhadores_quadra = EXCLUDED.ganhadores_quadra;
-        """
-
-        cur.execute(query, (
-            dados['concurso'], dados['data'],
-            int(dados['dezenas'][0]), int(dados['dezenas'][1]), int(dados['dezenas'][2]),
-            int(dados['dezenas'][3]), int(dados['dezenas'][4]), int(dados['dezenas'][5]),
-            dados['premiacoes'][0]['ganhadores'], 
-            dados['premiacoes'][1]['ganhadores'],
-            dados['premiacoes'][2]['ganhadores'],
-            dados['valorEstimadoProximoConcurso'],
-            dados['acumulou']
-        ))
-
-        conn.commit()
-        print(f"Sucesso! Concurso {dados['concurso']} sincronizado.")
-        cur.close()
-        conn.close()
+        sincronizar_caixa()
     except Exception as e:
         print(f"Erro na sincronização: {e}")
-
-if __name__ == "__main__":
-    sincronizar_caixa()
\ No newline at end of file
@@ -0,0 +1,145 @@
+import os
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+# Workers locais que executam os jobs longos (sync, stress test...)
+TAREFAS_WORKERS = int(os.getenv("TAREFAS_WORKERS", "2"))
+# Quantos jobs finalizados ficam disponíveis para consulta
+TAREFAS_HISTORICO = int(os.getenv("TAREFAS_HISTORICO", "100"))
+
+_executor = ThreadPoolExecutor(max_workers=TAREFAS_WORKERS, thread_name_prefix="tarefa")
+_tarefas = OrderedDict()   # id -> Tarefa
+_ativas = {}               # (tipo, argumentos) -> id do job pendente/em execução
+_lock = threading.Lock()
+
+
+class Tarefa:
+    """Job assíncrono com progresso por estágio e tempos de execução."""
+
+    def __init__(self, tipo, estagios_previstos=None, parametros=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.tipo = tipo
+        self.parametros = parametros or {}
+        self.status = "pendente"
+        self.criada_em = time.time()
+        self.iniciada_em = None
+        self.finalizada_em = None
+        self.estagios = [{"nome": n, "status": "pendente"} for n in (estagios_previstos or [])]
+        self.progresso_estagio = None
+        self.resultado = None
+        self.erro = None
+
+    def _registro_estagio(self, nome):
+        for e in self.estagios:
+            if e["nome"] == nome:
+                return e
+        e = {"nome": nome, "status": "pendente"}
+        self.estagios.append(e)
+        return e
+
+    @contextmanager
+    def estagio(self, nome):
+        """Marca o início/fim de um estágio: `with tarefa.estagio("download"):`."""
+        e = self._registro_estagio(nome)
+        e["status"] = "executando"
+        e["inicio"] = time.time()
+        self.progresso_estagio = None
+        try:
+            yield
+            e["status"] = "concluido"
+        except Exception as exc:
+            e["status"] = "erro"
+            e["erro"] = f"{type(exc).__name__}: {exc}"
+            raise
+        finally:
+            e["duracao_s"] = round(time.time() - e["inicio"], 3)
+
+    def pular(self, nome, motivo):
+        """Estágio que não precisa rodar (ex.: sync sem concurso novo); conta como concluído no progresso."""
+        e = self._registro_estagio(nome)
+        e["status"] = "pulado"
+        e["motivo"] = motivo
+
+    def progresso(self, atual, total):
+        """Progresso dentro do estágio corrente (ex.: concursos simulados)."""
+        self.progresso_estagio = {"atual": atual, "total": total}
+
+    def como_dict(self):
+        concluidos = sum(1 for e in self.estagios if e["status"] in ("concluido", "pulado"))
+        fim = self.finalizada_em or time.time()
+        return {
+            "job_id": self.id,
+            "tipo": self.tipo,
+            "parametros": self.parametros,
+            "status": self.status,
+            "progresso": round(concluidos / len(self.estagios), 3) if self.estagios else None,
+            "progresso_estagio": self.progresso_estagio,
+            "estagios": [dict(e) for e in self.estagios],
+            "criada_em": self.criada_em,
+            "duracao_s": round(fim - self.iniciada_em, 3) if self.iniciada_em else None,
+            "resultado": self.resultado,
+            "erro": self.erro,
+        }
+
+
+def _executar(tarefa, chave, func, args, kwargs):
+    tarefa.status = "executando"
+    tarefa.iniciada_em = time.time()
+    try:
+        tarefa.resultado = func(tarefa, *args, **kwargs)
+        tarefa.status = "concluida"
+    except Exception as e:
+        tarefa.erro = str(e)
+        tarefa.status = "erro"
+        traceback.print_exc()
+    finally:
+        tarefa.finalizada_em = time.time()
+        with _lock:
+            if _ativas.get(chave) == tarefa.id:
+                del _ativas[chave]
+
+
+def enfileirar(tipo, func, *args, estagios_previstos=None, **kwargs):
+    """
+    Enfileira `func(tarefa, *args, **kwargs)` no pool local e retorna na hora
+    (tarefa, criada). Se já houver um job do mesmo tipo e com os mesmos
+    argumentos pendente ou em execução, devolve esse job com criada=False
+    (de-duplicação); com argumentos diferentes, é um job novo.
+    """
+    chave = (tipo, args, tuple(sorted(kwargs.items())))
+    with _lock:
+        ativa = _ativas.get(chave)
+        if ativa is not None:
+            return _tarefas[ativa], False
+
+        parametros = dict(kwargs, **({"args": list(args)} if args else {}))
+        tarefa = Tarefa(tipo, estagios_previstos, parametros)
+        _tarefas[tarefa.id] = tarefa
+        _ativas[chave] = tarefa.id
+        # Descarta os jobs finalizados mais antigos
+        finalizadas = [t.id for t in _tarefas.values() if t.finalizada_em is not None]
+        for antigo in finalizadas[:max(0, len(finalizadas) - TAREFAS_HISTORICO)]:
+            del _tarefas[antigo]
+
+    _executor.submit(_executar, tarefa, chave, func, args, kwargs)
+    return tarefa, True
+
+
+def obter_tarefa(job_id):
+    with _lock:
+        return _tarefas.get(job_id)
+
+
+def listar_tarefas(limite=20):
+    with _lock:
+        tarefas = list(_tarefas.values())[-limite:]
+    return [t.como_dict() for t in reversed(tarefas)]
+
+
+def encerrar():
+    _executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+import backtest_paralelo
+from backtest import EstadoCamadas, executar_backtest
+
+# Grade pequena: o que importa é a igualdade serial x paralelo, não a calibragem
+FAIXAS = {c: [1.0, 3.0, 5.0] for c in ("pop", "som", "sil", "ruido", "mom")}
+INICIO, FIM = 400, 480
+
+
+@pytest.fixture(scope="module")
+def serial(snap):
+    return executar_backtest(snap, INICIO, FIM, faixas=FAIXAS)
+
+
+@pytest.mark.parametrize("processos", [2, 3, 4])
+def test_paralelo_igual_ao_serial(snap, serial, monkeypatch, processos):
+    monkeypatch.setattr(backtest_paralelo, "_MIN_CONCURSOS_PARALELO", 0)
+    paralelo = backtest_paralelo.executar_backtest_paralelo(snap, INICIO, FIM, processos, FAIXAS)
+    assert paralelo == serial
+
+
+def test_shards_mesclados_iguais_ao_serial(snap, serial):
+    shards = backtest_paralelo.dividir_shards(INICIO, FIM, 7)
+    logs = [executar_backtest(snap, a, b, faixas=FAIXAS) for a, b in reversed(shards)]
+    assert backtest_paralelo.mesclar_logs(logs) == serial
+
+
+@pytest.mark.parametrize("fim", [1, 37, 500])
+def test_estado_incremental_igual_ao_prefixo(snap, fim):
+    estado = EstadoCamadas.de_prefixo(snap, 0)
+    for i in range(fim):
+        estado.absorver(snap.concursos[i], snap.dezenas[i], snap.popularidade[i])
+    direto = EstadoCamadas.de_prefixo(snap, fim)
+
+    for nome in ("frequencia", "contagem_populares", "ultimo_visto"):
+        np.testing.assert_array_equal(getattr(estado, nome), getattr(direto, nome))
+    np.testing.assert_array_equal(estado.afinidade.pesos, direto.afinidade.pesos)
+    assert estado.camadas() == direto.camadas()
+
+
+@pytest.mark.parametrize("fim", [37, 500, 2900])
+def test_camadas_iguais_as_do_snapshot(snap, fim):
+    # As camadas do backtest são as de otimizar_pesos_convergencia sobre o histórico até `fim`
+    prefixo = snap.prefixo(fim)
+    camadas = EstadoCamadas.de_prefixo(snap, fim).camadas()
+
+    assert camadas["pop"] == prefixo.populares(top=15)
+    assert camadas["som"] == prefixo.vizinhanca(top=10)
+    assert camadas["ruido"] == [n for n, _ in prefixo.frequencia()][:10]
+    assert camadas["mom"] == prefixo.momentum()
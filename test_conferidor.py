@@ -0,0 +1,57 @@
+import pytest
+
+from conferidor import conferir_linhas, interpretar_linha, sorteios_alvo
+
+
+@pytest.mark.parametrize("linha, coluna_id, esperado", [
+    ("05;12;23;34;45;56", None, (None, [5, 12, 23, 34, 45, 56])),
+    ("joao;05;12;23;34;45;56", None, ("joao", [5, 12, 23, 34, 45, 56])),
+    # Primeira coluna que não pode ser dezena da aposta: repetida ou fora de 1..60
+    ("5;05;12;23;34;45;56", None, ("5", [5, 12, 23, 34, 45, 56])),
+    ("1001;05;12;23;34;45;56", None, ("1001", [5, 12, 23, 34, 45, 56])),
+    # Id numérico que também seria uma dezena: só com a indicação do arquivo
+    ("1;05;12;23;34;45;56", None, (None, [1, 5, 12, 23, 34, 45, 56])),
+    ("1;05;12;23;34;45;56", True, ("1", [5, 12, 23, 34, 45, 56])),
+    ("01;05;12;23;34;45;56", False, (None, [1, 5, 12, 23, 34, 45, 56])),
+    ('{"id": 7, "dezenas": [56, 5, 12, 23, 34, 45]}', None, (7, [5, 12, 23, 34, 45, 56])),
+])
+def test_interpretar_linha(linha, coluna_id, esperado):
+    assert interpretar_linha(linha, coluna_id) == esperado
+
+
+def test_aposta_invalida():
+    with pytest.raises(ValueError):
+        interpretar_linha("05;05;12;23;34;45", coluna_id=False)
+
+
+def _conferir(snap, linhas, coluna_id=None):
+    sorteios, concursos = sorteios_alvo(snap)
+    return list(conferir_linhas(linhas, sorteios, concursos, coluna_id))
+
+
+@pytest.mark.parametrize("cabecalho, coluna_id", [("id;d1;d2;d3;d4;d5;d6", None), (None, True)])
+def test_ids_numericos(snap, cabecalho, coluna_id):
+    sorteadas = sorted(snap.dezenas[-1].tolist())
+    fora = next(n for n in range(1, 61) if n not in sorteadas)
+    ultimo = [f"{n:02d}" for n in sorteadas]
+    linhas = ([cabecalho] if cabecalho else []) + [
+        ";".join(["1"] + ultimo),                        # sena
+        ";".join(["2"] + ultimo[:5] + [f"{fora:02d}"]),  # quina
+    ]
+    resultados = _conferir(snap, linhas, coluna_id)
+
+    sena, quina, resumo = resultados
+    assert (sena["id"], sena["acertos"], sena["senas"], sena["quadras"]) == ("1", 6, 1, 0)
+    assert (quina["id"], quina["acertos"], quina["quinas"], quina["senas"]) == ("2", 5, 1, 0)
+    assert resumo["resumo"]["palpites"] == 2 and resumo["resumo"]["invalidos"] == 0
+
+
+def test_cabecalho_de_dezenas_mantem_sete_dezenas(snap):
+    ultimo = sorted(snap.dezenas[-1].tolist())
+    extra = next(n for n in range(1, 61) if n not in ultimo)
+    linhas = ["bola1;bola2;bola3;bola4;bola5;bola6;bola7", ";".join(map(str, [extra] + ultimo))]
+    aposta, _ = _conferir(snap, linhas)
+
+    # 7 dezenas com a sena dentro: 1 sena e 6 quinas
+    assert "id" not in aposta
+    assert (aposta["acertos"], aposta["senas"], aposta["quinas"]) == (6, 1, 6)
@@ -0,0 +1,43 @@
+import itertools
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from coocorrencia import Coocorrencia
+
+
+@pytest.fixture(scope="module")
+def sorteios(snap):
+    return snap.dezenas[:1500]
+
+
+@pytest.mark.parametrize("corte", [0, 1, 700, 1499])
+def test_anexar_igual_a_reconstrucao(snap, sorteios, corte):
+    # Prefixo com as estruturas calculadas + sorteios anexados um a um
+    parcial = snap.prefixo(corte)
+    parcial.coocorrencia
+    for i in range(corte, len(sorteios)):
+        parcial = parcial.anexar(snap.concursos[i:i + 1], sorteios[i:i + 1], snap.popularidade[i:i + 1])
+    completa = Coocorrencia.de_sorteios(sorteios)
+
+    cooc = parcial.coocorrencia
+    assert cooc.qtd_sorteios == completa.qtd_sorteios == len(sorteios)
+    np.testing.assert_array_equal(cooc.pares, completa.pares)
+    np.testing.assert_array_equal(cooc.trios, completa.trios)
+    np.testing.assert_array_equal(cooc.quadras_ranks, completa.quadras_ranks)
+    np.testing.assert_array_equal(cooc.quadras_contagem, completa.quadras_contagem)
+    assert np.all(np.diff(cooc.quadras_ranks) > 0)
+
+
+def test_contagens_iguais_a_forca_bruta(sorteios):
+    cooc = Coocorrencia.de_sorteios(sorteios)
+    contagens = {k: Counter(g for s in sorteios.tolist() for g in itertools.combinations(sorted(s), k))
+                 for k in (2, 3, 4)}
+    for k, contagem in contagens.items():
+        grupos = list(contagem)[:500] + [tuple(range(1, k + 1)), tuple(range(60 - k + 1, 61))]
+        assert cooc.contagem(np.array(grupos)).tolist() == [contagem.get(g, 0) for g in grupos]
+
+    parceiros = Counter(n for s in sorteios.tolist() if {10, 53} <= set(s) for n in s if n not in (10, 53))
+    esperado = sorted(parceiros.items(), key=lambda t: (-t[1], t[0]))[:10]
+    assert cooc.parceiros([53, 10]) == esperado
@@ -0,0 +1,43 @@
+import itertools
+
+import numpy as np
+import pytest
+
+import fechamento
+from main import validar_palpite_elite
+
+
+def _cobertos(jogos, t):
+    return {s for j in jogos for s in itertools.combinations(sorted(j), t)}
+
+
+@pytest.mark.parametrize("v, garantia", [(9, 3), (10, 4), (12, 4), (11, 5)])
+def test_cobertura_completa_sem_filtros(v, garantia):
+    posicoes = fechamento.calcular_fechamento(v, garantia, sementes=2, iteracoes=500, processos=1)
+
+    assert _cobertos(posicoes.tolist(), garantia) == set(itertools.combinations(range(v), garantia))
+    assert len(posicoes) >= fechamento.limite_inferior(v, garantia)
+    stats = fechamento.estatisticas_cobertura(posicoes, v, garantia)
+    assert stats["cobertura_pct"] == 100.0
+
+
+def test_com_filtros_cobre_todo_subconjunto_possivel():
+    candidatas = [5, 10, 17, 23, 28, 33, 38, 41, 44, 52, 56, 59]
+    r = fechamento.gerar_fechamento(candidatas, 4, filtros=True, sementes=2, iteracoes=500, processos=1)
+
+    assert all(validar_palpite_elite(j) for j in r["jogos"])
+    validos = [j for j in itertools.combinations(candidatas, 6) if validar_palpite_elite(j)]
+    possiveis = _cobertos(validos, 4)
+    assert _cobertos(r["jogos"], 4) == possiveis
+    stats = r["estatisticas"]
+    assert stats["impossiveis_com_filtros"] == stats["subconjuntos_alvo"] - len(possiveis)
+    assert stats["cobertura_possivel_pct"] == 100.0
+
+
+def test_cache_em_disco(tmp_path, monkeypatch):
+    monkeypatch.setattr(fechamento, "FECHAMENTO_DIR", str(tmp_path))
+    monkeypatch.setattr(fechamento, "_cache", {})
+    primeiro = fechamento.calcular_fechamento(8, 3, sementes=1, iteracoes=200, processos=1)
+    monkeypatch.setattr(fechamento, "_cache", {})
+    np.testing.assert_array_equal(fechamento.calcular_fechamento(8, 3, sementes=1, processos=1), primeiro)
+    assert len(list(tmp_path.glob("fechamento_v8_g3_*.npy"))) == 1
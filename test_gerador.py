@@ -0,0 +1,50 @@
+import itertools
+
+import numpy as np
+import pytest
+
+import gerador
+from main import validar_palpite_elite
+from mascaras import mascara
+
+# Pontuação alta (e distinta) só em K dezenas: os melhores jogos saem todos
+# delas e a força bruta sobre C(K, 6) jogos dá a resposta exata
+K = 14
+rng = np.random.default_rng(17)
+FORTES = sorted(rng.choice(np.arange(1, 61), K, replace=False).tolist())
+PESOS = {n: (100.0 + float(rng.uniform(0, 50)) if n in FORTES else -1000.0) for n in range(1, 61)}
+
+
+def _forca_bruta():
+    validos = [j for j in itertools.combinations(FORTES, 6) if validar_palpite_elite(j)]
+    return sorted(([list(j), round(sum(PESOS[n] for n in j), 4)] for j in validos), key=lambda t: -t[1])
+
+
+@pytest.mark.parametrize("quantidade", [1, 50, 300])
+def test_melhores_igual_a_forca_bruta(quantidade):
+    esperado = _forca_bruta()
+    assert len(esperado) >= 300
+    assert [[d, p] for d, p in gerador.gerar_melhores(PESOS, quantidade)] == esperado[:quantidade]
+
+
+def test_melhores_sem_repeticao_e_em_ordem():
+    pesos = {n: float(p) for n, p in zip(range(1, 61), np.random.default_rng(1).uniform(0, 10, 60))}
+    palpites = list(gerador.gerar_melhores(pesos, 20_000))
+    assert len({tuple(d) for d, _ in palpites}) == 20_000
+    pontuacoes = [p for _, p in palpites]
+    assert all(a >= b for a, b in zip(pontuacoes, pontuacoes[1:]))
+    assert all(validar_palpite_elite(d) for d, _ in palpites[:2000])
+
+
+def test_melhores_respeita_excluir():
+    excluir = {mascara(d) for d, _ in _forca_bruta()[:10]}
+    assert [[d, p] for d, p in gerador.gerar_melhores(PESOS, 20, excluir=excluir)] == _forca_bruta()[10:30]
+
+
+def test_amostragem_sem_repeticao_e_completa_com_melhores():
+    # Pontuação concentrada em 8 dezenas: a amostragem esgota e o resto vem dos melhores
+    pico = {n: (50.0 if n <= 8 else 0.0) for n in range(1, 61)}
+    palpites = list(gerador.gerar_amostragem(pico, 3000, semente=0))
+    assert len(palpites) == 3000
+    assert len({tuple(d) for d, _ in palpites}) == 3000
+    assert all(validar_palpite_elite(d) for d, _ in palpites)
@@ -0,0 +1,116 @@
+import contextlib
+import hashlib
+
+import numpy as np
+import pytest
+
+import historico
+from conftest import snapshot_do_csv
+
+# Banco de mentira que responde às três consultas de obter_snapshot; a
+# assinatura é um md5 das linhas, como a do Postgres.
+
+
+def _assinatura(linhas):
+    return hashlib.md5(repr(linhas).encode()).hexdigest() if linhas else None
+
+
+class BancoFalso:
+    def __init__(self, snap):
+        self.linhas = {
+            int(c): (int(c), *map(int, d), float(p), cl, bool(a))
+            for c, d, p, cl, a in zip(snap.concursos, snap.dezenas, snap.popularidade,
+                                       snap.clusters, snap.acumulou)
+        }
+        self.pesos = [2.0, 1.0, 3.0, 1.0, 1.0]
+        self.leituras_completas = 0
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, params=None):
+        linhas = [self.linhas[c] for c in sorted(self.linhas)]
+        if sql == historico.QUERY_SNAPSHOT:
+            self.leituras_completas += 1
+            self._resultado = [l + tuple(self.pesos) + (_assinatura(linhas),) for l in linhas]
+        elif sql == historico.QUERY_ESTADO:
+            anteriores = [l for l in linhas if l[0] <= params[0]]
+            self._resultado = [(len(linhas), _assinatura(anteriores), _assinatura(linhas), *self.pesos)]
+        elif sql == historico.QUERY_NOVOS:
+            self._resultado = [l for l in linhas if l[0] > params[0]]
+        else:
+            raise AssertionError(sql)
+
+    def fetchall(self):
+        return self._resultado
+
+    def fetchone(self):
+        return self._resultado[0]
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def banco(monkeypatch):
+    banco = BancoFalso(snapshot_do_csv(200))
+    monkeypatch.setattr(historico, "conectar_banco", lambda: contextlib.nullcontext(banco))
+    historico.invalidar_snapshot()
+    snap = historico.obter_snapshot()
+    # Estruturas derivadas já calculadas: precisam ser estendidas, não recalculadas
+    snap.acumulada, snap.coocorrencia, snap.tabela_atrasos, snap.mascaras
+    yield banco
+    historico.invalidar_snapshot()
+
+
+def _igual_a_releitura(snap):
+    ref = historico.carregar_snapshot()
+    np.testing.assert_array_equal(snap.concursos, ref.concursos)
+    np.testing.assert_array_equal(snap.popularidade, ref.popularidade)
+    assert list(snap.clusters) == list(ref.clusters)
+    np.testing.assert_array_equal(snap.acumulada, ref.acumulada)
+    np.testing.assert_array_equal(snap.mascaras, ref.mascaras)
+    np.testing.assert_array_equal(snap.coocorrencia.pares, ref.coocorrencia.pares)
+    np.testing.assert_array_equal(snap.tabela_atrasos.atrasos_em(), ref.tabela_atrasos.atrasos_em())
+
+
+def test_sem_mudanca_reaproveita(banco):
+    assert historico.obter_snapshot() is historico.obter_snapshot()
+    assert banco.leituras_completas == 1
+
+
+def test_sorteios_novos_sao_anexados(banco):
+    for c in (201, 202):
+        banco.linhas[c] = (c, 1, 7, 13, 22, 40, 59, 1.3, None, True)
+    snap = historico.obter_snapshot()
+    assert banco.leituras_completas == 1
+    assert "coocorrencia" in snap.__dict__
+    _igual_a_releitura(snap)
+
+
+def test_pesos_novos_nao_recarregam(banco):
+    banco.pesos[0] = 4.0
+    assert historico.obter_snapshot().pesos["pop"] == 4.0
+    assert banco.leituras_completas == 1
+
+
+@pytest.mark.parametrize("edicao", ["troca_clusters", "popularidade", "apagado", "fora_de_ordem"])
+def test_edicoes_no_meio_recarregam(banco, edicao):
+    linhas = banco.linhas
+    if edicao == "troca_clusters":
+        # Mesmas contagens por cluster, sorteios diferentes
+        a = next(c for c, l in linhas.items() if l[8] == "PADRAO")
+        b = next(c for c, l in linhas.items() if l[8] == "ZEBRA")
+        linhas[a], linhas[b] = linhas[a][:8] + ("ZEBRA", linhas[a][9]), linhas[b][:8] + ("PADRAO", linhas[b][9])
+    elif edicao == "popularidade":
+        linhas[100] = linhas[100][:7] + (9.99,) + linhas[100][8:]
+    elif edicao == "apagado":
+        del linhas[100]
+        linhas[201] = (201, 1, 7, 13, 22, 40, 59, 1.3, None, True)
+    else:
+        menor = min(linhas)
+        linhas[menor - 1 if menor > 1 else 0] = (0, 1, 7, 13, 22, 40, 59, 1.3, None, True)
+
+    snap = historico.obter_snapshot()
+    assert banco.leituras_completas == 2
+    _igual_a_releitura(snap)
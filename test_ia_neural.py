@@ -0,0 +1,67 @@
+import contextlib
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import MinMaxScaler
+
+import ia_neural
+
+# MLPs minúsculos sobre sorteios sintéticos; o banco não é usado
+SORTEIOS = pd.DataFrame(np.sort(np.random.default_rng(0).integers(1, 61, (300, 6)), axis=1),
+                        columns=[f"bola{i}" for i in range(1, 7)])
+
+
+def _preparar_dados():
+    scaler = MinMaxScaler()
+    dados = scaler.fit_transform(SORTEIOS)
+    return dados[:-1], dados[1:], scaler
+
+
+@pytest.fixture
+def registro(monkeypatch, tmp_path):
+    monkeypatch.setattr(ia_neural, "MODELOS_DIR", str(tmp_path))
+    monkeypatch.setattr(ia_neural, "HIPERPARAMETROS", dict(ia_neural.HIPERPARAMETROS,
+                                                           hidden_layer_sizes=(8,), max_iter=30))
+    monkeypatch.setattr(ia_neural, "PROCESSOS_TREINO", 1)
+    monkeypatch.setattr(ia_neural, "preparar_dados", _preparar_dados)
+    monkeypatch.setattr(ia_neural, "obter_ultimo_concurso", lambda: 100)
+    monkeypatch.setattr(ia_neural, "conectar_banco", contextlib.nullcontext)
+    monkeypatch.setattr(ia_neural.pd, "read_sql", lambda *a, **k: SORTEIOS.tail(50))
+    monkeypatch.setattr(ia_neural, "_registro", {})
+    monkeypatch.setattr(ia_neural, "_treinos_agendados", {})
+    monkeypatch.setattr(ia_neural, "_incrementais_em_andamento", set())
+    ia_neural.treinar_registro(100, qtd_modelos=2)
+
+
+def _aguardar_agendador():
+    ia_neural._agendador_treino.submit(lambda: None).result()
+
+
+def test_concurso_novo_agenda_atualizacao_incremental(registro):
+    # Responde na hora com a versão anterior e agenda a incremental uma única vez
+    assert ia_neural.obter_modelos(101)[0]["ultimo_concurso"] == 100
+    assert ia_neural.obter_modelos(101)[0]["ultimo_concurso"] == 100
+    _aguardar_agendador()
+
+    modelos = ia_neural.obter_modelos(101)
+    assert [m["ultimo_concurso"] for m in modelos] == [101, 101]
+    assert [m["atualizacoes_incrementais"] for m in modelos] == [1, 1]
+    assert ia_neural._treinos_agendados == {}
+    assert ia_neural._incrementais_em_andamento == set()
+
+
+def test_incrementais_esgotados_agendam_refit(registro, monkeypatch):
+    monkeypatch.setattr(ia_neural, "REFIT_A_CADA", 1)
+    assert ia_neural.obter_modelos(101)[0]["ultimo_concurso"] == 100
+    _aguardar_agendador()
+
+    modelos = ia_neural.obter_modelos(101)
+    assert {(m["ultimo_concurso"], m["atualizacoes_incrementais"]) for m in modelos} == {(101, 0)}
+    assert list(ia_neural._treinos_agendados) == [ia_neural.versao_modelo(101)]
+
+
+def test_modo_desconhecido(registro):
+    assert len(ia_neural.prever_ensemble("voto")) == 6
+    with pytest.raises(ValueError):
+        ia_neural.prever_ensemble("mediana")
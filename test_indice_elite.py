@@ -0,0 +1,48 @@
+import itertools
+from math import comb
+
+import numpy as np
+import pytest
+
+import indice_elite
+from main import validar_palpite_elite, validar_palpites_elite_lote
+
+rng = np.random.default_rng(15)
+
+
+def test_rank_unrank_ida_e_volta():
+    posicoes = np.concatenate([[0, 1, indice_elite.TOTAL_JOGOS - 1],
+                               rng.integers(0, indice_elite.TOTAL_JOGOS, 100_000)])
+    jogos = indice_elite.unranks(posicoes)
+    assert (np.diff(jogos, axis=1) > 0).all() and jogos.min() >= 1 and jogos.max() <= 60
+    np.testing.assert_array_equal(indice_elite.ranks(jogos), posicoes)
+    assert indice_elite.unrank(0) == [1, 2, 3, 4, 5, 6]
+    assert indice_elite.rank([60, 59, 58, 57, 56, 55]) == indice_elite.TOTAL_JOGOS - 1
+
+
+@pytest.mark.parametrize("maior", [6, 9, 14])
+def test_ranks_sao_a_ordem_colex(maior):
+    # Os jogos com dezenas <= maior ocupam exatamente as posições 0..C(maior, 6) - 1
+    jogos = np.array(list(itertools.combinations(range(1, maior + 1), 6)))
+    assert sorted(indice_elite.ranks(jogos).tolist()) == list(range(comb(maior, 6)))
+
+
+def test_bitset_igual_ao_filtro_vetorizado():
+    # Todos os jogos com dezenas <= 22 e uma amostra do resto do índice
+    posicoes = np.concatenate([np.arange(comb(22, 6)), rng.integers(0, indice_elite.TOTAL_JOGOS, 1_000_000)])
+    jogos = indice_elite.unranks(posicoes)
+    np.testing.assert_array_equal(indice_elite.validos_por_rank(posicoes), validar_palpites_elite_lote(jogos))
+
+
+def test_filtro_vetorizado_igual_ao_escalar():
+    jogos = indice_elite.unranks(rng.integers(0, indice_elite.TOTAL_JOGOS, 20_000))
+    escalar = [validar_palpite_elite(j) for j in jogos.tolist()]
+    assert validar_palpites_elite_lote(jogos).tolist() == escalar
+    assert any(escalar) and not all(escalar)
+
+
+def test_validos_entre_igual_a_forca_bruta():
+    candidatas = [3, 8, 12, 17, 21, 26, 33, 38, 41, 47, 52, 59, 60]
+    esperado = [list(j) for j in itertools.combinations(candidatas, 6) if validar_palpite_elite(j)]
+    assert indice_elite.validos_entre(candidatas) == esperado
+    assert indice_elite.primeiro_valido_entre(candidatas) == esperado[0]
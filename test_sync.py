@@ -0,0 +1,140 @@
+import contextlib
+import os
+
+import pytest
+
+import api_falsa
+import sync
+
+# --- SYNC CONTRA A API FALSA ---
+# O servidor de api_falsa.py serve resultados.csv com 20% de 503; o banco é
+# um dublê em memória que responde às consultas que o sync faz (buracos,
+# MAX, COPY + upsert, contagem de atraso_dezenas).
+
+CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resultados.csv")
+ULTIMO_PUBLICADO = 2955
+BURACOS = {100, 1500, 2899}
+NO_BANCO = set(range(1, 2901)) - BURACOS
+ESPERADOS = sorted(BURACOS | set(range(2901, ULTIMO_PUBLICADO + 1)))
+
+
+class CursorFalso:
+    def __init__(self, banco):
+        self.banco = banco
+        self.carga = []
+        self.rowcount = -1
+        self._resultado = []
+
+    def execute(self, sql, params=None):
+        sql = " ".join(sql.split())
+        if "generate_series" in sql:
+            self._resultado = [(c,) for c in range(1, params[0] + 1) if c not in self.banco]
+        elif sql.startswith("SELECT COALESCE(MAX(concurso), 0) FROM sorteios"):
+            self._resultado = [(max(self.banco, default=0),)]
+        elif sql.startswith("SELECT COUNT(*) FROM atraso_dezenas"):
+            self._resultado = [(60,)]
+        elif sql.startswith("INSERT INTO sorteios"):
+            novos = {int(l.split("\t")[0]) for l in self.carga}
+            self.rowcount = len(novos) if "DO UPDATE" in sql else len(novos - self.banco)
+            self.banco |= novos
+        elif not sql.startswith(("CREATE TEMP TABLE", "TRUNCATE")):
+            raise AssertionError(f"consulta inesperada: {sql}")
+
+    def copy_expert(self, sql, arquivo, size=8192):
+        dados = ""
+        while bloco := arquivo.read(size):
+            dados += bloco
+        self.carga = dados.splitlines()
+
+    def fetchall(self):
+        return self._resultado
+
+    def fetchone(self):
+        return self._resultado[0]
+
+    def close(self):
+        pass
+
+
+class ConexaoFalsa:
+    def __init__(self, banco):
+        self.banco = banco
+        self.commits = 0
+
+    def cursor(self):
+        return CursorFalso(self.banco)
+
+    def commit(self):
+        self.commits += 1
+
+
+@pytest.fixture
+def api():
+    servidor, url = api_falsa.iniciar_em_thread(
+        api_falsa.carregar_fixtures(CSV), ate=ULTIMO_PUBLICADO, falhas=0.2, semente=1
+    )
+    yield servidor, url
+    servidor.shutdown()
+    servidor.server_close()
+
+
+@pytest.fixture
+def banco(monkeypatch, api):
+    _, url = api
+    conn = ConexaoFalsa(set(NO_BANCO))
+    atrasos = {"reconstrucoes": 0, "registros": []}
+    monkeypatch.setattr(sync, "URL_API", url)
+    monkeypatch.setattr(sync, "SYNC_TENTATIVAS", 8)
+    monkeypatch.setattr(sync, "conectar_banco", lambda: contextlib.nullcontext(conn))
+    monkeypatch.setattr(sync, "reconstruir_tabela_atrasos",
+                        lambda cur: atrasos.__setitem__("reconstrucoes", atrasos["reconstrucoes"] + 1))
+    monkeypatch.setattr(sync, "registrar_sorteio_atrasos",
+                        lambda cur, concurso, dezenas: atrasos["registros"].append(concurso))
+    conn.atrasos = atrasos
+    return conn
+
+
+def test_concursos_faltantes_acha_buracos_e_o_fim():
+    cur = CursorFalso(set(NO_BANCO))
+    assert sync.concursos_faltantes(cur, ULTIMO_PUBLICADO) == ESPERADOS
+
+
+@pytest.mark.parametrize("individuais", [True, False], ids=["por_concurso", "payload_completo"])
+def test_sync_preenche_exatamente_os_faltantes(api, banco, monkeypatch, individuais):
+    servidor, _ = api
+    if not individuais:
+        monkeypatch.setattr(sync, "SYNC_MAX_INDIVIDUAIS", len(ESPERADOS) - 2)
+
+    resultado = sync.sincronizar_caixa()
+
+    assert resultado.inseridos == ESPERADOS
+    assert resultado.falhas == {}
+    assert resultado.ultimo_concurso == ULTIMO_PUBLICADO
+    assert resultado.fora_de_ordem
+    assert resultado.gravadas == len(ESPERADOS)
+    assert banco.banco == set(range(1, ULTIMO_PUBLICADO + 1))
+    assert banco.commits == 1
+    assert banco.atrasos == {"reconstrucoes": 1, "registros": []}
+    # Houve 503 e mesmo assim nada faltou: as retentativas da sessão cobriram
+    assert servidor.falhas_simuladas > 0
+    if individuais:
+        # Cada concurso faltante baixado uma única vez, nenhum além deles
+        assert sorted(servidor.entregues) == [c for c in ESPERADOS if c != ULTIMO_PUBLICADO]
+    else:
+        assert servidor.entregues == []
+
+    # Nada mais falta: o próximo sync só atualiza os ganhadores do último
+    resultado = sync.sincronizar_caixa()
+    assert resultado.inseridos == []
+    assert resultado.gravadas == 1
+    assert banco.atrasos == {"reconstrucoes": 1, "registros": []}
+
+
+def test_sync_de_um_concurso_novo_e_incremental(api, banco):
+    banco.banco.update(ESPERADOS[:-1])
+
+    resultado = sync.sincronizar_caixa()
+
+    assert resultado.inseridos == [ULTIMO_PUBLICADO]
+    assert not resultado.fora_de_ordem
+    assert banco.atrasos == {"reconstrucoes": 0, "registros": [ULTIMO_PUBLICADO]}
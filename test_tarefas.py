@@ -0,0 +1,29 @@
+import threading
+
+import tarefas
+
+
+def _aguardar(tarefa, liberar, qtd_concursos):
+    liberar.wait(5)
+    return qtd_concursos
+
+
+def test_deduplica_so_com_os_mesmos_argumentos():
+    liberar = threading.Event()
+    a, criada_a = tarefas.enfileirar("teste", _aguardar, liberar, qtd_concursos=50)
+    b, criada_b = tarefas.enfileirar("teste", _aguardar, liberar, qtd_concursos=50)
+    c, criada_c = tarefas.enfileirar("teste", _aguardar, liberar, qtd_concursos=3000)
+    liberar.set()
+
+    assert (criada_a, criada_b, criada_c) == (True, False, True)
+    assert b is a and c is not a
+    assert c.como_dict()["parametros"]["qtd_concursos"] == 3000
+
+    for t in (a, c):
+        while t.finalizada_em is None:
+            threading.Event().wait(0.01)
+    assert (a.resultado, c.resultado) == (50, 3000)
+
+    # Terminado, o mesmo pedido cria um job novo
+    d, criada_d = tarefas.enfileirar("teste", _aguardar, liberar, qtd_concursos=50)
+    assert criada_d and d is not a
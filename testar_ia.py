@@ -1,37 +1,55 @@
+import multiprocessing
 import pandas as pd
 import numpy as np
 import warnings
+from concurrent.futures import ProcessPoolExecutor
 from ia_neural import prever_proximo_sorteio
-from main import conectar_banco, processar_todas_estrategias, gerar_fusao_cibernetica
+from historico import carregar_snapshot
+from mascaras import contar_acertos, mascara, mascaras_de_listas
+from main import processar_todas_estrategias, gerar_fusao_cibernetica
 
 warnings.filterwarnings("ignore", category=UserWarning)
 
-def stress_test_neural_v2(n_concursos=15):
-    conn = conectar_banco()
-    df_validacao = pd.read_sql(f"SELECT * FROM sorteios ORDER BY concurso DESC LIMIT {n_concursos}", conn)
-    conn.close()
+def _estrategias_no_concurso(snap, indice, janela_recente=20):
+    """Estratégias estatísticas como estavam antes do concurso de índice `indice` (sem lookahead)."""
+    return processar_todas_estrategias(snapshot=snap.prefixo(indice), janela_recente=janela_recente)
+
+def stress_test_neural_v2(n_concursos=15, processos=1, janela_recente=20):
+    """
+    Batalha IA vs Base vs Fusão nos últimos `n_concursos`. As estratégias base
+    de cada concurso são independentes e podem rodar em `processos` processos.
+    """
+    snap = carregar_snapshot()
+    # Contagens acumuladas calculadas uma vez; cada prefixo só fatia a matriz
+    snap.acumulada
+    # Do mais recente para o mais antigo, como no relatório original
+    indices = list(range(len(snap) - 1, max(0, len(snap) - n_concursos) - 1, -1))
     
     resultados = []
     print(f"🚀 Iniciando Batalha de Inteligências (IA vs Base vs FUSÃO) - {n_concursos} concursos...")
 
-    for index, linha in df_validacao.iterrows():
-        concurso_alvo = linha['concurso']
-        sorteio_real = set([linha['bola1'], linha['bola2'], linha['bola3'], linha['bola4'], linha['bola5'], linha['bola6']])
+    if processos > 1:
+        with ProcessPoolExecutor(max_workers=processos, mp_context=multiprocessing.get_context("spawn")) as executor:
+            estrategias = list(executor.map(_estrategias_no_concurso, [snap] * len(indices), indices,
+                                             [janela_recente] * len(indices)))
+    else:
+        estrategias = [_estrategias_no_concurso(snap, i, janela_recente) for i in indices]
+
+    for indice, dados_estatisticos in zip(indices, estrategias):
+        concurso_alvo = int(snap.concursos[indice])
+        sorteio_real = snap.mascaras[indice]
         
         # 1. Palpite Neural Puro
         palpite_neural = prever_proximo_sorteio()
-        acertos_neural = len(set(palpite_neural).intersection(sorteio_real))
+        acertos_neural = int(contar_acertos(mascara(palpite_neural), sorteio_real))
         
         # 2. Média das Estratégias Base
-        dados_estatisticos = processar_todas_estrategias()
-        acertos_base = []
-        for numeros in dados_estatisticos['base'].values():
-            acertos_base.append(len(set(numeros).intersection(sorteio_real)))
-        media_base = np.mean(acertos_base)
+        acertos_base = contar_acertos(mascaras_de_listas(dados_estatisticos['base'].values()), sorteio_real)
+        media_base = float(np.mean(acertos_base))
         
         # 3. A FUSÃO (O novo motor)
         palpite_fusao = gerar_fusao_cibernetica(palpite_neural, dados_estatisticos["meta"]["Alta Convergência"])
-        acertos_fusao = len(set(palpite_fusao).intersection(sorteio_real))
+        acertos_fusao = int(contar_acertos(mascara(palpite_fusao), sorteio_real))
         
         resultados.append({
             "concurso": concurso_alvo,
@@ -55,4 +73,4 @@ def stress_test_neural_v2(n_concursos=15):
     return resultados
 
 if __name__ == "__main__":
-    stress_test_neural_v2(15)
\ No newline at end of file
+    stress_test_neural_v2(15)